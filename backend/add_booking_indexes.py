@@ -0,0 +1,21 @@
+import sqlite3
+
+# Adds the composite index used by the booking overlap check
+conn = sqlite3.connect('sql_app.db')
+cursor = conn.cursor()
+
+try:
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS ix_bookings_slot_id_start_time_end_time "
+        "ON bookings (slot_id, start_time, end_time)"
+    )
+    print("✓ ix_bookings_slot_id_start_time_end_time ready")
+    conn.commit()
+
+except Exception as e:
+    print(f"Error: {e}")
+    conn.rollback()
+finally:
+    conn.close()
+
+print("\n✓ Booking indexes ready!")
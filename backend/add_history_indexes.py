@@ -0,0 +1,29 @@
+import sqlite3
+
+# Prepares an existing database for the slot status history pipeline
+conn = sqlite3.connect('sql_app.db')
+cursor = conn.cursor()
+
+try:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS slot_status (
+            id INTEGER PRIMARY KEY,
+            slot_id INTEGER REFERENCES slots (id),
+            status VARCHAR,
+            timestamp DATETIME,
+            source VARCHAR
+        )
+    """)
+    print("✓ slot_status table ready")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_slot_status_slot_id_timestamp ON slot_status (slot_id, timestamp)")
+    print("✓ ix_slot_status_slot_id_timestamp ready")
+    conn.commit()
+
+except Exception as e:
+    print(f"Error: {e}")
+    conn.rollback()
+finally:
+    conn.close()
+
+print("\n✓ Slot history storage ready!")
@@ -0,0 +1,34 @@
+import sqlite3
+
+# Adds the delta-sync version columns (lot/slot version counters) to an existing database
+conn = sqlite3.connect('sql_app.db')
+cursor = conn.cursor()
+
+try:
+    columns_to_add = {
+        'parking_lots': {'version': 'INTEGER NOT NULL DEFAULT 0'},
+        'slots': {'version': 'INTEGER NOT NULL DEFAULT 0'},
+    }
+
+    for table, columns in columns_to_add.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = [col[1] for col in cursor.fetchall()]
+        for col_name, col_type in columns.items():
+            if col_name not in existing:
+                print(f"Adding {table}.{col_name}...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+                print(f"✓ {table}.{col_name} added")
+            else:
+                print(f"✓ {table}.{col_name} already exists")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_slots_lot_id_version ON slots (lot_id, version)")
+    print("✓ ix_slots_lot_id_version ready")
+    conn.commit()
+
+except Exception as e:
+    print(f"Error: {e}")
+    conn.rollback()
+finally:
+    conn.close()
+
+print("\n✓ Version columns ready!")
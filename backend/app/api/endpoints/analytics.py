@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.db import models, session
+from app.db.rollups import GRANULARITIES, occupancy_analytics
+from app.schemas import schemas
+
+router = APIRouter()
+
+ANALYTICS_MAX_POINTS = 2000  # series length limit; use a coarser granularity for longer ranges
+
+
+def _utc(moment: datetime) -> datetime:
+    """Naive UTC, like every timestamp stored by the backend."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _check_range(start: datetime, end: datetime, granularity: str):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    points = (end - start).total_seconds() / GRANULARITIES[granularity]
+    if points > ANALYTICS_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range has {int(points)} {granularity} buckets (max {ANALYTICS_MAX_POINTS}); use a coarser granularity",
+        )
+    if granularity == "minute" and start < datetime.utcnow() - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Minute rollups are kept for {settings.ROLLUP_MINUTE_RETENTION_DAYS} days; use hour or day",
+        )
+
+
+@router.get("/{lot_id}/analytics", response_model=schemas.OccupancyAnalytics)
+async def read_lot_analytics(
+    lot_id: int,
+    start: datetime = Query(..., alias="from", description="Range start (UTC), floored to the granularity"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (UTC), defaults to now"),
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    db: AsyncSession = Depends(session.get_async_db)
+):
+    """
+    Utilization, turnover, average dwell time and peak hour for a lot, from the
+    precomputed rollups. Totals cost two index lookups whatever the range.
+    """
+    start, end = _utc(start), _utc(end or datetime.utcnow())
+    _check_range(start, end, granularity)
+    if await db.get(models.ParkingLot, lot_id) is None:
+        raise HTTPException(status_code=404, detail="Lot not found")
+    slots = (await db.execute(
+        select(func.count(models.Slot.id)).where(models.Slot.lot_id == lot_id)
+    )).scalar()
+    return await occupancy_analytics(db, lot_id, None, start, end, granularity, slots)
+
+
+@router.get("/{lot_id}/slots/{slot_id}/analytics", response_model=schemas.OccupancyAnalytics)
+async def read_slot_analytics(
+    lot_id: int,
+    slot_id: int,
+    start: datetime = Query(..., alias="from", description="Range start (UTC), floored to the granularity"),
+    end: Optional[datetime] = Query(None, alias="to", description="Range end (UTC), defaults to now"),
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    db: AsyncSession = Depends(session.get_async_db)
+):
+    start, end = _utc(start), _utc(end or datetime.utcnow())
+    _check_range(start, end, granularity)
+    slot = (await db.execute(
+        select(models.Slot.id).where(models.Slot.id == slot_id, models.Slot.lot_id == lot_id)
+    )).scalar()
+    if slot is None:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    return await occupancy_analytics(db, lot_id, slot_id, start, end, granularity, 1)
@@ -3,15 +3,18 @@ Authentication endpoints for user registration, login, and token management.
 """
 
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
 from app.core import security
 from app.core.config import settings
 from app.db import models, session
+from app.db.revocation import revocation_list
+from app.api.endpoints.websockets import manager
 from app.schemas import schemas
 from loguru import logger
 
@@ -19,7 +22,7 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: schemas.UserCreate, db: Session = Depends(session.get_db)):
+async def register(user_data: schemas.UserCreate, db: AsyncSession = Depends(session.get_async_db)):
     """
     Register a new user.
     
@@ -28,7 +31,9 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(session.get_db
     - **name**: User's full name
     """
     # Check if user already exists
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    existing_user = (await db.execute(
+        select(models.User.id).where(models.User.email == user_data.email)
+    )).scalar()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +41,7 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(session.get_db
         )
     
     # Create new user
-    hashed_password = security.get_password_hash(user_data.password)
+    hashed_password = await security.password_hasher.hash(user_data.password)
     new_user = models.User(
         id=str(uuid.uuid4()),
         email=user_data.email,
@@ -46,8 +51,8 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(session.get_db
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     logger.info(f"New user registered: {new_user.email}")
     
@@ -55,16 +60,16 @@ def register(user_data: schemas.UserCreate, db: Session = Depends(session.get_db
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(session.get_db)
+    db: AsyncSession = Depends(session.get_async_db)
 ):
     """
     Login with email and password to get access token.
     
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = security.authenticate_user(db, form_data.username, form_data.password)
+    user = await security.authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         logger.warning(f"Failed login attempt for: {form_data.username}")
@@ -81,7 +86,7 @@ def login(
         )
     
     # Create access token
-    access_token = security.create_access_token(data={"sub": user.id})
+    access_token = security.create_access_token(data={"sub": user.id, **security.user_claims(user)})
     refresh_token = security.create_refresh_token(data={"sub": user.id})
     
     logger.info(f"User logged in: {user.email}")
@@ -94,9 +99,12 @@ def login(
 
 
 @router.post("/refresh", response_model=schemas.Token)
-def refresh_token(refresh_token: str, db: Session = Depends(session.get_db)):
+async def refresh_token(refresh_token: str, db: AsyncSession = Depends(session.get_async_db)):
     """
     Refresh access token using refresh token.
+    
+    The refresh token is rotated: the one presented is revoked and cannot be
+    used again.
     """
     try:
         payload = security.decode_token(refresh_token)
@@ -107,9 +115,21 @@ def refresh_token(refresh_token: str, db: Session = Depends(session.get_db)):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type"
             )
+        jti = payload.get("jti")
+        if jti is None:
+            # Issued before tokens carried an id: it cannot be rotated safely
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token cannot be refreshed, please log in again"
+            )
+        if revocation_list.is_revoked(jti):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
         
         user_id = payload.get("sub")
-        user = db.query(models.User).filter(models.User.id == user_id).first()
+        user = await db.get(models.User, user_id)
         
         if not user or not user.is_active:
             raise HTTPException(
@@ -117,8 +137,17 @@ def refresh_token(refresh_token: str, db: Session = Depends(session.get_db)):
                 detail="User not found or inactive"
             )
         
+        # Claim the presented token first; only the request that wins gets new tokens
+        message = await revocation_list.claim(jti, payload["exp"])
+        if message is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        await manager.publish_internal(message)
+        
         # Create new tokens
-        new_access_token = security.create_access_token(data={"sub": user.id})
+        new_access_token = security.create_access_token(data={"sub": user.id, **security.user_claims(user)})
         new_refresh_token = security.create_refresh_token(data={"sub": user.id})
         
         return {
@@ -137,9 +166,16 @@ def refresh_token(refresh_token: str, db: Session = Depends(session.get_db)):
         )
 
 
+async def _revoke(payload: dict):
+    """Revoke a token until its expiry, on every worker."""
+    message = await revocation_list.revoke(payload.get("jti"), payload.get("exp", 0))
+    if message is not None:
+        await manager.publish_internal(message)
+
+
 @router.get("/me", response_model=schemas.UserResponse)
-def get_current_user_info(
-    current_user: models.User = Depends(security.get_current_active_user)
+async def get_current_user_info(
+    current_user: security.AuthenticatedUser = Depends(security.get_current_active_user)
 ):
     """
     Get current user information.
@@ -148,17 +184,28 @@ def get_current_user_info(
 
 
 @router.post("/logout")
-def logout(current_user: models.User = Depends(security.get_current_active_user)):
+async def logout(
+    refresh_token: Optional[str] = None,
+    token: str = Depends(security.oauth2_scheme),
+    current_user: security.AuthenticatedUser = Depends(security.get_current_active_user)
+):
     """
     Logout current user.
     
-    Note: In a production system, you would typically:
-    1. Add the token to a blacklist/revocation list
-    2. Store blacklisted tokens in Redis with expiration
-    3. Check blacklist on each request
-    
-    For now, this is a placeholder that confirms logout.
-    Client should delete the token from storage.
+    Revokes the access token used for this request and, if given, the
+    refresh token. Both are rejected from then on, on every worker.
     """
+    # Check everything before revoking anything: a rejected logout leaves both tokens valid
+    refresh_payload = None
+    if refresh_token:
+        refresh_payload = security.decode_token(refresh_token)
+        if refresh_payload.get("type") != "refresh" or refresh_payload.get("sub") != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Refresh token does not belong to this user"
+            )
+    await _revoke(security.verified_claims(token))
+    if refresh_payload is not None:
+        await _revoke(refresh_payload)
     logger.info(f"User logged out: {current_user.email}")
     return {"message": "Successfully logged out"}
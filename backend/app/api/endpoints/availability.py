@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from datetime import datetime
+
+from app.api.endpoints.bookings import booking_window
+from app.db.availability import SORT_ORDERS, availability_index, parse_geo
+from app.db.booking_index import booking_index
+from app.schemas import schemas
+
+router = APIRouter()
+
+
+# Plain def: the indexes take threading locks, so this runs in the threadpool, not on the event loop
+@router.get("/availability", response_model=List[schemas.AvailableSlot])
+def search_availability(
+    near: Optional[str] = Query(None, description="'lat,lon' to search around; without it all lots are searched by price"),
+    radius_km: float = Query(5.0, gt=0, le=50),
+    slot_type: Optional[str] = Query(None, description="regular, premium, ev"),
+    duration: int = Query(1, ge=1, le=24, description="Hours the slot must stay bookable"),
+    start_time: Optional[datetime] = Query(None, description="Start (UTC), defaults to now"),
+    sort: str = Query("distance", description="distance or price"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Best free slots across lots, from the in-memory availability index (free
+    bitsets per lot and a grid over lot coordinates) - no table scans.
+    """
+    position = None
+    if near is not None:
+        position = parse_geo(near)
+        if position is None:
+            raise HTTPException(status_code=400, detail="`near` must be 'lat,lon'")
+    if sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"`sort` must be one of: {', '.join(SORT_ORDERS)}")
+    start, end = booking_window(start_time, duration)
+    return availability_index.search(
+        start, end, booking_index.is_free, near=position, radius_km=radius_km,
+        slot_type=slot_type, limit=limit, sort=sort,
+    )
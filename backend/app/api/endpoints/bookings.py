@@ -1,33 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 import razorpay
-from typing import Any
+from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.core.config import settings
 from app.db import models, session
+from app.db.booking_index import booking_index
 from app.schemas import schemas
 
 router = APIRouter()
 
 client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
 
+
+def booking_window(start_time: Optional[datetime], duration_hours: int):
+    start = start_time or datetime.utcnow()
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    return start, start + timedelta(hours=duration_hours)
+
+
+@router.get("/slots/{slot_id}/availability")
+def read_slot_availability(
+    slot_id: int,
+    duration_hours: int = Query(1, ge=1, le=24),
+    start_time: Optional[datetime] = Query(None, description="Start (UTC), defaults to now"),
+):
+    """Is the slot free for [start_time, start_time + duration_hours)?"""
+    if slot_id not in booking_index.slot_meta:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    start, end = booking_window(start_time, duration_hours)
+    return {"slot_id": slot_id, "start_time": start, "end_time": end, "free": booking_index.is_free(slot_id, start, end)}
+
+
+@router.get("/free-slot")
+def read_first_free_slot(
+    lot_id: int,
+    slot_type: str = Query("regular", description="regular, premium, ev"),
+    duration_hours: int = Query(1, ge=1, le=24),
+    start_time: Optional[datetime] = Query(None, description="Start (UTC), defaults to now"),
+):
+    """First free slot of `slot_type` in the lot for the requested window."""
+    start, end = booking_window(start_time, duration_hours)
+    slot_id = booking_index.first_free(lot_id, slot_type, start, end)
+    if slot_id is None:
+        raise HTTPException(status_code=404, detail="No free slot for this window")
+    return {"slot_id": slot_id, "lot_id": lot_id, "slot_type": slot_type, "start_time": start, "end_time": end}
+
+
 @router.post("/", response_model=Any)
 def create_booking_order(booking_request: schemas.BookingCreate, db: Session = Depends(session.get_db)):
     """
-    1. Check if slot is free
+    1. Reserve the slot for the requested window (pending booking)
     2. Create Razorpay Order
     3. Return Order ID to frontend
     """
-    # Check slot availability
     slot = db.query(models.Slot).filter(models.Slot.id == booking_request.slot_id).first()
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
-    
-    # Simple check: In real app, check 'SlotStatus' or future bookings overlap
-    # For now, just proceed.
+
+    start, end = booking_window(booking_request.start_time, booking_request.duration_hours)
+    if start < datetime.utcnow() - timedelta(minutes=5):
+        raise HTTPException(status_code=400, detail="Booking cannot start in the past")
 
     amount_paise = int(booking_request.duration_hours * slot.rate_per_hour * 100) # INR to Paise
-    
+
+    # Holds the slot until paid or BOOKING_HOLD_MINUTES have passed
+    booking = booking_index.reserve(db, slot.id, "test_user", start, end, amount_paise / 100) # Placeholder user
+    if booking is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Slot is already booked for this time")
+
     try:
         payment = client.order.create({
             "amount": amount_paise,
@@ -37,13 +80,23 @@ def create_booking_order(booking_request: schemas.BookingCreate, db: Session = D
         })
     except Exception as e:
         print(f"Razorpay Error: {e}")
+        booking.status = "cancelled"
+        db.commit()
+        booking_index.release(booking)
         raise HTTPException(status_code=500, detail="Payment Gateway Error")
 
+    booking.razorpay_order_id = payment['id']
+    db.commit()
+
     return {
         "order_id": payment['id'],
         "amount": payment['amount'],
         "currency": payment['currency'],
-        "key_id": settings.RAZORPAY_KEY_ID
+        "key_id": settings.RAZORPAY_KEY_ID,
+        "booking_id": booking.id,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
+        "hold_expires_at": booking.created_at + booking_index.hold
     }
 
 @router.post("/verify")
@@ -55,7 +108,7 @@ def verify_payment(
     db: Session = Depends(session.get_db)
 ):
     """
-    Verify signature and save booking
+    Verify the payment signature and confirm the booking reserved for the order
     """
     try:
         client.utility.verify_payment_signature({
@@ -66,16 +119,14 @@ def verify_payment(
     except razorpay.errors.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid Payment Signature")
 
-    # Create Booking Record
-    booking = models.Booking(
-        slot_id=slot_id,
-        user_id="test_user", # Placeholder
-        amount=100.0, # Placeholder, should match order
-        status="paid",
-        razorpay_order_id=razorpay_order_id,
-        razorpay_payment_id=razorpay_payment_id
-    )
-    db.add(booking)
-    db.commit()
-    
+    # Confirm the booking reserved when the order was created
+    booking = db.query(models.Booking).filter(models.Booking.razorpay_order_id == razorpay_order_id).first()
+    if booking is None or booking.slot_id != slot_id:
+        # Every order is created with a reserved booking; anything else is not ours to confirm
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No booking for this order")
+    if not booking_index.confirm_payment(db, booking, razorpay_payment_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Slot was booked by someone else after the hold expired; the payment will be refunded",
+        )
     return {"status": "success", "message": "Booking Confirmed"}
@@ -10,6 +10,7 @@ from datetime import datetime
 
 from app.db import session
 from app.core.config import settings
+from app.core.logging_config import log_sink, request_log_sampler
 from loguru import logger
 
 router = APIRouter()
@@ -80,4 +81,9 @@ def detailed_health_check(db: Session = Depends(session.get_db)):
         }
         health_status["status"] = "degraded"
     
+    if request_log_sampler is not None:
+        health_status["request_logs"] = request_log_sampler.stats()
+    if log_sink is not None:
+        health_status["log_sink"] = log_sink.stats()
+    
     return health_status
@@ -1,18 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
+from datetime import datetime
+import json
 
 from app.db import models, session
+from app.db.availability import availability_index
+from app.db.booking_index import booking_index
+from app.db.history import history_writer
+from app.db.slot_store import slot_store
 from app.schemas import schemas
 from app.api.endpoints.websockets import manager
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.ParkingLot])
-def read_parking_lots(skip: int = 0, limit: int = 100, db: Session = Depends(session.get_db)):
-    lots = db.query(models.ParkingLot).offset(skip).limit(limit).all()
+# Columns fetched for the lot listing (no ORM instances are built)
+LOT_LIST_COLUMNS = (
+    models.ParkingLot.id,
+    models.ParkingLot.name,
+    models.ParkingLot.address,
+    models.ParkingLot.geo_location,
+    models.ParkingLot.version,
+    models.ParkingLot.created_at,
+    models.ParkingLot.updated_at,
+)
+# Slot fields selectable with ?fields=
+SLOT_LIST_FIELDS = {
+    column.key: column
+    for column in (
+        models.Slot.id,
+        models.Slot.lot_id,
+        models.Slot.name,
+        models.Slot.polygon,
+        models.Slot.slot_type,
+        models.Slot.rate_per_hour,
+        models.Slot.is_active,
+        models.Slot.status,
+        models.Slot.version,
+        models.Slot.created_at,
+        models.Slot.updated_at,
+    )
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ListingResponse(JSONResponse):
+    """Serializes plain dicts/rows directly, without Pydantic validation."""
+
+    def render(self, content) -> bytes:
+        return json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def parse_slot_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return tuple(SLOT_LIST_FIELDS)
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in SLOT_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown slot fields: {', '.join(unknown)} (allowed: {', '.join(SLOT_LIST_FIELDS)})"
+        )
+    return names
+
+
+async def list_lot_rows(db: AsyncSession, after_id: int, limit: int, slot_fields: Tuple[str, ...]) -> List[dict]:
+    """
+    One page of lots with their slots in two queries: the lot page, then all
+    slots of that lot-id range, selecting only the requested columns.
+    """
+    lots = (await db.execute(
+        select(*LOT_LIST_COLUMNS)
+        .where(models.ParkingLot.id > after_id)
+        .order_by(models.ParkingLot.id)
+        .limit(limit)
+    )).all()
+    if not lots:
+        return []
+
+    page = {lot.id: {**lot._asdict(), "slots": []} for lot in lots}
+    slot_rows = await db.execute(
+        select(models.Slot.lot_id, *(SLOT_LIST_FIELDS[name] for name in slot_fields))
+        .where(models.Slot.lot_id > after_id, models.Slot.lot_id <= lots[-1].id)
+        .order_by(models.Slot.lot_id, models.Slot.id)
+    )
+    for row in slot_rows.tuples():
+        lot = page.get(row[0])
+        if lot is not None:
+            lot["slots"].append(dict(zip(slot_fields, row[1:])))
+    return list(page.values())
+
+
+@router.get(
+    "/",
+    response_model=None,
+    response_class=ListingResponse,
+    responses={200: {"model": List[schemas.ParkingLotListing], "description": "One page of lots"}},
+)
+async def read_parking_lots(
+    after_id: int = Query(0, ge=0, description="Keyset cursor: return lots with id greater than this"),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated slot fields to include, e.g. id,status"),
+    db: AsyncSession = Depends(session.get_async_db)
+):
+    """
+    Lots ordered by id, with their slots. Page with `after_id` (the last lot id
+    of the previous page, also sent as the X-Next-After-Id header).
+    """
+    slot_fields = parse_slot_fields(fields)
+    if slot_store.enabled:
+        lots = slot_store.list_lots(after_id, limit, slot_fields)
+    else:
+        lots = await list_lot_rows(db, after_id, limit, slot_fields)
     # print(f"DEBUG: Found {len(lots)} lots")
-    return lots
+    headers = {"X-Next-After-Id": str(lots[-1]["id"])} if len(lots) == limit else None
+    return ListingResponse(lots, headers=headers)
 
 @router.post("/", response_model=schemas.ParkingLot)
 def create_parking_lot(lot: schemas.ParkingLotCreate, db: Session = Depends(session.get_db)):
@@ -20,50 +130,209 @@ def create_parking_lot(lot: schemas.ParkingLotCreate, db: Session = Depends(sess
     db.add(db_lot)
     db.commit()
     db.refresh(db_lot)
+    if slot_store.enabled:
+        slot_store.add_lot(db_lot)
+    availability_index.add_lot(db_lot)
     return db_lot
 
+def next_lot_version(lot_id: int):
+    """
+    Statement that atomically bumps a lot's version and returns the new value.
+    Every change to a lot's slots is stamped with the version it produced, so
+    clients can ask for "everything after version N".
+    """
+    return (
+        update(models.ParkingLot)
+        .where(models.ParkingLot.id == lot_id)
+        .values(version=models.ParkingLot.version + 1)
+        .returning(models.ParkingLot.version)
+    )
+
+
+def slot_message(slot_id: int, status: str, lot_id: int, version: int) -> dict:
+    return {
+        "type": "slot_update",
+        "version": version,
+        "slot": {
+            "id": slot_id,
+            "status": status,
+            "lot_id": lot_id,
+            "version": version
+        }
+    }
+
+
 @router.post("/{lot_id}/slots", response_model=schemas.Slot)
 def create_slot(lot_id: int, slot: schemas.SlotCreate, db: Session = Depends(session.get_db)):
     db_slot = models.Slot(**slot.dict(), lot_id=lot_id)
+    if slot_store.enabled:
+        # The store owns the lot version counter (persisted by its flusher)
+        db_slot.version = slot_store.next_version(lot_id)
+    else:
+        db_slot.version = db.execute(next_lot_version(lot_id)).scalar() or 0
     db.add(db_slot)
     db.commit()
     db.refresh(db_slot)
+    if slot_store.enabled:
+        slot_store.add_slot(db_slot)
+    booking_index.add_slot(db_slot)
+    availability_index.add_slot(db_slot)
     return db_slot
 
+def slot_status_allowed(slot_id: int, current: str, new_status: str) -> bool:
+    """
+    Check a status update against the priority rules.
+    Returns True if the update may be applied.
+    """
+    # --- Priority Logic ---
+    # 1. If Slot is 'reserved'
+    if current == "reserved":
+        # Only allow switching to 'occupied' (Car arrived)
+        # Identify if ML is saying 'free' -> Ignore
+        if new_status == "free":
+            print(f"Ignored ML update 'free' for Reserved slot {slot_id}")
+            return False
+    return True
+
+
+def apply_slot_status(slot: models.Slot, new_status: str) -> bool:
+    """
+    Apply a status update to a slot following the priority rules.
+    Returns True if the update was accepted.
+    """
+    if not slot_status_allowed(slot.id, slot.status, new_status):
+        return False
+
+    slot.status = new_status
+    return True
+
+
+@router.post("/{lot_id}/slots/status", response_model=schemas.SlotStatusBatchResult)
+async def update_slot_statuses(
+    lot_id: int,
+    batch: schemas.SlotStatusBatchUpdate,
+    db: AsyncSession = Depends(session.get_async_db)
+):
+    """
+    Apply many slot transitions for one lot in a single transaction.
+    Used by the ML service to flush coalesced occupancy changes.
+    """
+    if slot_store.enabled:
+        changed, ignored, not_found, version = slot_store.apply(
+            lot_id, [(item.slot_id, item.status) for item in batch.updates], slot_status_allowed
+        )
+        for slot in changed:
+            history_writer.record(slot["id"], slot["status"], slot["updated_at"], source="ml")
+            await manager.broadcast(slot_message(slot["id"], slot["status"], lot_id, version), str(lot_id))
+        return schemas.SlotStatusBatchResult(
+            updated=[slot["id"] for slot in changed], ignored=ignored, not_found=not_found, version=version
+        )
+
+    slot_ids = {item.slot_id for item in batch.updates}
+    rows = await db.execute(
+        select(models.Slot).where(models.Slot.lot_id == lot_id, models.Slot.id.in_(slot_ids))
+    )
+    slots = {slot.id: slot for slot in rows.scalars()}
+
+    result = schemas.SlotStatusBatchResult()
+    original = {slot_id: slot.status for slot_id, slot in slots.items()}
+    for item in batch.updates:
+        slot = slots.get(item.slot_id)
+        if slot is None:
+            if item.slot_id not in result.not_found:
+                result.not_found.append(item.slot_id)
+            continue
+        if not apply_slot_status(slot, item.status):
+            result.ignored.append(item.slot_id)
+
+    changed = [slot for slot_id, slot in slots.items() if slot.status != original[slot_id]]
+    if changed:
+        # The whole batch becomes one lot version
+        result.version = (await db.execute(next_lot_version(lot_id))).scalar()
+        for slot in changed:
+            slot.version = result.version
+        await db.commit()
+
+    now = datetime.utcnow()
+    for slot in changed:
+        result.updated.append(slot.id)
+        history_writer.record(slot.id, slot.status, now, source="ml")
+        await manager.broadcast(slot_message(slot.id, slot.status, lot_id, result.version), str(lot_id))
+
+    return result
+
+
 @router.post("/{lot_id}/slots/{slot_id}/status", response_model=schemas.Slot)
 async def update_slot_status(
     lot_id: int, 
     slot_id: int, 
     status_update: schemas.SlotStatusUpdate, 
-    db: Session = Depends(session.get_db)
+    db: AsyncSession = Depends(session.get_async_db)
 ):
-    slot = db.query(models.Slot).filter(models.Slot.id == slot_id, models.Slot.lot_id == lot_id).first()
+    if slot_store.enabled:
+        if slot_store.get_slot(lot_id, slot_id) is None:
+            raise HTTPException(status_code=404, detail="Slot not found")
+        changed, _, _, version = slot_store.apply(lot_id, [(slot_id, status_update.status)], slot_status_allowed)
+        if changed:
+            history_writer.record(slot_id, changed[0]["status"], changed[0]["updated_at"], source="ml")
+            await manager.broadcast(slot_message(slot_id, changed[0]["status"], lot_id, version), str(lot_id))
+        return slot_store.get_slot(lot_id, slot_id)
+
+    result = await db.execute(
+        select(models.Slot).where(models.Slot.id == slot_id, models.Slot.lot_id == lot_id)
+    )
+    slot = result.scalars().first()
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
-    current_status = slot.status
 
-    # --- Priority Logic ---
-    # 1. If Slot is 'reserved'
-    if current_status == "reserved":
-        # Only allow switching to 'occupied' (Car arrived)
-        # Identify if ML is saying 'free' -> Ignore
-        if status_update.status == "free":
-            print(f"Ignored ML update 'free' for Reserved slot {slot_id}")
-            return slot # Return current state without change
+    previous = slot.status
+    if not apply_slot_status(slot, status_update.status):
+        return slot # Return current state without change
+    if slot.status == previous:
+        return slot # Nothing changed, keep the lot version
 
-    slot.status = status_update.status
-    db.commit()
-    db.refresh(slot)
+    slot.version = (await db.execute(next_lot_version(lot_id))).scalar()
+    await db.commit()
+    await db.refresh(slot)
+    history_writer.record(slot.id, slot.status, slot.updated_at, source="ml")
 
     # Broadcast to WS
-    message = {
-        "type": "slot_update",
-        "slot": {
-            "id": slot.id,
-            "status": slot.status,
-            "lot_id": lot_id
-        }
-    }
-    await manager.broadcast(message, str(lot_id))
+    await manager.broadcast(slot_message(slot.id, slot.status, lot_id, slot.version), str(lot_id))
     
     return slot
+
+
+@router.get("/{lot_id}/changes", response_model=schemas.LotChanges)
+async def read_lot_changes(
+    lot_id: int,
+    since: int = Query(0, ge=0, description="Last lot version the client has seen (0 = full snapshot)"),
+    db: AsyncSession = Depends(session.get_async_db)
+):
+    """
+    Delta sync: slots changed after version `since`, or 304 if there are none.
+    A `since` ahead of the server (e.g. after a database reset) returns a full
+    snapshot with `reset` set.
+    """
+    if slot_store.enabled:
+        changes = slot_store.changes(lot_id, since)
+        if changes is None:
+            raise HTTPException(status_code=404, detail="Lot not found")
+        version, reset, slots = changes
+        if since and since == version:
+            return Response(status_code=304)
+        return schemas.LotChanges(lot_id=lot_id, version=version, reset=reset, slots=slots)
+
+    version = (await db.execute(
+        select(models.ParkingLot.version).where(models.ParkingLot.id == lot_id)
+    )).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Lot not found")
+    if since and since == version:
+        return Response(status_code=304)
+
+    reset = since == 0 or since > version
+    query = select(models.Slot).where(models.Slot.lot_id == lot_id)
+    if not reset:
+        query = query.where(models.Slot.version > since)
+    slots = (await db.execute(query.order_by(models.Slot.id))).scalars().all()
+    return schemas.LotChanges(lot_id=lot_id, version=version, reset=reset, slots=slots)
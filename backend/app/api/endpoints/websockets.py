@@ -1,29 +1,206 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import Callable, Dict, Hashable, List, Optional, Set
+from collections import OrderedDict
+from loguru import logger
+from app.core.broadcast import BroadcastBus, MemoryBus, create_bus
+from app.core.config import settings
+import asyncio
+import itertools
+import json
 
 router = APIRouter()
 
+# Outbound queue per client: when it overflows the backlog is replaced by a resync message
+MAX_QUEUED_MESSAGES = 256
+# A client that cannot take one message within this many seconds is evicted
+SEND_TIMEOUT = 10.0
+# Sent instead of the backlog when a client's queue overflows: the client
+# fetches /lots/{id}/changes?since=<its version> to catch up
+RESYNC_KEY = ("resync",)
+RESYNC_TEXT = json.dumps({"type": "resync"})
+
+
+def conflation_key(message: dict) -> Optional[Hashable]:
+    """
+    Messages with the same key replace each other while still queued:
+    a lagging client only needs the newest status of each slot.
+    """
+    if message.get("type") == "slot_update":
+        slot = message.get("slot") or {}
+        return ("slot", slot.get("id"))
+    return None
+
+
+class Subscriber:
+    """One WebSocket client with its own bounded queue and sender task."""
+
+    _unique = itertools.count()
+
+    def __init__(self, websocket: WebSocket, on_dead):
+        self.websocket = websocket
+        self.on_dead = on_dead
+        self.queue: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.task = asyncio.create_task(self._run())
+
+    def enqueue(self, key: Optional[Hashable], text: str):
+        """Queue an already serialized message; never blocks."""
+        if key is None:
+            key = ("msg", next(self._unique))
+        elif key in self.queue:
+            # Deliver only the newest payload, at the newest position: clients
+            # expect versions in increasing order and drop anything older
+            self.queue[key] = text
+            self.queue.move_to_end(key)
+            self.conflated += 1
+            return
+        if len(self.queue) >= MAX_QUEUED_MESSAGES:
+            # Too far behind to replay: drop the backlog and ask the client to resync
+            self.dropped += len(self.queue) + 1
+            self.queue.clear()
+            key, text = RESYNC_KEY, RESYNC_TEXT
+        self.queue[key] = text
+        self.wakeup.set()
+
+    async def _run(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                while self.queue:
+                    _, text = self.queue.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send_text(text), SEND_TIMEOUT)
+                    self.sent += 1
+                self.wakeup.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead or hopelessly slow client: drop it without affecting anyone else
+            logger.info(f"Evicting WebSocket client: {type(e).__name__}")
+            self.on_dead(self)
+
+    def close(self):
+        self.task.cancel()
+
+
+INTERNAL_CHANNEL = "~internal"  # worker-to-worker messages: listeners only, never sent to sockets
+
+
 class ConnectionManager:
-    def __init__(self):
-        # Map lot_id -> list of websockets
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, bus: Optional[BroadcastBus] = None):
+        # Map lot_id -> {websocket: subscriber} for sockets connected to this worker
+        self.active_connections: Dict[str, Dict[WebSocket, Subscriber]] = {}
+        self.evicted = 0
+        # Carries broadcasts between workers; every worker delivers to its own sockets
+        self.bus = bus or MemoryBus()
+        # Called with every decoded bus message, e.g. to keep in-memory indexes current
+        self.listeners: List[Callable[[dict], None]] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._publishing: Set[asyncio.Task] = set()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        await self.bus.start(self.deliver)
+
+    async def stop(self):
+        self.loop = None
+        await self.bus.stop()
 
     async def connect(self, websocket: WebSocket, lot_id: str):
         await websocket.accept()
-        if lot_id not in self.active_connections:
-            self.active_connections[lot_id] = []
-        self.active_connections[lot_id].append(websocket)
+        subscriber = Subscriber(websocket, lambda sub: self._evict(sub, lot_id))
+        self.active_connections.setdefault(lot_id, {})[websocket] = subscriber
 
     def disconnect(self, websocket: WebSocket, lot_id: str):
-        if lot_id in self.active_connections:
-            self.active_connections[lot_id].remove(websocket)
+        subscribers = self.active_connections.get(lot_id)
+        if not subscribers:
+            return
+        subscriber = subscribers.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.close()
+        if not subscribers:
+            del self.active_connections[lot_id]
+
+    def _evict(self, subscriber: Subscriber, lot_id: str):
+        self.evicted += 1
+        self.disconnect(subscriber.websocket, lot_id)
+        asyncio.create_task(self._close_quietly(subscriber.websocket))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
     async def broadcast(self, message: dict, lot_id: str):
-        if lot_id in self.active_connections:
-            for connection in self.active_connections[lot_id]:
-                await connection.send_json(message)
+        """Serialize once and publish to every worker's clients of the lot; does not wait for sends."""
+        await self.bus.publish(lot_id, json.dumps(message))
+
+    async def publish_internal(self, message: dict):
+        """Publish to every worker's listeners only, e.g. to invalidate in-memory state."""
+        await self.bus.publish(INTERNAL_CHANNEL, json.dumps(message))
+
+    def publish_internal_nowait(self, message: dict):
+        """
+        publish_internal from sync code on any thread (e.g. ORM events); does
+        not wait. A no-op before start(), when there is no bus to publish on.
+        """
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            task = self.loop.create_task(self._publish_internal_logged(message))
+            self._publishing.add(task)
+            task.add_done_callback(self._publishing.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(self._publish_internal_logged(message), self.loop)
+
+    async def _publish_internal_logged(self, message: dict):
+        try:
+            await self.publish_internal(message)
+        except Exception as e:
+            logger.error(f"Internal broadcast failed: {type(e).__name__}: {e}")
+
+    def deliver(self, lot_id: str, text: str):
+        """Bus handler: queue a serialized message for this worker's clients of the lot."""
+        subscribers = self.active_connections.get(lot_id) if lot_id != INTERNAL_CHANNEL else None
+        if not subscribers and not self.listeners:
+            return
+        message = json.loads(text)
+        for listener in self.listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                logger.error(f"Broadcast listener failed: {e}")
+        if not subscribers:
+            return
+        key = conflation_key(message)
+        for subscriber in subscribers.values():
+            subscriber.enqueue(key, text)
+
+    def stats(self) -> dict:
+        subscribers = [s for lot in self.active_connections.values() for s in lot.values()]
+        return {
+            "lots": len(self.active_connections),
+            "connections": len(subscribers),
+            "queued": sum(len(s.queue) for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "conflated": sum(s.conflated for s in subscribers),
+            "evicted": self.evicted,
+            "bus_dropped": getattr(self.bus, "dropped", 0),
+        }
 
-manager = ConnectionManager()
+manager = ConnectionManager(create_bus(
+    settings.BROADCAST_BACKEND,
+    socket_path=settings.BROADCAST_SOCKET_PATH,
+    redis_url=settings.REDIS_URL,
+))
 
 @router.websocket("/ws/lot/{lot_id}")
 async def websocket_endpoint(websocket: WebSocket, lot_id: str):
@@ -33,4 +210,6 @@ async def websocket_endpoint(websocket: WebSocket, lot_id: str):
             # Just keep connection open, we primarily push TO client
             data = await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, lot_id)
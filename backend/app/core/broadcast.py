@@ -0,0 +1,264 @@
+"""
+Broadcast bus behind the WebSocket ConnectionManager.
+
+A slot update may be handled by any uvicorn worker, while the WebSocket
+subscribers of that lot may be connected to other workers. Every worker
+publishes serialized messages to the bus and delivers whatever it receives
+from the bus to its own local sockets.
+
+Backends (BROADCAST_BACKEND):
+    memory  Single process; publish delivers directly to the local handler
+    unix    Workers on one host. The first worker that takes the lock file
+            runs a small broker on a Unix socket; every worker (including
+            the broker's) connects to it as a client. If the broker process
+            dies another worker takes the lock over and the rest reconnect.
+    redis   Redis pub/sub (redis.asyncio), for multiple hosts
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+from typing import Callable, Optional, Set
+
+from loguru import logger
+
+# Called with (channel, text) for every message received from the bus
+Handler = Callable[[str, str], None]
+
+RECONNECT_DELAY = 0.5         # seconds between broker reconnect attempts
+MAX_PEER_BUFFER = 16 * 1024 * 1024  # bytes queued to one worker before the broker drops it
+REDIS_CHANNEL_PREFIX = "parking:lot:"
+
+
+class BroadcastBus:
+    """Base class: subclasses implement `publish` (and `start`/`stop` if needed)."""
+
+    name = "base"
+
+    def __init__(self):
+        self.handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self.handler = handler
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, text: str):
+        raise NotImplementedError
+
+
+class MemoryBus(BroadcastBus):
+    """In-process bus for a single worker."""
+
+    name = "memory"
+
+    async def publish(self, channel: str, text: str):
+        if self.handler is not None:  # not started: nobody to deliver to
+            self.handler(channel, text)
+
+
+class UnixSocketBus(BroadcastBus):
+    """Host-local bus: newline-delimited JSON relayed by a broker on a Unix socket."""
+
+    name = "unix"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock_file = None
+        self._server = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._peer_tasks: Set[asyncio.Task] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connected = asyncio.Event()
+        self._task = None
+        self.dropped = 0  # messages not sent because the broker stopped reading
+        self._dropping = False
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning(f"Broadcast broker at {self.path} not reachable yet, retrying in background")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer:
+            self._writer.close()
+        if self._server:
+            self._server.close()
+            for peer in list(self._peers):
+                peer.close()
+            # The server does not wait for its connection handlers; let them see EOF and exit
+            await asyncio.gather(*self._peer_tasks, return_exceptions=True)
+        if self._lock_file:
+            self._lock_file.close()
+
+    async def publish(self, channel: str, text: str):
+        if self._writer is None:
+            # Broker is being re-elected: at least reach this worker's own clients
+            if self.handler is not None:
+                self.handler(channel, text)
+            return
+        if self._writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+            # Broker stalled: drop rather than buffer without bound or block the caller
+            if not self._dropping:
+                logger.warning(f"Broadcast broker at {self.path} stopped reading, dropping messages")
+                self._dropping = True
+            self.dropped += 1
+            return
+        self._dropping = False
+        self._writer.write(json.dumps({"channel": channel, "data": text}).encode() + b"\n")
+
+    # --- client side ---
+
+    async def _run(self):
+        while True:
+            try:
+                await self._ensure_broker()
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_PEER_BUFFER)
+                self._writer = writer
+                self._connected.set()
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    envelope = json.loads(line)
+                    self.handler(envelope["channel"], envelope["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Broadcast bus connection error: {type(e).__name__}: {e}")
+            self._writer = None
+            self._connected.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    # --- broker side ---
+
+    async def _ensure_broker(self):
+        """Become the broker if no live process holds the lock."""
+        if self._server is not None:
+            return
+        lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        # The lock is released by the OS when its holder dies, so any socket file left is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._lock_file = lock_file
+        self._server = await asyncio.start_unix_server(self._serve_peer, self.path, limit=MAX_PEER_BUFFER)
+        logger.info(f"Broadcast broker listening on {self.path} (pid {os.getpid()})")
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        task = asyncio.current_task()
+        self._peer_tasks.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for peer in list(self._peers):
+                    if peer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+                        logger.warning("Dropping a broadcast peer that stopped reading")
+                        self._peers.discard(peer)
+                        peer.close()
+                        continue
+                    peer.write(line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            self._peer_tasks.discard(task)
+            writer.close()
+
+
+class RedisBus(BroadcastBus):
+    """Redis pub/sub: one channel per lot, pattern-subscribed by every worker."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.url = url
+        self._redis = None
+        self._connected: Optional[asyncio.Event] = None
+        self._task = None
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        import redis.asyncio as redis
+
+        # a publish on a pooled connection that died with the server is retried once on a fresh one
+        self._redis = redis.from_url(self.url, retry_on_error=[redis.ConnectionError])
+        self._connected = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning(f"Redis at {self.url} not reachable yet, retrying in background")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._redis:
+            await self._redis.aclose()
+
+    async def publish(self, channel: str, text: str):
+        await self._redis.publish(REDIS_CHANNEL_PREFIX + channel, text)
+
+    async def _run(self):
+        """Subscribe and relay messages; on any error resubscribe after RECONNECT_DELAY."""
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(REDIS_CHANNEL_PREFIX + "*")
+                self._connected.set()
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+                    try:
+                        self.handler(channel, message["data"].decode())
+                    except Exception as e:
+                        logger.error(f"Broadcast handler failed: {type(e).__name__}: {e}")
+                logger.warning("Redis subscription ended, resubscribing")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Broadcast bus connection error: {type(e).__name__}: {e}")
+            finally:
+                self._connected.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+def create_bus(backend: str, socket_path: str = "", redis_url: str = "") -> BroadcastBus:
+    """Instantiate a bus by name ('memory', 'unix' or 'redis')."""
+    if backend == MemoryBus.name:
+        return MemoryBus()
+    if backend == UnixSocketBus.name:
+        return UnixSocketBus(socket_path)
+    if backend == RedisBus.name:
+        return RedisBus(redis_url)
+    raise ValueError(f"Unknown broadcast backend '{backend}' (choose from: memory, unix, redis)")
@@ -28,6 +28,24 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     
+    # Token revocation (logout, refresh rotation). REVOCATION_BLOOM puts a Bloom filter in front
+    # of the in-memory revoked ids to clear never-revoked tokens
+    REVOCATION_BLOOM: bool = os.getenv("REVOCATION_BLOOM", "False").lower() == "true"
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_PRUNE_INTERVAL: float = float(os.getenv("REVOCATION_PRUNE_INTERVAL", "300"))
+    
+    # Password hashing: bcrypt cost, dedicated hashing threads, and jobs allowed to wait
+    # for them before login/register answer 503
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    
+    # Auth caches (verified token claims, users). AUTH_STATELESS trusts the user claims in the
+    # access token, so deactivation only takes effect when the token expires
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "60"))
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    AUTH_STATELESS: bool = os.getenv("AUTH_STATELESS", "False").lower() == "true"
+    
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000", "http://localhost:8000"]
     
@@ -48,12 +66,39 @@ class Settings(BaseSettings):
     RAZORPAY_KEY_SECRET: str = os.getenv("RAZORPAY_KEY_SECRET", "")
     RAZORPAY_WEBHOOK_SECRET: str = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
     
+    # Bookings: minutes a pending (unpaid) booking holds its slot
+    BOOKING_HOLD_MINUTES: int = int(os.getenv("BOOKING_HOLD_MINUTES", "15"))
+    
     # ML Service Configuration
     ML_SERVICE_URL: str = os.getenv("ML_SERVICE_URL", "http://localhost:5000")
     
+    # WebSocket broadcast bus: memory (single worker), unix (workers on one host), redis
+    BROADCAST_BACKEND: str = os.getenv("BROADCAST_BACKEND", "memory")
+    BROADCAST_SOCKET_PATH: str = os.getenv("BROADCAST_SOCKET_PATH", "/tmp/parking-broadcast.sock")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    
+    # In-memory slot state (single API worker); flushed to the DB every interval (seconds)
+    SLOT_STORE_ENABLED: bool = os.getenv("SLOT_STORE_ENABLED", "True").lower() == "true"
+    SLOT_STORE_FLUSH_INTERVAL: float = float(os.getenv("SLOT_STORE_FLUSH_INTERVAL", "0.5"))
+    
+    # Slot status history: buffered bulk inserts; rows older than HISTORY_HOT_DAYS move to monthly archives
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+    HISTORY_HOT_DAYS: int = int(os.getenv("HISTORY_HOT_DAYS", "35"))
+    
+    # Occupancy rollups (analytics): run the engine in exactly one process; minute rows are pruned after N days
+    ROLLUP_ENGINE_ENABLED: bool = os.getenv("ROLLUP_ENGINE_ENABLED", "True").lower() == "true"
+    ROLLUP_MINUTE_RETENTION_DAYS: int = int(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", "7"))
+    
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "logs/app.log")
+    # "fast": one batched JSON-lines sink on stdout and sampled, single-line request logs.
+    # LOG_SAMPLE_RATES is "route=rate,..." with route templates, e.g. /api/v1/health=0.01
+    LOG_MODE: str = os.getenv("LOG_MODE", "standard")
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_DEFAULT_SAMPLE_RATE: float = float(os.getenv("LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+    LOG_DROP_SLOT_STATUS: bool = os.getenv("LOG_DROP_SLOT_STATUS", "True").lower() == "true"
+    LOG_FLUSH_INTERVAL: float = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
@@ -1,61 +1,220 @@
 """
 Logging configuration using Loguru for structured, production-ready logging.
+
+LOG_MODE=standard (default) writes every record to the colorized console, a
+rotating file, an error file and, in production, a JSON file.
+
+LOG_MODE=fast is meant for high request rates:
+- a single sink (`BatchedJSONSink`) queues records and a background thread
+  serializes them to JSON lines and writes them to stdout in batches;
+- request logs are one line per request with structured fields, sampled per
+  route (`RequestLogSampler`); slot-status requests can be dropped entirely
+  (LOG_DROP_SLOT_STATUS) and are still counted.
 """
 
+import atexit
+import json
+import random
 import sys
 import os
+import threading
+import traceback
+from collections import deque
 from pathlib import Path
+from typing import Dict, Optional
 from loguru import logger
 from app.core.config import settings
 
-# Remove default handler
-logger.remove()
+# Route templates of the ML service's slot-status posts
+SLOT_STATUS_ROUTES = (
+    f"{settings.API_V1_STR}/lots/{{lot_id}}/slots/{{slot_id}}/status",
+    f"{settings.API_V1_STR}/lots/{{lot_id}}/slots/status",
+)
 
-# Create logs directory if it doesn't exist
-log_dir = Path(settings.LOG_FILE).parent
-log_dir.mkdir(parents=True, exist_ok=True)
 
-# Console handler with color formatting (for development)
-logger.add(
-    sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level=settings.LOG_LEVEL,
-    colorize=True,
-)
+class BatchedJSONSink:
+    """
+    Loguru sink that only queues the record on the logging thread. A writer
+    thread formats queued records as JSON lines (extra fields included) and
+    writes each batch with a single write every `interval` seconds, or sooner
+    once `max_batch` records are waiting.
 
-# File handler with rotation (for production)
-logger.add(
-    settings.LOG_FILE,
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level=settings.LOG_LEVEL,
-    rotation="10 MB",  # Rotate when file reaches 10MB
-    retention="30 days",  # Keep logs for 30 days
-    compression="zip",  # Compress rotated logs
-    enqueue=True,  # Thread-safe logging
-)
+    At most `max_buffered` records wait for the writer; past that (a burst
+    the writer cannot keep up with, a stalled disk) the oldest are dropped
+    and counted.
+    """
 
-# Error file handler (separate file for errors)
-logger.add(
-    settings.LOG_FILE.replace(".log", "_error.log"),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    level="ERROR",
-    rotation="10 MB",
-    retention="60 days",  # Keep error logs longer
-    compression="zip",
-    enqueue=True,
-)
+    def __init__(self, stream, interval: float = 0.5, max_batch: int = 1000, max_buffered: int = 100_000):
+        self.stream = stream
+        self.interval = interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._records = deque(maxlen=max_buffered)
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def write(self, message):
+        if len(self._records) == self._records.maxlen:
+            self.dropped += 1  # append pushes out the oldest record
+        self._records.append(message.record)
+        if len(self._records) >= self.max_batch:
+            self._wake.set()
+
+    def stop(self):
+        """Called by loguru when the handler is removed, and at exit."""
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._drain()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        lines = []
+        while self._records:
+            lines.append(self._format(self._records.popleft()))
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._records), "dropped": self.dropped}
+
+    @staticmethod
+    def _format(record) -> str:
+        entry = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "logger": record["name"],
+            "message": record["message"],
+        }
+        entry.update(record["extra"])
+        if record["exception"] is not None:
+            entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+        return json.dumps(entry, default=str)
+
+
+class RequestLogSampler:
+    """
+    Decides which requests get a log line: `rates` maps route templates to
+    the fraction of their requests to log (0 = none); other routes use
+    `default`. Every request is counted, logged or not.
+    """
+
+    def __init__(self, rates: Dict[str, float], default: float = 1.0):
+        self.rates = rates
+        self.default = default
+        self.counts: Dict[str, list] = {}  # route -> [requests, logged]
+        self._routes: Dict[object, str] = {}  # endpoint -> route template
+
+    def route(self, scope) -> str:
+        """Route template of a handled request (set by the router in the scope)."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            self._routes = {
+                r.endpoint: r.path for r in getattr(app, "routes", ()) if hasattr(r, "endpoint") and hasattr(r, "path")
+            }
+            route = self._routes.setdefault(endpoint, scope["path"])
+        return route
+
+    def sample(self, route: str) -> bool:
+        counts = self.counts.get(route)
+        if counts is None:
+            counts = self.counts.setdefault(route, [0, 0])
+        counts[0] += 1
+        rate = self.rates.get(route, self.default)
+        if rate >= 1.0 or (rate > 0.0 and random.random() < rate):
+            counts[1] += 1
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {route: {"requests": n, "logged": logged} for route, (n, logged) in self.counts.items()}
 
-# JSON format for production (easier to parse)
-if settings.ENVIRONMENT == "production":
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """'route=rate,route=rate' -> {route: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, rate = item.rpartition("=")
+        rates[route.strip()] = float(rate)
+    return rates
+
+
+# Remove default handler
+logger.remove()
+
+request_log_sampler: Optional[RequestLogSampler] = None
+log_sink: Optional[BatchedJSONSink] = None
+
+if settings.LOG_MODE == "fast":
+    log_sink = BatchedJSONSink(sys.stdout, settings.LOG_FLUSH_INTERVAL)
     logger.add(
-        settings.LOG_FILE.replace(".log", "_json.log"),
+        log_sink,
         format="{message}",
         level=settings.LOG_LEVEL,
+    )
+    sample_rates = parse_sample_rates(settings.LOG_SAMPLE_RATES)
+    if settings.LOG_DROP_SLOT_STATUS:
+        sample_rates.update(dict.fromkeys(SLOT_STATUS_ROUTES, 0.0))
+    request_log_sampler = RequestLogSampler(sample_rates, settings.LOG_DEFAULT_SAMPLE_RATE)
+else:
+    # Create logs directory if it doesn't exist
+    log_dir = Path(settings.LOG_FILE).parent
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    # Console handler with color formatting (for development)
+    logger.add(
+        sys.stdout,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+        level=settings.LOG_LEVEL,
+        colorize=True,
+    )
+
+    # File handler with rotation (for production)
+    logger.add(
+        settings.LOG_FILE,
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        level=settings.LOG_LEVEL,
+        rotation="10 MB",  # Rotate when file reaches 10MB
+        retention="30 days",  # Keep logs for 30 days
+        compression="zip",  # Compress rotated logs
+        enqueue=True,  # Thread-safe logging
+    )
+
+    # Error file handler (separate file for errors)
+    logger.add(
+        settings.LOG_FILE.replace(".log", "_error.log"),
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        level="ERROR",
         rotation="10 MB",
-        retention="30 days",
+        retention="60 days",  # Keep error logs longer
         compression="zip",
-        serialize=True,  # JSON format
         enqueue=True,
     )
 
+    # JSON format for production (easier to parse)
+    if settings.ENVIRONMENT == "production":
+        logger.add(
+            settings.LOG_FILE.replace(".log", "_json.log"),
+            format="{message}",
+            level=settings.LOG_LEVEL,
+            rotation="10 MB",
+            retention="30 days",
+            compression="zip",
+            serialize=True,  # JSON format
+            enqueue=True,
+        )
+
 logger.info(f"Logging initialized - Level: {settings.LOG_LEVEL}, Environment: {settings.ENVIRONMENT}")
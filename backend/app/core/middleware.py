@@ -4,73 +4,83 @@ Custom middleware for request handling, logging, and error tracking.
 
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
 from loguru import logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.logging_config import RequestLogSampler
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Add unique request ID to each request for tracking."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
+class RequestContextMiddleware:
+    """
+    Request ID, timing, request logging and unhandled-error logging in one
+    pure ASGI layer.
 
+    Unlike BaseHTTPMiddleware it spawns no task and does not re-wrap the
+    response body stream, so streaming responses pass through untouched. The
+    `X-Request-ID` and `X-Process-Time` headers are added to the response
+    start message; the ID is also available as `request.state.request_id`.
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Log all requests and responses with timing information."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = getattr(request.state, "request_id", "unknown")
-        start_time = time.time()
-        
-        # Log request
-        logger.info(
-            f"Request started | ID: {request_id} | Method: {request.method} | "
-            f"Path: {request.url.path} | Client: {request.client.host if request.client else 'unknown'}"
-        )
-        
-        # Process request
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # Log response
+    With a `sampler` (LOG_MODE=fast) a request gets at most one log line,
+    emitted when the sampler picks its route or when it fails with a 5xx.
+    Its fields are passed as structured extras, not formatted into the
+    message.
+    """
+
+    def __init__(self, app: ASGIApp, sampler: Optional[RequestLogSampler] = None):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        start_time = time.perf_counter()
+        status_code = None
+        client = scope.get("client")
+
+        if self.sampler is None:
             logger.info(
-                f"Request completed | ID: {request_id} | Status: {response.status_code} | "
-                f"Duration: {process_time:.3f}s"
+                f"Request started | ID: {request_id} | Method: {scope['method']} | "
+                f"Path: {scope['path']} | Client: {client[0] if client else 'unknown'}"
             )
-            
-            # Add timing header
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            return response
-            
-        except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(
-                f"Request failed | ID: {request_id} | Error: {str(e)} | "
-                f"Duration: {process_time:.3f}s"
-            )
-            raise
 
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+            await send(message)
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Catch and log unhandled exceptions."""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_with_headers)
         except Exception as e:
-            request_id = getattr(request.state, "request_id", "unknown")
             logger.exception(
-                f"Unhandled exception | ID: {request_id} | Path: {request.url.path} | "
-                f"Error: {str(e)}"
+                f"Unhandled exception | ID: {request_id} | Path: {scope['path']} | "
+                f"Error: {str(e)} | Duration: {time.perf_counter() - start_time:.3f}s"
             )
             raise
+
+        if self.sampler is None:
+            logger.info(
+                f"Request completed | ID: {request_id} | Status: {status_code} | "
+                f"Duration: {time.perf_counter() - start_time:.3f}s"
+            )
+            return
+        route = self.sampler.route(scope)
+        if self.sampler.sample(route) or (status_code or 500) >= 500:
+            logger.info(
+                "request",
+                request_id=request_id,
+                method=scope["method"],
+                path=scope["path"],
+                route=route,
+                status=status_code,
+                duration_ms=round((time.perf_counter() - start_time) * 1000, 2),
+                client=client[0] if client else None,
+            )
@@ -1,25 +1,133 @@
 """
 Security utilities for authentication and authorization.
 Handles password hashing, JWT token creation/validation, and user authentication.
+
+Authenticated requests avoid the database on the hot path:
+- verified token claims are cached per token (never past the token's `exp`);
+- users are cached as detached `AuthenticatedUser` snapshots, dropped on every
+  worker (internal bus channel) once an ORM update or delete of the User row
+  commits;
+- with AUTH_STATELESS the snapshot is built from the token claims alone.
+
+bcrypt runs on its own bounded thread pool (`password_hasher`), never on the
+event loop or the threadpool shared by sync endpoints.
 """
 
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.db import models, session
+from app.db.revocation import revocation_list
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context; hashes with other rounds are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+# token -> verified claims, user id -> AuthenticatedUser
+token_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """The user fields request handlers need, detached from any session."""
+    id: str
+    email: str
+    name: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "AuthenticatedUser":
+        return cls(user.id, user.email, user.name, user.is_active is not False, user.created_at)
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["AuthenticatedUser"]:
+        """None for tokens issued without the user claims (see `user_claims`)."""
+        if "email" not in payload or "active" not in payload:
+            return None
+        created = payload.get("created")
+        return cls(
+            payload["sub"], payload["email"], payload.get("name"), bool(payload["active"]),
+            datetime.fromisoformat(created) if created else None,
+        )
+
+
+def user_claims(user: models.User) -> dict:
+    """User fields carried by access tokens for AUTH_STATELESS."""
+    return {
+        "email": user.email,
+        "name": user.name,
+        "active": user.is_active is not False,
+        "created": user.created_at.isoformat() if user.created_at else None,
+    }
+
+
+def invalidate_user(user_id: str):
+    """Drop a cached user on this worker; the next request reloads it."""
+    user_cache.pop(user_id)
+
+
+# Publishes on the broadcast bus's internal channel from sync code on any
+# thread; set by main.py's lifespan. None: invalidations stay on this worker.
+publish_internal: Optional[Callable[[dict], None]] = None
+
+
+def publish_user_invalidation(user_id: str):
+    """Drop a cached user on every worker. Call it after the change is committed."""
+    invalidate_user(user_id)
+    if publish_internal is not None:
+        publish_internal({"type": "user_invalidated", "user_id": user_id})
+
+
+def on_message(message: dict):
+    """Broadcast bus listener: drop users changed on other workers."""
+    if message.get("type") == "user_invalidated" and message.get("user_id"):
+        invalidate_user(message["user_id"])
+
+
+# Changed users are collected per session at flush and invalidated once the
+# transaction commits: dropping them at flush would let a concurrent request
+# re-cache the old row before the commit, and a rollback changes nothing.
+CHANGED_USERS = "changed_user_ids"
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    # Bulk query.update()/delete() bypass these events; call publish_user_invalidation() there
+    db = object_session(target)
+    if db is not None:
+        db.info.setdefault(CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _users_committed(db):
+    for user_id in db.info.pop(CHANGED_USERS, ()):
+        publish_user_invalidation(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _users_rolled_back(db):
+    db.info.pop(CHANGED_USERS, None)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -31,6 +139,49 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """
+    Password hashing on a dedicated, size-limited thread pool (bcrypt releases
+    the GIL, so the workers hash in parallel). At most `workers + max_queue`
+    jobs are accepted; beyond that calls fail fast with 503 instead of
+    queueing without bound.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.limit = workers + max_queue
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-in requests, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple:
+        """(valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+        return await self.run(pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
@@ -48,7 +199,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -65,7 +216,7 @@ def create_refresh_token(data: dict) -> str:
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -94,16 +245,28 @@ def decode_token(token: str) -> dict:
         )
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(session.get_db)
-) -> models.User:
+def verified_claims(token: str) -> dict:
+    """
+    `decode_token` with a cache: a token's signature is checked once, and its
+    claims are reused until the cache TTL or the token's expiry, whichever
+    comes first.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        token_cache.set(token, payload, payload["exp"] - time.time() if "exp" in payload else None)
+    return payload
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
     """
     Dependency to get the current authenticated user from JWT token.
     
+    Served from the caches (or the token claims with AUTH_STATELESS) and the
+    in-memory revocation list; only a cache miss reads the users table.
+    
     Args:
         token: JWT token from request header
-        db: Database session
         
     Returns:
         Current authenticated user
@@ -117,29 +280,40 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = decode_token(token)
-        user_id: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        
-        if user_id is None or token_type != "access":
-            raise credentials_exception
-            
-    except JWTError:
+    payload = verified_claims(token)
+    user_id: str = payload.get("sub")
+    token_type: str = payload.get("type")
+    if user_id is None or token_type != "access":
         raise credentials_exception
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if settings.AUTH_STATELESS:
+        user = AuthenticatedUser.from_claims(payload)
+        if user is not None:
+            return user
+    
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        async with session.AsyncSessionLocal() as db:
+            record = await db.get(models.User, user_id)
+            if record is None:
+                raise credentials_exception
+            user = AuthenticatedUser.from_model(record)
+        user_cache.set(user_id, user)
     
     return user
 
 
-def get_current_active_user(
-    current_user: models.User = Depends(get_current_user)
-) -> models.User:
+async def get_current_active_user(
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
     """
-    Dependency to get current active user (can be extended with is_active check).
+    Dependency to get the current user, rejecting deactivated accounts.
     
     Args:
         current_user: Current authenticated user
@@ -147,25 +321,39 @@ def get_current_active_user(
     Returns:
         Current active user
     """
-    # Can add additional checks here (e.g., user.is_active)
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
     return current_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[models.User]:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[models.User]:
     """
     Authenticate a user by email and password.
     
+    The hash is verified on `password_hasher`; a hash made with other cost
+    parameters than BCRYPT_ROUNDS is replaced by a fresh one.
+    
     Args:
-        db: Database session
+        db: Async database session
         email: User email
         password: Plain text password
         
     Returns:
         User object if authentication successful, None otherwise
+    
+    Raises:
+        HTTPException: 503 if the hashing pool is saturated
     """
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = (await db.execute(select(models.User).where(models.User.email == email))).scalar()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
@@ -0,0 +1,261 @@
+"""
+In-memory availability search across lots.
+
+Each lot gives its slots bit positions ordered by (rate_per_hour, id) (a slot
+created later is inserted at its place, shifting the bits above it), and
+keeps two kinds of Python int bitsets:
+
+    free      slots that are active and currently free
+    by_type   slot_type -> slots of that type
+
+The free slots of a type are `free & by_type[type]`. Walking the set bits from
+the lowest one visits them cheapest first.
+
+Lots sit on a uniform lat/lon grid (GRID_CELL_DEG) keyed by the
+"lat,lon" geo_location. A search only visits the grid cells under the bounding
+box of its radius, so its cost depends on how many lots are nearby, not on how
+many lots exist.
+
+The index follows slot_update messages on the broadcast bus, so every worker
+stays current whichever worker handled an update. Candidate slots are also
+checked against the booking index for the requested window.
+"""
+
+import bisect
+import heapq
+import math
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.db import models
+from app.db.session import SessionLocal
+
+GRID_CELL_DEG = 0.05      # ~5.5 km of latitude per cell
+EARTH_RADIUS_KM = 6371.0
+SORT_ORDERS = ("distance", "price")
+
+LatLon = Tuple[float, float]
+# (slot_id, start, end) -> bookable?
+BookingCheck = Callable[[int, datetime, datetime], bool]
+
+
+def parse_geo(value: Optional[str]) -> Optional[LatLon]:
+    """'lat,lon' -> (lat, lon), or None if it is not a coordinate pair."""
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def haversine_km(a: LatLon, b: LatLon) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def grid_cell(position: LatLon) -> Tuple[int, int]:
+    return math.floor(position[0] / GRID_CELL_DEG), math.floor(position[1] / GRID_CELL_DEG)
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Positions of the set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def insert_bit(mask: int, i: int) -> int:
+    """Open an unset bit at position i, moving the bits at i and above up by one."""
+    low = mask & ((1 << i) - 1)
+    return low | ((mask >> i) << (i + 1))
+
+
+class LotAvailability:
+    __slots__ = ("lot_id", "name", "position", "slot_ids", "names", "rates", "types", "index", "free", "by_type")
+
+    def __init__(self, lot_id: int, name: str, position: Optional[LatLon]):
+        self.lot_id = lot_id
+        self.name = name
+        self.position = position
+        self.slot_ids: List[int] = []
+        self.names: List[str] = []
+        self.rates: List[float] = []
+        self.types: List[str] = []
+        self.index: Dict[int, int] = {}
+        self.free = 0
+        self.by_type: Dict[str, int] = {}
+
+    def add_slot(self, slot_id: int, name: str, slot_type: str, rate: float, free: bool):
+        i = len(self.slot_ids)
+        if i and (rate, slot_id) < (self.rates[-1], self.slot_ids[-1]):
+            # Keep bit positions in rate order: search relies on it
+            i = bisect.bisect(list(zip(self.rates, self.slot_ids)), (rate, slot_id))
+            self.free = insert_bit(self.free, i)
+            self.by_type = {t: insert_bit(mask, i) for t, mask in self.by_type.items()}
+            for j in range(i, len(self.slot_ids)):
+                self.index[self.slot_ids[j]] = j + 1
+        self.slot_ids.insert(i, slot_id)
+        self.names.insert(i, name)
+        self.rates.insert(i, rate)
+        self.types.insert(i, slot_type)
+        self.index[slot_id] = i
+        self.by_type[slot_type] = self.by_type.get(slot_type, 0) | (1 << i)
+        self.set_free(i, free)
+
+    def set_free(self, i: int, free: bool):
+        if free:
+            self.free |= 1 << i
+        else:
+            self.free &= ~(1 << i)
+
+    def free_mask(self, slot_type: Optional[str]) -> int:
+        if slot_type is None:
+            return self.free
+        return self.free & self.by_type.get(slot_type, 0)
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.lots: Dict[int, LotAvailability] = {}
+        self.grid: Dict[Tuple[int, int], Set[int]] = {}
+        self.slot_lot: Dict[int, int] = {}
+        self.inactive: Set[int] = set()
+        self._lock = threading.Lock()  # lot/slot creation runs in the threadpool
+
+    def load(self):
+        """Rebuild from the database (column projections, slots ordered by rate)."""
+        db = SessionLocal()
+        try:
+            lots = db.query(models.ParkingLot.id, models.ParkingLot.name, models.ParkingLot.geo_location).all()
+            slots = db.query(
+                models.Slot.id, models.Slot.lot_id, models.Slot.name, models.Slot.slot_type,
+                models.Slot.rate_per_hour, models.Slot.is_active, models.Slot.status,
+            ).order_by(models.Slot.rate_per_hour, models.Slot.id).all()
+        finally:
+            db.close()
+        with self._lock:
+            self.lots, self.grid, self.slot_lot, self.inactive = {}, {}, {}, set()
+            for lot_id, name, geo_location in lots:
+                self._add_lot(lot_id, name, geo_location)
+            for row in slots:
+                self._add_slot(*row)
+        logger.info(f"Availability index loaded: {len(lots)} lots, {len(slots)} slots")
+
+    def add_lot(self, lot):
+        with self._lock:
+            self._add_lot(lot.id, lot.name, lot.geo_location)
+
+    def add_slot(self, slot):
+        with self._lock:
+            self._add_slot(slot.id, slot.lot_id, slot.name, slot.slot_type, slot.rate_per_hour,
+                           slot.is_active, slot.status)
+
+    def _add_lot(self, lot_id: int, name: str, geo_location: Optional[str]):
+        position = parse_geo(geo_location)
+        self.lots[lot_id] = LotAvailability(lot_id, name, position)
+        if position is not None:
+            self.grid.setdefault(grid_cell(position), set()).add(lot_id)
+
+    def _add_slot(self, slot_id, lot_id, name, slot_type, rate, is_active, status):
+        lot = self.lots.get(lot_id)
+        if lot is None or slot_id in lot.index:
+            return
+        active = is_active is not False
+        if not active:
+            self.inactive.add(slot_id)
+        lot.add_slot(slot_id, name, slot_type or "regular", rate or 0.0, active and (status or "free") == "free")
+        self.slot_lot[slot_id] = lot_id
+
+    # --- updates ---
+
+    def set_status(self, slot_id: int, status: str):
+        with self._lock:
+            lot = self.lots.get(self.slot_lot.get(slot_id))
+            if lot is not None:
+                lot.set_free(lot.index[slot_id], status == "free" and slot_id not in self.inactive)
+
+    def on_message(self, message: dict):
+        """Broadcast bus listener: follow slot status updates from every worker."""
+        if message.get("type") == "slot_update":
+            slot = message.get("slot") or {}
+            if slot.get("id") is not None and slot.get("status"):
+                self.set_status(slot["id"], slot["status"])
+
+    # --- search ---
+
+    def lots_near(self, position: LatLon, radius_km: float) -> List[Tuple[float, LotAvailability]]:
+        """(distance, lot) for the lots within `radius_km`, nearest first."""
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(position[0])), 0.01))
+        lat0, lon0 = grid_cell((position[0] - dlat, position[1] - dlon))
+        lat1, lon1 = grid_cell((position[0] + dlat, position[1] + dlon))
+        found = []
+        for cell_lat in range(lat0, lat1 + 1):
+            for cell_lon in range(lon0, lon1 + 1):
+                for lot_id in self.grid.get((cell_lat, cell_lon), ()):
+                    lot = self.lots[lot_id]
+                    distance = haversine_km(position, lot.position)
+                    if distance <= radius_km:
+                        found.append((distance, lot))
+        found.sort(key=lambda item: (item[0], item[1].lot_id))
+        return found
+
+    def search(self, start: datetime, end: datetime, bookable: BookingCheck, near: Optional[LatLon] = None,
+               radius_km: float = 5.0, slot_type: Optional[str] = None, limit: int = 10,
+               sort: str = "distance") -> List[dict]:
+        """
+        Up to `limit` slots that are free now and bookable for [start, end).
+        sort="distance": nearest lots first, cheapest slots first within a lot.
+        sort="price": cheapest slots first, nearest first on equal rates.
+        Without `near` every lot is a candidate and results are sorted by price.
+        """
+        with self._lock:
+            if near is None:
+                candidates = [(None, lot) for lot in self.lots.values()]
+                sort = "price"
+            else:
+                candidates = self.lots_near(near, radius_km)
+
+            results = []
+            for distance, lot in candidates:
+                taken = 0
+                for i in iter_bits(lot.free_mask(slot_type)):
+                    if not bookable(lot.slot_ids[i], start, end):
+                        continue
+                    results.append((lot.rates[i], distance, lot, i))
+                    taken += 1
+                    # Bits are in rate order: later slots of this lot cannot rank higher
+                    if taken == limit or (sort == "distance" and len(results) == limit):
+                        break
+                if sort == "distance" and len(results) == limit:
+                    break
+
+            if sort == "price":
+                results = heapq.nsmallest(
+                    limit, results,
+                    key=lambda r: (r[0], r[1] if r[1] is not None else 0.0, r[2].slot_ids[r[3]]),
+                )
+            hours = (end - start).total_seconds() / 3600
+            return [
+                {
+                    "slot_id": lot.slot_ids[i],
+                    "slot_name": lot.names[i],
+                    "slot_type": lot.types[i],
+                    "rate_per_hour": rate,
+                    "estimated_cost": round(rate * hours, 2),
+                    "lot_id": lot.lot_id,
+                    "lot_name": lot.name,
+                    "distance_km": round(distance, 3) if distance is not None else None,
+                }
+                for rate, distance, lot, i in results
+            ]
+
+
+availability_index = AvailabilityIndex()
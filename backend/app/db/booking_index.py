@@ -0,0 +1,264 @@
+"""
+In-memory booking interval index.
+
+Each slot keeps its active bookings as three parallel lists sorted by start
+time (starts, ends, entries). Bookings of one slot never overlap, so the ends
+are sorted too. The bookings overlapping [t1, t2) form the contiguous run
+
+    bisect_right(ends, t1) .. bisect_left(starts, t2) - 1
+
+so "is slot X free for [t1, t2)?" takes two binary searches.
+
+A pending booking (Razorpay order created, not paid yet) holds its slot for
+BOOKING_HOLD_MINUTES. Expired holds stay in the lists until a new booking
+needs their place; then they are dropped.
+
+A reservation runs under its slot's lock:
+1. Check the index.
+2. Lock the Slot row (SELECT ... FOR UPDATE), so reservations of one slot
+   from other workers wait for this transaction.
+3. Insert the pending Booking.
+4. Re-check the database through the (slot_id, start_time, end_time) index in
+   the same transaction. This catches bookings made by other workers.
+5. Add the booking to the index.
+
+The row lock is what makes step 4 safe across workers on Postgres (READ
+COMMITTED): the second transaction waits for the first to commit and then
+sees its booking. SQLite has no FOR UPDATE, but it serializes writers, which
+gives the same guarantee.
+
+Confirming a payment runs the same locked database check under the slot's
+lock: if the hold expired and another booking took the window in the
+meantime, the booking is marked refund_required instead of paid.
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+
+ACTIVE_STATUSES = ("pending", "paid")
+
+
+class BookingEntry:
+    __slots__ = ("booking_id", "start", "end", "hold_until")
+
+    def __init__(self, booking_id: int, start: datetime, end: datetime, hold_until: Optional[datetime]):
+        self.booking_id = booking_id
+        self.start = start
+        self.end = end
+        self.hold_until = hold_until  # None once paid
+
+    def expired(self, now: datetime) -> bool:
+        return self.hold_until is not None and self.hold_until <= now
+
+
+class SlotBookings:
+    """Non-overlapping bookings of one slot, sorted by start time."""
+
+    __slots__ = ("starts", "ends", "entries", "lock")
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.entries: List[BookingEntry] = []
+        self.lock = threading.Lock()
+
+    def overlapping(self, start: datetime, end: datetime) -> range:
+        return range(bisect.bisect_right(self.ends, start), bisect.bisect_left(self.starts, end))
+
+    def is_free(self, start: datetime, end: datetime, now: datetime) -> bool:
+        return all(self.entries[i].expired(now) for i in self.overlapping(start, end))
+
+    def add(self, entry: BookingEntry, now: datetime) -> bool:
+        """Insert `entry` in place of any expired holds; False if a live booking overlaps it."""
+        if not self.is_free(entry.start, entry.end, now):
+            return False
+        for i in reversed(self.overlapping(entry.start, entry.end)):
+            self._delete(i)
+        i = bisect.bisect_left(self.starts, entry.start)
+        self.starts.insert(i, entry.start)
+        self.ends.insert(i, entry.end)
+        self.entries.insert(i, entry)
+        return True
+
+    def find(self, booking_id: int, start: datetime) -> Optional[int]:
+        i = bisect.bisect_left(self.starts, start)
+        if i < len(self.entries) and self.entries[i].booking_id == booking_id:
+            return i
+        return None
+
+    def remove(self, booking_id: int, start: datetime):
+        i = self.find(booking_id, start)
+        if i is not None:
+            self._delete(i)
+
+    def _delete(self, i: int):
+        del self.starts[i], self.ends[i], self.entries[i]
+
+
+class BookingIndex:
+    def __init__(self, hold_minutes: int = 15):
+        self.hold = timedelta(minutes=hold_minutes)
+        self.slots: Dict[int, SlotBookings] = {}
+        self.slot_meta: Dict[int, Tuple[int, str, bool]] = {}   # slot_id -> (lot_id, slot_type, is_active)
+        self.by_lot_type: Dict[Tuple[int, str], List[int]] = {}  # sorted slot ids
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Rebuild the index from the slots and the bookings that have not ended."""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            slots = db.query(
+                models.Slot.id, models.Slot.lot_id, models.Slot.slot_type, models.Slot.is_active
+            ).order_by(models.Slot.id).all()
+            bookings = db.query(models.Booking).filter(
+                models.Booking.status.in_(ACTIVE_STATUSES),
+                models.Booking.start_time.isnot(None),
+                models.Booking.end_time > now,
+            ).order_by(models.Booking.start_time).all()
+        finally:
+            db.close()
+        with self._lock:
+            self.slots, self.slot_meta, self.by_lot_type = {}, {}, {}
+            for row in slots:
+                self._add_slot(*row)
+        loaded = 0
+        for booking in bookings:
+            entry = self._entry(booking)
+            if entry.expired(now):
+                continue
+            if not self._bookings(booking.slot_id).add(entry, now):
+                logger.warning(f"Booking {booking.id} overlaps another booking of slot {booking.slot_id}, skipped")
+                continue
+            loaded += 1
+        logger.info(f"Booking index loaded: {len(slots)} slots, {loaded} active bookings")
+
+    def add_slot(self, slot):
+        with self._lock:
+            self._add_slot(slot.id, slot.lot_id, slot.slot_type, slot.is_active)
+
+    def _add_slot(self, slot_id: int, lot_id: int, slot_type: Optional[str], is_active: Optional[bool]):
+        slot_type = slot_type or "regular"
+        self.slot_meta[slot_id] = (lot_id, slot_type, is_active is not False)
+        bisect.insort(self.by_lot_type.setdefault((lot_id, slot_type), []), slot_id)
+
+    def _bookings(self, slot_id: int) -> SlotBookings:
+        bookings = self.slots.get(slot_id)
+        if bookings is None:
+            with self._lock:
+                bookings = self.slots.setdefault(slot_id, SlotBookings())
+        return bookings
+
+    def _entry(self, booking) -> BookingEntry:
+        hold_until = booking.created_at + self.hold if booking.status == "pending" else None
+        return BookingEntry(booking.id, booking.start_time, booking.end_time, hold_until)
+
+    # --- queries ---
+
+    def is_free(self, slot_id: int, start: datetime, end: datetime) -> bool:
+        bookings = self.slots.get(slot_id)
+        if bookings is None:
+            return True
+        with bookings.lock:
+            return bookings.is_free(start, end, datetime.utcnow())
+
+    def first_free(self, lot_id: int, slot_type: str, start: datetime, end: datetime) -> Optional[int]:
+        """Lowest-id active slot of `slot_type` in the lot that is free for [start, end)."""
+        for slot_id in self.by_lot_type.get((lot_id, slot_type), ()):
+            if self.slot_meta[slot_id][2] and self.is_free(slot_id, start, end):
+                return slot_id
+        return None
+
+    # --- reservations ---
+
+    def reserve(self, db: Session, slot_id: int, user_id: str, start: datetime, end: datetime,
+                amount: float) -> Optional[models.Booking]:
+        """Atomically create a pending booking, or return None if [start, end) is taken."""
+        bookings = self._bookings(slot_id)
+        with bookings.lock:
+            now = datetime.utcnow()
+            if not bookings.is_free(start, end, now):
+                return None
+            self._lock_slot(db, slot_id)
+            booking = models.Booking(
+                slot_id=slot_id, user_id=user_id, start_time=start, end_time=end,
+                amount=amount, status="pending", created_at=now,
+            )
+            db.add(booking)
+            db.flush()
+            if self._clash(db, booking, now) is not None:
+                db.rollback()
+                return None
+            db.commit()
+            db.refresh(booking)
+            bookings.add(self._entry(booking), now)
+            return booking
+
+    @staticmethod
+    def _lock_slot(db: Session, slot_id: int):
+        """Serialize this transaction's booking checks for the slot with other workers'."""
+        db.query(models.Slot.id).filter(models.Slot.id == slot_id).with_for_update().first()
+
+    def _clash(self, db: Session, booking: models.Booking, now: datetime) -> Optional[int]:
+        """Id of another live booking of the slot overlapping `booking`, from the database."""
+        row = db.query(models.Booking.id).filter(
+            models.Booking.slot_id == booking.slot_id,
+            models.Booking.id != booking.id,
+            models.Booking.start_time < booking.end_time,
+            models.Booking.end_time > booking.start_time,
+            or_(
+                models.Booking.status == "paid",
+                and_(models.Booking.status == "pending", models.Booking.created_at > now - self.hold),
+            ),
+        ).first()
+        return row[0] if row is not None else None
+
+    def confirm_payment(self, db: Session, booking: models.Booking, payment_id: str) -> bool:
+        """
+        Mark a pending booking paid. Its hold may have expired before the
+        payment arrived and the window been booked by someone else; then the
+        booking is marked refund_required instead and False is returned.
+        """
+        if booking.status == "paid":
+            return True
+        bookings = self._bookings(booking.slot_id)
+        with bookings.lock:
+            booking.razorpay_payment_id = payment_id
+            self._lock_slot(db, booking.slot_id)
+            clash = self._clash(db, booking, datetime.utcnow()) if booking.start_time is not None else None
+            if clash is not None:
+                booking.status = "refund_required"
+                db.commit()
+                bookings.remove(booking.id, booking.start_time)
+                logger.warning(
+                    f"Payment {payment_id} for booking {booking.id} arrived after its hold expired; "
+                    f"slot {booking.slot_id} was taken by booking {clash}, refund required"
+                )
+                return False
+            booking.status = "paid"
+            db.commit()
+            # A paid booking keeps its slot for good
+            i = bookings.find(booking.id, booking.start_time)
+            if i is not None:
+                bookings.entries[i].hold_until = None
+            elif booking.start_time is not None and not bookings.add(self._entry(booking), datetime.utcnow()):
+                logger.warning(f"Paid booking {booking.id} overlaps another booking of slot {booking.slot_id}")
+            return True
+
+    def release(self, booking):
+        bookings = self._bookings(booking.slot_id)
+        with bookings.lock:
+            bookings.remove(booking.id, booking.start_time)
+
+
+booking_index = BookingIndex(settings.BOOKING_HOLD_MINUTES)
@@ -0,0 +1,226 @@
+"""
+Append-only slot status history (models.SlotStatus).
+
+Request handlers only call `history_writer.record(...)`, which appends to an
+in-memory buffer. A background task bulk-inserts the buffer every
+HISTORY_FLUSH_INTERVAL seconds (or as soon as HISTORY_BATCH_SIZE rows are
+waiting) with one executemany INSERT per flush.
+
+Storage is split by time so the hot table stays small:
+
+    slot_status            recent rows (at least HISTORY_HOT_DAYS days)
+    slot_status_YYYY_MM    one archive table per month
+
+Rolling compaction runs every HISTORY_COMPACT_INTERVAL seconds and moves
+whole months that are older than the hot window into their archive table,
+one day per transaction. Every table has a (slot_id, timestamp) index.
+`fetch_history` reads a time range across the hot table and the archives.
+"""
+
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from loguru import logger
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, insert, inspect, select, union_all
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal, async_engine
+
+HISTORY_BATCH_SIZE = 5000           # flush early once this many rows are buffered
+HISTORY_MAX_BUFFERED = 500_000      # beyond this the oldest rows are dropped (and counted)
+HISTORY_COMPACT_INTERVAL = 3600.0   # seconds between compaction passes
+ARCHIVE_PREFIX = "slot_status_"
+
+_archive_metadata = MetaData()
+
+
+def archive_name(year: int, month: int) -> str:
+    return f"{ARCHIVE_PREFIX}{year:04d}_{month:02d}"
+
+
+def archive_table(year: int, month: int) -> Table:
+    """Table object for one monthly archive (same columns as slot_status)."""
+    name = archive_name(year, month)
+    if name in _archive_metadata.tables:
+        return _archive_metadata.tables[name]
+    return Table(
+        name, _archive_metadata,
+        Column("id", Integer, primary_key=True),
+        Column("slot_id", Integer),
+        Column("status", String),
+        Column("timestamp", DateTime),
+        Column("source", String),
+        Index(f"ix_{name}_slot_id_timestamp", "slot_id", "timestamp"),
+    )
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(moment: datetime) -> datetime:
+    return (month_start(moment) + timedelta(days=32)).replace(day=1)
+
+
+class SlotHistoryWriter:
+    def __init__(self, flush_interval: float = 1.0, hot_days: int = 35):
+        self.flush_interval = flush_interval
+        self.hot_days = hot_days
+        self._buffer = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._tasks = []
+        self.stats = {"recorded": 0, "flushed": 0, "dropped": 0, "flush_errors": 0, "archived": 0}
+
+    # --- request path ---
+
+    def record(self, slot_id: int, status: str, timestamp: Optional[datetime] = None, source: str = "ml"):
+        """Buffer one accepted transition (never touches the database)."""
+        if len(self._buffer) >= HISTORY_MAX_BUFFERED:
+            self._buffer.popleft()
+            self.stats["dropped"] += 1
+        self._buffer.append({
+            "slot_id": slot_id,
+            "status": status,
+            "timestamp": timestamp or datetime.utcnow(),
+            "source": source,
+        })
+        self.stats["recorded"] += 1
+        if len(self._buffer) >= HISTORY_BATCH_SIZE:
+            self._wakeup.set()
+
+    # --- lifecycle ---
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._flush_loop()), asyncio.create_task(self._compact_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        # let an in-flight flush put its batch back before the final one
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+
+    # --- background flush ---
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), HISTORY_BATCH_SIZE))]
+                committed = False
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(insert(models.SlotStatus), batch)
+                        await db.commit()
+                        committed = True
+                except Exception as e:
+                    logger.error(f"Slot history flush failed, will retry: {e}")
+                    self.stats["flush_errors"] += 1
+                    self._buffer.extendleft(reversed(batch))
+                    return
+                except BaseException:
+                    # cancelled mid-write: keep the batch for the next flush
+                    if not committed:
+                        self._buffer.extendleft(reversed(batch))
+                    raise
+                self.stats["flushed"] += len(batch)
+
+    # --- rolling compaction ---
+
+    async def _compact_loop(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Slot history compaction failed: {e}")
+            await asyncio.sleep(HISTORY_COMPACT_INTERVAL)
+
+    async def compact(self, now: Optional[datetime] = None):
+        """Move whole months older than the hot window into their archive tables."""
+        cutoff = month_start((now or datetime.utcnow()) - timedelta(days=self.hot_days))
+        hot = models.SlotStatus.__table__
+        while True:
+            async with AsyncSessionLocal() as db:
+                oldest = (await db.execute(
+                    select(hot.c.timestamp).where(hot.c.timestamp < cutoff).order_by(hot.c.timestamp).limit(1)
+                )).scalar()
+            if oldest is None:
+                return
+            start = month_start(oldest)
+            archive = archive_table(start.year, start.month)
+            async with async_engine.begin() as conn:
+                await conn.run_sync(archive.create, checkfirst=True)
+
+            # One day per transaction keeps write locks short on large months
+            day = start
+            end = next_month(start)
+            while day < end:
+                day_end = min(day + timedelta(days=1), end)
+                async with AsyncSessionLocal() as db:
+                    in_day = (hot.c.timestamp >= day) & (hot.c.timestamp < day_end)
+                    moved = await db.execute(
+                        insert(archive).from_select(
+                            ["id", "slot_id", "status", "timestamp", "source"],
+                            select(hot.c.id, hot.c.slot_id, hot.c.status, hot.c.timestamp, hot.c.source)
+                            .where(in_day)
+                        )
+                    )
+                    await db.execute(hot.delete().where(in_day))
+                    await db.commit()
+                self.stats["archived"] += max(moved.rowcount or 0, 0)
+                day = day_end
+            logger.info(f"Archived slot history for {start:%Y-%m} into {archive.name}")
+
+
+async def archive_tables() -> List[Table]:
+    """All monthly archive tables in the database, oldest first."""
+    async with async_engine.connect() as conn:
+        names = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+    tables = []
+    for name in sorted(names):
+        suffix = name[len(ARCHIVE_PREFIX):]
+        if name.startswith(ARCHIVE_PREFIX) and len(suffix) == 7 and suffix[:4].isdigit() and suffix[5:].isdigit():
+            tables.append(archive_table(int(suffix[:4]), int(suffix[5:])))
+    return tables
+
+
+async def existing_archives(start: datetime, end: datetime) -> List[Table]:
+    """Archive tables that exist for months overlapping [start, end)."""
+    async with async_engine.connect() as conn:
+        names = set(await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names()))
+    tables = []
+    month = month_start(start)
+    while month < end:
+        if archive_name(month.year, month.month) in names:
+            tables.append(archive_table(month.year, month.month))
+        month = next_month(month)
+    return tables
+
+
+async def fetch_history(db, slot_ids: Iterable[int], start: datetime, end: datetime):
+    """(slot_id, status, timestamp, source) rows in [start, end), oldest first, across all tables."""
+    slot_ids = list(slot_ids)
+    selects = []
+    for table in [models.SlotStatus.__table__] + await existing_archives(start, end):
+        selects.append(
+            select(table.c.slot_id, table.c.status, table.c.timestamp, table.c.source)
+            .where(table.c.slot_id.in_(slot_ids), table.c.timestamp >= start, table.c.timestamp < end)
+        )
+    query = union_all(*selects).subquery()
+    return (await db.execute(select(query).order_by(query.c.timestamp))).all()
+
+
+history_writer = SlotHistoryWriter(settings.HISTORY_FLUSH_INTERVAL, settings.HISTORY_HOT_DAYS)
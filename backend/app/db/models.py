@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, DateTime, JSON, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -22,6 +22,7 @@ class ParkingLot(Base):
     address = Column(String)
     geo_location = Column(String) # Simple string for now, or JSON
     admin_id = Column(String, ForeignKey("users.id"))
+    version = Column(Integer, default=0, nullable=False) # Bumped on every slot change, see /lots/{id}/changes
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -38,9 +39,12 @@ class Slot(Base):
     rate_per_hour = Column(Float, default=10.0)
     is_active = Column(Boolean, default=True)
     status = Column(String, default="free") # Current status: free, occupied, reserved
+    version = Column(Integer, default=0, nullable=False) # Lot version of the last change to this slot
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (Index("ix_slots_lot_id_version", "lot_id", "version"),)
+    
     lot = relationship("ParkingLot", back_populates="slots")
     status_history = relationship("SlotStatus", back_populates="slot")
 
@@ -61,6 +65,9 @@ class SlotStatus(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     source = Column(String) # ml, camera, manual
     
+    # Older months are moved to slot_status_YYYY_MM archive tables (see app/db/history.py)
+    __table_args__ = (Index("ix_slot_status_slot_id_timestamp", "slot_id", "timestamp"),)
+    
     slot = relationship("Slot", back_populates="status_history")
 
 class Booking(Base):
@@ -71,11 +78,46 @@ class Booking(Base):
     start_time = Column(DateTime)
     end_time = Column(DateTime)
     amount = Column(Float)
-    status = Column(String, default="pending") # pending, paid, cancelled
+    status = Column(String, default="pending") # pending, paid, cancelled, refund_required
     razorpay_order_id = Column(String)
     razorpay_payment_id = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Overlap checks for a slot (see app/db/booking_index.py)
+    __table_args__ = (Index("ix_bookings_slot_id_start_time_end_time", "slot_id", "start_time", "end_time"),)
+    
     user = relationship("User")
     slot = relationship("Slot")
+
+class OccupancyRollup(Base):
+    """Per-bucket occupancy aggregates, maintained by app/db/rollups.py."""
+    __tablename__ = "occupancy_rollups"
+    granularity = Column(String, primary_key=True) # minute, hour, day
+    lot_id = Column(Integer, primary_key=True)
+    slot_id = Column(Integer, primary_key=True) # 0 = the whole lot
+    bucket_start = Column(DateTime, primary_key=True)
+    occupied_seconds = Column(Float, default=0.0)
+    arrivals = Column(Integer, default=0)
+    departures = Column(Integer, default=0)
+    dwell_seconds = Column(Float, default=0.0) # total length of the stays that ended in this bucket
+    # Running totals since the start of history, as of the end of this bucket
+    cum_occupied_seconds = Column(Float, default=0.0)
+    cum_arrivals = Column(Integer, default=0)
+    cum_departures = Column(Integer, default=0)
+    cum_dwell_seconds = Column(Float, default=0.0)
+    cum_hourly = Column(JSON) # lot day rows only: running occupied seconds per hour of day (24 values)
+
+class RollupCheckpoint(Base):
+    __tablename__ = "rollup_checkpoints"
+    id = Column(Integer, primary_key=True) # single row
+    clock = Column(DateTime) # rollups are final up to here
+    last_history_id = Column(Integer, default=0) # last slot_status row consumed
+    state = Column(LargeBinary) # engine arrays (numpy .npz)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RevokedToken(Base):
+    """JWTs revoked before their expiry (logout, refresh rotation); see app/db/revocation.py."""
+    __tablename__ = "revoked_tokens"
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, index=True) # the token's exp; the row can go after that
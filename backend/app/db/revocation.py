@@ -0,0 +1,164 @@
+"""
+Revoked JWTs (logout, refresh token rotation).
+
+Every token carries a random `jti`. Revoking a token:
+1. upserts (jti, expires_at) into revoked_tokens, so it survives restarts;
+2. is published on the broadcast bus (internal channel), so every worker
+   adds it to its own copy.
+
+Refresh token rotation claims the jti with a plain INSERT instead, so a
+refresh token replayed concurrently is honoured at most once.
+
+Each worker keeps jti -> exp in memory, so checking a token is one dict
+lookup and never touches the database. An entry is only needed until the
+token expires; expired entries and rows are pruned every
+REVOCATION_PRUNE_INTERVAL seconds.
+
+With REVOCATION_BLOOM a Bloom filter of the same jtis sits in front of the
+dict and clears tokens that were never revoked (no false negatives); its
+hits, ~1% of them false positives, are answered by the dict. The filter
+cannot forget keys, so pruning rebuilds it from the dict.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.cache import BloomFilter
+from app.core.config import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal, async_engine
+
+BLOOM_ERROR_RATE = 0.01
+
+
+def _epoch(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    def __init__(self, bloom: bool = False, bloom_capacity: int = 100_000, prune_interval: float = 300.0):
+        self.bloom_capacity = bloom_capacity
+        self.prune_interval = prune_interval
+        self.expiry: Dict[str, float] = {}
+        self.bloom: Optional[BloomFilter] = BloomFilter(bloom_capacity, BLOOM_ERROR_RATE) if bloom else None
+        self._bloom_keys = bloom_capacity  # keys the current filter was sized for
+        self._task: Optional[asyncio.Task] = None
+        self._loading: Optional[list] = None  # revocations applied while load() reads the table
+
+    async def load(self):
+        """Drop expired rows and rebuild the in-memory set from the rest."""
+        self._loading = []
+        async with async_engine.begin() as conn:
+            await conn.run_sync(models.RevokedToken.__table__.create, checkfirst=True)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= datetime.utcnow()))
+            await db.commit()
+            rows = (await db.execute(select(models.RevokedToken.jti, models.RevokedToken.expires_at))).all()
+        self.expiry = {jti: _epoch(expires_at) for jti, expires_at in rows}
+        self.expiry.update(self._loading)
+        self._loading = None
+        self._rebuild_bloom()
+        logger.info(f"Revocation list loaded: {len(rows)} revoked tokens")
+
+    def _rebuild_bloom(self):
+        if self.bloom is None:
+            return
+        self._bloom_keys = max(self.bloom_capacity, 2 * len(self.expiry))
+        bloom = BloomFilter(self._bloom_keys, BLOOM_ERROR_RATE)
+        for jti in self.expiry:
+            bloom.add(jti)
+        self.bloom = bloom
+
+    async def start(self):
+        await self.load()
+        self._task = asyncio.create_task(self._prune_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _prune_loop(self):
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                now = time.time()
+                self.expiry = {jti: exp for jti, exp in self.expiry.items() if exp > now}
+                self._rebuild_bloom()
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        delete(models.RevokedToken).where(models.RevokedToken.expires_at <= datetime.utcnow())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Revocation list prune failed: {e}")
+
+    # --- checks ---
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if jti is None:
+            return False
+        if self.bloom is not None and jti not in self.bloom:
+            return False
+        exp = self.expiry.get(jti)
+        return exp is not None and exp > time.time()
+
+    # --- revocation ---
+
+    def add(self, jti: str, exp: float):
+        self.expiry[jti] = exp
+        if self.bloom is not None:
+            if self.bloom.count >= self._bloom_keys:
+                self._rebuild_bloom()  # past its sizing the false positive rate climbs
+            else:
+                self.bloom.add(jti)
+        if self._loading is not None:
+            self._loading.append((jti, exp))
+
+    async def revoke(self, jti: Optional[str], exp: float) -> Optional[dict]:
+        """
+        Persist and apply a revocation. Returns the bus message that carries it
+        to the other workers, or None if there is nothing to revoke.
+        """
+        if jti is None or exp <= time.time():
+            return None
+        async with AsyncSessionLocal() as db:
+            await db.merge(models.RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(exp)))
+            await db.commit()
+        self.add(jti, exp)
+        return {"type": "token_revoked", "jti": jti, "exp": exp}
+
+    async def claim(self, jti: str, exp: float) -> Optional[dict]:
+        """
+        Revoke a token only if nobody has yet: a plain INSERT, so of concurrent
+        claims of one jti (on any worker) exactly one succeeds. Returns the bus
+        message for the winner, None if the token was already revoked.
+        """
+        async with AsyncSessionLocal() as db:
+            db.add(models.RevokedToken(jti=jti, expires_at=datetime.utcfromtimestamp(exp)))
+            try:
+                await db.commit()
+            except IntegrityError:
+                return None
+        self.add(jti, exp)
+        return {"type": "token_revoked", "jti": jti, "exp": exp}
+
+    def on_message(self, message: dict):
+        """Broadcast bus listener: apply revocations made by other workers."""
+        if message.get("type") == "token_revoked" and message.get("jti"):
+            self.add(message["jti"], float(message.get("exp") or 0))
+
+
+revocation_list = RevocationList(
+    settings.REVOCATION_BLOOM, settings.REVOCATION_BLOOM_CAPACITY, settings.REVOCATION_PRUNE_INTERVAL
+)
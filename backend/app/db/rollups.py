@@ -0,0 +1,610 @@
+"""
+Occupancy rollups: utilization, turnover and dwell time per slot and per lot
+in minute, hour and day buckets (models.OccupancyRollup).
+
+Each rollup row stores the bucket's own values and the running totals since
+the start of history as of the bucket end. A range total is the difference of
+two running totals, and each one is a single index seek on
+(granularity, lot_id, slot_id, bucket_start), so a query costs the same for a
+day or a year. Lot day rows also carry running occupied seconds per hour of
+day, so the peak hour of a range is a difference of two vectors.
+
+Rows are sparse. A bucket with no occupied time, arrivals or departures has no
+row, and the running totals carry over.
+
+RollupEngine keeps per-slot state (occupied, stay start, totals) in NumPy
+arrays. It consumes slot_status rows in id order as the history writer flushes
+them. A minute bucket is finalized once the clock (now - ROLLUP_GRACE) passes
+its end, vectorized over all slots. Hour and day buckets are finalized on
+their boundaries from the same totals. A transition that arrives after its
+minute was finalized is counted at the current clock.
+
+The engine state is checkpointed at every hour boundary, together with the id
+of the last history row consumed. After a restart the engine resumes from the
+checkpoint and replays history. Rows are upserted with absolute values, so
+replaying is idempotent. With no checkpoint, `backfill` rebuilds every rollup
+from the full history (hot table and archives) with vectorized interval
+arithmetic.
+
+Minute rows are kept for ROLLUP_MINUTE_RETENTION_DAYS. Run the engine in one
+process only (ROLLUP_ENGINE_ENABLED); every worker can answer queries.
+"""
+
+import asyncio
+import io
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import delete, func, select, update
+
+from app.core.config import settings
+from app.db import models
+from app.db.history import archive_tables
+from app.db.session import AsyncSessionLocal, async_engine
+
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+ROLLUP_GRACE = 10.0            # seconds a minute stays open for history rows still being flushed
+ROLLUP_TICK = 5.0              # seconds between engine steps
+ROLLUP_HISTORY_BATCH = 20000   # slot_status rows consumed per step
+ROLLUP_WRITE_BATCH = 5000      # rollup rows per executemany
+CHECKPOINT_ID = 1
+EPOCH = datetime(1970, 1, 1)
+
+# Column order of every (n, 4) totals array
+METRICS = ("occupied_seconds", "arrivals", "departures", "dwell_seconds")
+
+
+def to_epoch(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=float(seconds))
+
+
+def floor_to(seconds: float, step: int) -> float:
+    return math.floor(seconds / step) * step
+
+
+def _sum_by(groups: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    """Sum the rows of an (m, 4) array by group index -> (n, 4)."""
+    return np.stack([np.bincount(groups, weights=values[:, m], minlength=n) for m in range(4)], axis=1)
+
+
+def _rows(granularity, bucket_starts, lot_ids, slot_ids, delta, cum, cum_hourly=None) -> List[dict]:
+    bucket_starts = np.broadcast_to(bucket_starts, (len(slot_ids),))
+    return [
+        {
+            "granularity": granularity,
+            "lot_id": int(lot_ids[k]),
+            "slot_id": int(slot_ids[k]),
+            "bucket_start": from_epoch(bucket_starts[k]),
+            "occupied_seconds": float(delta[k, 0]),
+            "arrivals": int(delta[k, 1]),
+            "departures": int(delta[k, 2]),
+            "dwell_seconds": float(delta[k, 3]),
+            "cum_occupied_seconds": float(cum[k, 0]),
+            "cum_arrivals": int(cum[k, 1]),
+            "cum_departures": int(cum[k, 2]),
+            "cum_dwell_seconds": float(cum[k, 3]),
+            "cum_hourly": cum_hourly[k] if cum_hourly is not None else None,
+        }
+        for k in range(len(slot_ids))
+    ]
+
+
+def _upsert_statement():
+    """INSERT ... ON CONFLICT (primary key) DO UPDATE for the rollup table."""
+    if async_engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = models.OccupancyRollup.__table__
+    statement = insert(table)
+    keys = [column.name for column in table.primary_key]
+    return statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={column.name: statement.excluded[column.name] for column in table.columns if column.name not in keys},
+    )
+
+
+# --- vectorized interval arithmetic (backfill) ---
+
+def _stays(times: np.ndarray, occupied: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Arrival and departure times from one slot's transitions (sorted by time)."""
+    previous = np.concatenate(([False], occupied[:-1]))
+    return times[occupied & ~previous], times[~occupied & previous]
+
+
+def _running_totals(arrivals: np.ndarray, departures: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """(len(points), 4) running totals of one slot at each point in time."""
+    cum = np.zeros((len(points), 4))
+    if not len(arrivals):
+        return cum
+    lengths = departures - arrivals[:len(departures)]
+    closed = np.concatenate(([0.0], np.cumsum(lengths)))
+    ends = np.concatenate((departures, np.full(len(arrivals) - len(departures), np.inf)))
+
+    # Stays are disjoint and sorted: all but the last one started by `point` are closed
+    started = np.searchsorted(arrivals, points, side="right")
+    last = np.maximum(started - 1, 0)
+    current = np.clip(np.minimum(points, ends[last]) - arrivals[last], 0.0, None)
+    cum[:, 0] = np.where(started > 0, closed[last] + current, 0.0)
+    cum[:, 1] = np.searchsorted(arrivals, points, side="left")
+    departed = np.searchsorted(departures, points, side="left")
+    cum[:, 2] = departed
+    cum[:, 3] = closed[departed]
+    return cum
+
+
+class RollupEngine:
+    def __init__(self, enabled: bool = True, minute_retention_days: int = 7, grace: float = ROLLUP_GRACE):
+        self.enabled = enabled
+        self.minute_retention_days = minute_retention_days
+        self.grace = grace
+        self._task = None
+        self._step_lock = asyncio.Lock()
+        self.stats = {"history_rows": 0, "late_rows": 0, "rows_written": 0, "checkpoints": 0, "errors": 0}
+        self._reset()
+
+    def _reset(self):
+        self.index: Dict[int, int] = {}
+        self.slot_ids = np.zeros(0, np.int64)
+        self.lot_ids = np.zeros(0, np.int64)
+        self.occupied = np.zeros(0, bool)
+        self.stay_start = np.zeros(0)
+        self.accounted = np.zeros(0)   # occupied time is in `totals` up to here
+        self.totals = np.zeros((0, 4))
+        self.last_cum = {granularity: np.zeros((0, 4)) for granularity in GRANULARITIES}
+        self.lot_hourly: Dict[int, np.ndarray] = {}
+        self.clock: Optional[float] = None   # every bucket ending at or before this is final
+        self.last_history_id = 0
+        self._lots = None
+
+    # --- lifecycle ---
+
+    async def start(self):
+        await self.restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.clock is not None:
+            async with self._step_lock:
+                await self._write([], checkpoint=True)
+
+    async def restore(self):
+        """Resume from the checkpoint, or backfill from history if there is none."""
+        async with AsyncSessionLocal() as db:
+            checkpoint = await db.get(models.RollupCheckpoint, CHECKPOINT_ID)
+        self._reset()
+        if checkpoint is None or checkpoint.state is None:
+            await self.backfill()
+            return
+        self._load(checkpoint.state)
+        logger.info(f"Rollup engine resumed at {from_epoch(self.clock)} (history id {self.last_history_id})")
+
+    async def _run(self):
+        while True:
+            try:
+                more = await self.step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rollup engine step failed, resuming from the checkpoint: {e}")
+                self.stats["errors"] += 1
+                await asyncio.sleep(ROLLUP_TICK)
+                try:
+                    await self.restore()
+                except Exception as e:
+                    logger.error(f"Rollup engine restore failed: {e}")
+                continue
+            if not more:
+                await asyncio.sleep(ROLLUP_TICK)
+
+    # --- incremental path ---
+
+    async def step(self, now: Optional[datetime] = None) -> bool:
+        """Consume new history rows and finalize due buckets. True if more rows are waiting."""
+        cutoff = to_epoch(now or datetime.utcnow()) - self.grace
+        hot = models.SlotStatus.__table__
+        async with self._step_lock:
+            async with AsyncSessionLocal() as db:
+                batch = (await db.execute(
+                    select(hot.c.id, hot.c.slot_id, models.Slot.lot_id, hot.c.status, hot.c.timestamp)
+                    .join(models.Slot, models.Slot.id == hot.c.slot_id)
+                    .where(hot.c.id > self.last_history_id)
+                    .order_by(hot.c.id)
+                    .limit(ROLLUP_HISTORY_BATCH)
+                )).all()
+
+            hour = floor_to(self.clock, 3600)
+            rows, caught_up = [], True
+            for history_id, slot_id, lot_id, status, timestamp in batch:
+                at = to_epoch(timestamp)
+                if at > cutoff:
+                    break
+                rows += self.advance(at)
+                self.apply(slot_id, lot_id, status, at)
+                self.last_history_id = history_id
+                self.stats["history_rows"] += 1
+            else:
+                caught_up = len(batch) < ROLLUP_HISTORY_BATCH
+            if caught_up:
+                rows += self.advance(cutoff)
+            await self._write(rows, checkpoint=floor_to(self.clock, 3600) > hour)
+            return not caught_up
+
+    def apply(self, slot_id: int, lot_id: int, status: str, at: float):
+        """Apply one transition at `at` (clamped to the clock)."""
+        i = self.index.get(slot_id)
+        if i is None:
+            self._add_slots(np.array([slot_id]), np.array([lot_id]))
+            i = self.index[slot_id]
+        if at < self.clock:
+            at = self.clock
+            self.stats["late_rows"] += 1
+        occupied = status == "occupied"
+        if self.occupied[i]:
+            self.totals[i, 0] += at - self.accounted[i]
+            if not occupied:
+                self.totals[i, 2] += 1
+                self.totals[i, 3] += at - self.stay_start[i]
+        elif occupied:
+            self.totals[i, 1] += 1
+            self.stay_start[i] = at
+        self.accounted[i] = at
+        self.occupied[i] = occupied
+
+    def advance(self, until: float) -> List[dict]:
+        """Finalize every minute boundary up to `until`; returns the rollup rows."""
+        rows = []
+        while self.clock + 60 <= until:
+            self.clock += 60
+            rows += self._finalize(self.clock)
+        return rows
+
+    def cumulative(self, at: float) -> np.ndarray:
+        """Running totals of every slot at `at` (not before the last transition)."""
+        cum = self.totals.copy()
+        cum[:, 0] += np.where(self.occupied, at - self.accounted, 0.0)
+        return cum
+
+    def _finalize(self, end: float) -> List[dict]:
+        cum = self.cumulative(end)
+        if self._lots is None:
+            self._lots = np.unique(self.lot_ids, return_inverse=True)
+        lots, groups = self._lots
+        lot_cum = _sum_by(groups, cum, len(lots))
+        rows = []
+        # minute, hour, day: the hour rows update lot_hourly before the day rows read it
+        for granularity, step in GRANULARITIES.items():
+            if end % step:
+                continue
+            start = end - step
+            delta = cum - self.last_cum[granularity]
+            self.last_cum[granularity] = cum
+            active = np.flatnonzero(delta.any(axis=1))
+            rows += _rows(granularity, start, self.lot_ids[active], self.slot_ids[active], delta[active], cum[active])
+
+            lot_delta = _sum_by(groups, delta, len(lots))
+            active = np.flatnonzero(lot_delta.any(axis=1))
+            hourly = None
+            if granularity == "hour":
+                hour = int(start % 86400 // 3600)
+                for k in active:
+                    self.lot_hourly.setdefault(int(lots[k]), np.zeros(24))[hour] += lot_delta[k, 0]
+            elif granularity == "day":
+                hourly = [self.lot_hourly.get(int(lots[k]), np.zeros(24)).tolist() for k in active]
+            rows += _rows(granularity, start, lots[active], np.zeros(len(active), np.int64),
+                          lot_delta[active], lot_cum[active], hourly)
+        return rows
+
+    def _add_slots(self, slot_ids: np.ndarray, lot_ids: np.ndarray):
+        n, base = len(slot_ids), len(self.slot_ids)
+        self.slot_ids = np.concatenate((self.slot_ids, slot_ids.astype(np.int64)))
+        self.lot_ids = np.concatenate((self.lot_ids, lot_ids.astype(np.int64)))
+        self.occupied = np.concatenate((self.occupied, np.zeros(n, bool)))
+        self.stay_start = np.concatenate((self.stay_start, np.zeros(n)))
+        self.accounted = np.concatenate((self.accounted, np.zeros(n)))
+        self.totals = np.vstack((self.totals, np.zeros((n, 4))))
+        for granularity in GRANULARITIES:
+            self.last_cum[granularity] = np.vstack((self.last_cum[granularity], np.zeros((n, 4))))
+        for k, slot_id in enumerate(slot_ids):
+            self.index[int(slot_id)] = base + k
+        self._lots = None
+
+    # --- persistence ---
+
+    async def _write(self, rows: List[dict], checkpoint: bool):
+        """Upsert rollup rows and move the checkpoint forward, in one transaction."""
+        async with AsyncSessionLocal() as db:
+            if rows:
+                statement = _upsert_statement()
+                for k in range(0, len(rows), ROLLUP_WRITE_BATCH):
+                    await db.execute(statement, rows[k:k + ROLLUP_WRITE_BATCH])
+            values = {"clock": from_epoch(self.clock), "last_history_id": self.last_history_id}
+            if checkpoint:
+                values["state"] = self._dump()
+                cutoff = self.clock - self.minute_retention_days * 86400
+                await db.execute(delete(models.OccupancyRollup).where(
+                    models.OccupancyRollup.granularity == "minute",
+                    models.OccupancyRollup.bucket_start < from_epoch(cutoff),
+                ))
+            if await db.get(models.RollupCheckpoint, CHECKPOINT_ID) is None:
+                db.add(models.RollupCheckpoint(id=CHECKPOINT_ID, **values))
+            else:
+                await db.execute(update(models.RollupCheckpoint)
+                                 .where(models.RollupCheckpoint.id == CHECKPOINT_ID).values(**values))
+            await db.commit()
+        self.stats["rows_written"] += len(rows)
+        self.stats["checkpoints"] += checkpoint
+
+    def _dump(self) -> bytes:
+        buffer = io.BytesIO()
+        hourly_lots = sorted(self.lot_hourly)
+        np.savez(
+            buffer,
+            clock=np.array(self.clock), last_history_id=np.array(self.last_history_id),
+            slot_ids=self.slot_ids, lot_ids=self.lot_ids, occupied=self.occupied,
+            stay_start=self.stay_start, accounted=self.accounted, totals=self.totals,
+            hourly_lots=np.array(hourly_lots, np.int64),
+            hourly=np.array([self.lot_hourly[lot_id] for lot_id in hourly_lots]).reshape(-1, 24),
+            **{f"last_cum_{granularity}": cum for granularity, cum in self.last_cum.items()},
+        )
+        return buffer.getvalue()
+
+    def _load(self, state: bytes):
+        data = np.load(io.BytesIO(state))
+        self.clock = float(data["clock"])
+        self.last_history_id = int(data["last_history_id"])
+        self.slot_ids, self.lot_ids, self.occupied = data["slot_ids"], data["lot_ids"], data["occupied"]
+        self.stay_start, self.accounted, self.totals = data["stay_start"], data["accounted"], data["totals"]
+        self.last_cum = {granularity: data[f"last_cum_{granularity}"] for granularity in GRANULARITIES}
+        self.lot_hourly = {int(lot_id): row for lot_id, row in zip(data["hourly_lots"], data["hourly"])}
+        self.index = {int(slot_id): i for i, slot_id in enumerate(self.slot_ids)}
+        self._lots = None
+
+    # --- backfill ---
+
+    async def backfill(self, now: Optional[datetime] = None):
+        """Rebuild every rollup from the full slot history and checkpoint the result."""
+        end = floor_to(to_epoch(now or datetime.utcnow()) - self.grace, 60)
+        hot = models.SlotStatus.__table__
+        tables = [hot] + await archive_tables()
+        async with AsyncSessionLocal() as db:
+            # Consume ids below the first row at/after `end`, so the incremental reader
+            # (id > last_history_id) continues exactly where the backfill stopped
+            first_open = (await db.execute(
+                select(func.min(hot.c.id)).where(hot.c.timestamp >= from_epoch(end))
+            )).scalar()
+            if first_open is not None:
+                last_id = first_open - 1
+            else:
+                last_id = max([(await db.execute(select(func.max(t.c.id)))).scalar() or 0 for t in tables])
+            history = []
+            for table in tables:
+                history += (await db.execute(
+                    select(table.c.id, table.c.slot_id, table.c.status, table.c.timestamp)
+                    .where(table.c.id <= last_id)
+                )).all()
+            slots = (await db.execute(select(models.Slot.id, models.Slot.lot_id).order_by(models.Slot.id))).all()
+
+        self._reset()
+        self.clock = end
+        self.last_history_id = last_id
+        self._add_slots(np.array([s.id for s in slots], np.int64), np.array([s.lot_id or 0 for s in slots], np.int64))
+        self.accounted[:] = end
+
+        history = [row for row in history if row.slot_id in self.index]
+        rows = []
+        if history:
+            rows = self._backfill_rows(history, end)
+        self.stats["history_rows"] += len(history)
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.OccupancyRollup))
+            await db.commit()
+        await self._write(rows, checkpoint=True)
+        logger.info(f"Rollups backfilled from {len(history)} history rows: {len(rows)} rows up to {from_epoch(end)}")
+
+    def _backfill_rows(self, history, end: float) -> List[dict]:
+        positions = np.array([self.index[row.slot_id] for row in history])
+        times = np.array([row.timestamp for row in history], dtype="datetime64[us]").astype(np.int64) / 1e6
+        occupied = np.array([row.status == "occupied" for row in history])
+        order = np.lexsort((np.array([row.id for row in history]), times, positions))
+        positions, times, occupied = positions[order], times[order], occupied[order]
+
+        lots, groups = np.unique(self.lot_ids, return_inverse=True)
+        origin = times.min()
+        grids = {}
+        for granularity, step in GRANULARITIES.items():
+            first = floor_to(origin, step)
+            if granularity == "minute":
+                first = max(first, floor_to(end - self.minute_retention_days * 86400, step))
+            # Bucket boundaries; totals at the first one are the baseline of the first bucket
+            grids[granularity] = np.arange(first, floor_to(end, step) + step, step, dtype=float)
+        lot_cum = {granularity: np.zeros((len(lots), len(grid), 4)) for granularity, grid in grids.items()}
+
+        rows = []
+        bounds = np.flatnonzero(np.diff(positions)) + 1
+        for i, times_i, occupied_i in zip(positions[np.r_[0, bounds]], np.split(times, bounds),
+                                          np.split(occupied, bounds)):
+            arrivals, departures = _stays(times_i, occupied_i)
+            for granularity, grid in grids.items():
+                cum = _running_totals(arrivals, departures, grid)
+                delta = np.diff(cum, axis=0)
+                active = np.flatnonzero(delta.any(axis=1))
+                rows += _rows(granularity, grid[:-1][active], np.full(len(active), self.lot_ids[i]),
+                              np.full(len(active), self.slot_ids[i]), delta[active], cum[1:][active])
+                lot_cum[granularity][groups[i]] += cum
+                self.last_cum[granularity][i] = cum[-1]
+            self.totals[i] = _running_totals(arrivals, departures, np.array([end]))[0]
+            if len(arrivals) > len(departures):
+                self.occupied[i] = True
+                self.stay_start[i] = arrivals[-1]
+
+        # Lot rows; day rows carry running occupied seconds per hour of day
+        hour_starts = grids["hour"][:-1]
+        day_ends = grids["day"][1:]
+        hourly = np.zeros((len(lots), len(day_ends) + 1, 24))
+        day_of_hour = np.searchsorted(day_ends, hour_starts, side="right")
+        hour_of_day = (hour_starts % 86400 // 3600).astype(int)
+        for k in range(len(lots)):
+            np.add.at(hourly[k], (day_of_hour, hour_of_day), np.diff(lot_cum["hour"][k][:, 0]))
+        hourly = np.cumsum(hourly, axis=1)
+
+        for granularity, grid in grids.items():
+            for k, lot_id in enumerate(lots):
+                cum = lot_cum[granularity][k]
+                delta = np.diff(cum, axis=0)
+                active = np.flatnonzero(delta.any(axis=1))
+                cum_hourly = [hourly[k, j].tolist() for j in active] if granularity == "day" else None
+                rows += _rows(granularity, grid[:-1][active], np.full(len(active), lot_id),
+                              np.zeros(len(active), np.int64), delta[active], cum[1:][active], cum_hourly)
+        self.lot_hourly = {int(lot_id): hourly[k, -1].copy() for k, lot_id in enumerate(lots)}
+        return rows
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "slots": len(self.slot_ids),
+            "final_until": from_epoch(self.clock).isoformat() if self.clock is not None else None,
+            "last_history_id": self.last_history_id,
+        }
+
+
+# --- queries (any worker) ---
+
+async def final_until(db) -> Optional[datetime]:
+    """Rollups are complete up to this moment (None before the first engine run)."""
+    return (await db.execute(
+        select(models.RollupCheckpoint.clock).where(models.RollupCheckpoint.id == CHECKPOINT_ID)
+    )).scalar()
+
+
+async def running_totals(db, granularity: str, lot_id: int, slot_id: int,
+                         at: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """(totals, hourly) as of the bucket boundary `at`: one index seek, however old `at` is."""
+    rollup = models.OccupancyRollup
+    row = (await db.execute(
+        select(rollup.cum_occupied_seconds, rollup.cum_arrivals, rollup.cum_departures,
+               rollup.cum_dwell_seconds, rollup.cum_hourly)
+        .where(
+            rollup.granularity == granularity,
+            rollup.lot_id == lot_id,
+            rollup.slot_id == slot_id,
+            rollup.bucket_start <= at - timedelta(seconds=GRANULARITIES[granularity]),
+        )
+        .order_by(rollup.bucket_start.desc())
+        .limit(1)
+    )).first()
+    if row is None:
+        return np.zeros(4), np.zeros(24)
+    return np.array(row[:4], dtype=float), np.array(row.cum_hourly or [0.0] * 24, dtype=float)
+
+
+def _peak(hourly: np.ndarray, capacity: np.ndarray) -> Optional[dict]:
+    """Busiest hour of day: occupied seconds over available slot-seconds per hour."""
+    occupancy = np.divide(hourly, capacity, out=np.zeros(24), where=capacity > 0)
+    if not occupancy.any():
+        return None
+    hour = int(np.argmax(occupancy))
+    return {"hour": hour, "occupancy": round(float(occupancy[hour]), 4)}
+
+
+def _metrics(values: np.ndarray, seconds: float, slots: int) -> dict:
+    occupied, arrivals, departures, dwell = (float(value) for value in values)
+    return {
+        "utilization": round(occupied / (seconds * slots), 4) if seconds and slots else 0.0,
+        "arrivals": int(arrivals),
+        "departures": int(departures),
+        "avg_dwell_minutes": round(dwell / departures / 60, 2) if departures else None,
+    }
+
+
+async def occupancy_analytics(db, lot_id: int, slot_id: Optional[int], start: datetime, end: datetime,
+                              granularity: str, slots: int) -> dict:
+    """
+    Summary and per-bucket series for one lot (slot_id None) or one slot.
+    `start` is floored and `end` ceiled to the granularity; `end` is capped at
+    the point up to which the rollups are final.
+    """
+    step = GRANULARITIES[granularity]
+    complete = await final_until(db)
+    start_s = floor_to(to_epoch(start), step)
+    end_s = math.ceil(to_epoch(end) / step) * step
+    if complete is not None:
+        end_s = min(end_s, floor_to(to_epoch(complete), step))
+    end_s = max(end_s, start_s)
+    key = (lot_id, slot_id or 0)
+
+    before, hourly_before = await running_totals(db, granularity, *key, from_epoch(start_s))
+    after, hourly_after = await running_totals(db, granularity, *key, from_epoch(end_s))
+    totals = after - before
+    seconds = end_s - start_s
+
+    rollup = models.OccupancyRollup
+    buckets = {
+        row.bucket_start: np.array(row[1:], dtype=float)
+        for row in (await db.execute(
+            select(rollup.bucket_start, rollup.occupied_seconds, rollup.arrivals,
+                   rollup.departures, rollup.dwell_seconds)
+            .where(
+                rollup.granularity == granularity,
+                rollup.lot_id == lot_id,
+                rollup.slot_id == key[1],
+                rollup.bucket_start >= from_epoch(start_s),
+                rollup.bucket_start < from_epoch(end_s),
+            )
+        )).all()
+    }
+    series = []
+    for bucket in np.arange(start_s, end_s, step):
+        bucket_start = from_epoch(bucket)
+        values = buckets.get(bucket_start, np.zeros(4))
+        series.append({"bucket_start": bucket_start, **_metrics(values, step, slots)})
+
+    # Peak hour: lot ranges spanning whole days come from the running hourly vectors,
+    # anything else from the (bounded) minute/hour series
+    peak = None
+    day_start = math.ceil(start_s / 86400) * 86400
+    day_end = floor_to(end_s, 86400)
+    if slot_id is None and day_end > day_start:
+        _, hourly_before = await running_totals(db, "day", lot_id, 0, from_epoch(day_start))
+        _, hourly_after = await running_totals(db, "day", lot_id, 0, from_epoch(day_end))
+        days = (day_end - day_start) / 86400
+        peak = _peak(hourly_after - hourly_before, np.full(24, days * 3600.0 * slots))
+    elif granularity != "day" and series:
+        hourly, capacity = np.zeros(24), np.zeros(24)
+        for bucket in np.arange(start_s, end_s, step):
+            hour = int(bucket % 86400 // 3600)
+            hourly[hour] += buckets.get(from_epoch(bucket), np.zeros(4))[0]
+            capacity[hour] += step * slots
+        peak = _peak(hourly, capacity)
+
+    summary = _metrics(totals, seconds, slots)
+    summary.update({
+        "slots": slots,
+        "occupied_hours": round(float(totals[0]) / 3600, 2),
+        "turnover": round(float(totals[1]) / slots, 2) if slots else 0.0,
+        "peak_hour": peak,
+    })
+    return {
+        "lot_id": lot_id,
+        "slot_id": slot_id,
+        "granularity": granularity,
+        "from": from_epoch(start_s),
+        "to": from_epoch(end_s),
+        "complete_until": complete,
+        "summary": summary,
+        "series": series,
+    }
+
+
+rollup_engine = RollupEngine(settings.ROLLUP_ENGINE_ENABLED, settings.ROLLUP_MINUTE_RETENTION_DAYS)
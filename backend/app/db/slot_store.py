@@ -0,0 +1,281 @@
+"""
+In-memory, authoritative slot state with write-behind persistence.
+
+The store is rebuilt from the database on startup and then serves slot
+reads (lot listings, status, delta sync) straight from memory. Each lot
+keeps its hot state in compact per-lot arrays indexed by slot position:
+
+    status    bytearray of status codes (free / occupied / reserved)
+    versions  array('q') of the lot version that last changed each slot
+
+Status updates are applied in memory under a lock and recorded in a dirty
+map (latest value per slot). A background task flushes the dirty map every
+SLOT_STORE_FLUSH_INTERVAL seconds in one transaction: slot rows first, then
+the lot version counters, so a committed lot version never points past the
+slot rows it covers. A failed flush is merged back (newer versions win) and
+retried on the next tick; shutdown does a final flush.
+
+The store lives in one process. Run a single API worker with it, or set
+SLOT_STORE_ENABLED=False when running several workers.
+"""
+
+import asyncio
+import bisect
+import threading
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal
+
+STATUSES = ("free", "occupied", "reserved")
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+LOT_FIELDS = ("id", "name", "address", "geo_location", "created_at", "updated_at")
+SLOT_FIELDS = ("name", "polygon", "slot_type", "rate_per_hour", "is_active", "created_at")
+
+# (slot_id, current status, new status) -> accept?
+StatusRule = Callable[[int, str, str], bool]
+
+
+class LotState:
+    """Metadata and compact hot arrays for one lot."""
+
+    __slots__ = ("meta", "version", "ids", "index", "status", "versions", "updated_at", "static")
+
+    def __init__(self, meta: dict, version: int):
+        self.meta = meta
+        self.version = version
+        self.ids: List[int] = []
+        self.index: Dict[int, int] = {}
+        self.status = bytearray()
+        self.versions = array("q")
+        self.updated_at: List[datetime] = []
+        self.static: List[dict] = []
+
+    def add(self, slot) -> int:
+        i = self.index.get(slot.id)
+        if i is None:
+            i = len(self.ids)
+            self.ids.append(slot.id)
+            self.index[slot.id] = i
+            self.status.append(0)
+            self.versions.append(0)
+            self.updated_at.append(None)
+            self.static.append(None)
+        self.status[i] = STATUS_CODES.get(slot.status or "free", 0)
+        self.versions[i] = slot.version or 0
+        self.updated_at[i] = slot.updated_at
+        self.static[i] = {field: getattr(slot, field) for field in SLOT_FIELDS}
+        return i
+
+    def slot(self, i: int, fields: Optional[Tuple[str, ...]] = None) -> dict:
+        slot = {
+            **self.static[i],
+            "id": self.ids[i],
+            "lot_id": self.meta["id"],
+            "status": STATUSES[self.status[i]],
+            "version": self.versions[i],
+            "updated_at": self.updated_at[i],
+        }
+        if fields is None:
+            return slot
+        return {field: slot[field] for field in fields}
+
+    def snapshot(self, fields: Optional[Tuple[str, ...]] = None) -> dict:
+        return {
+            **self.meta,
+            "version": self.version,
+            "slots": [self.slot(i, fields) for i in range(len(self.ids))],
+        }
+
+
+class SlotStore:
+    def __init__(self, enabled: bool = True, flush_interval: float = 0.5):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.lots: Dict[int, LotState] = {}
+        self._lock = threading.Lock()  # sync endpoints (lot/slot creation) run in the threadpool
+        self._dirty_slots: Dict[int, Tuple[str, int, datetime]] = {}
+        self._dirty_lots: Dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.stats = {"flushes": 0, "rows_flushed": 0, "flush_errors": 0}
+
+    # --- lifecycle ---
+
+    async def start(self):
+        await self.load()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                # let an in-flight flush requeue its batch before the final one
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def load(self):
+        """Rebuild the whole store from the database."""
+        async with AsyncSessionLocal() as db:
+            lots = (await db.execute(select(models.ParkingLot).order_by(models.ParkingLot.id))).scalars().all()
+            slots = (await db.execute(select(models.Slot).order_by(models.Slot.id))).scalars().all()
+        with self._lock:
+            self.lots = {}
+            for lot in lots:
+                self._add_lot(lot)
+            for slot in slots:
+                state = self.lots.get(slot.lot_id)
+                if state is not None:
+                    state.add(slot)
+        logger.info(f"Slot store loaded: {len(lots)} lots, {len(slots)} slots")
+
+    # --- reads ---
+
+    def list_lots(self, after_id: int = 0, limit: int = 100,
+                  fields: Optional[Tuple[str, ...]] = None) -> List[dict]:
+        """Keyset page of lot snapshots (ids greater than `after_id`)."""
+        with self._lock:
+            ids = sorted(self.lots)
+            start = bisect.bisect_right(ids, after_id)
+            return [self.lots[lot_id].snapshot(fields) for lot_id in ids[start:start + limit]]
+
+    def get_slot(self, lot_id: int, slot_id: int) -> Optional[dict]:
+        with self._lock:
+            state = self.lots.get(lot_id)
+            i = state.index.get(slot_id) if state else None
+            return state.slot(i) if i is not None else None
+
+    def changes(self, lot_id: int, since: int) -> Optional[Tuple[int, bool, List[dict]]]:
+        """(version, reset, slots changed after `since`), or None for an unknown lot."""
+        with self._lock:
+            state = self.lots.get(lot_id)
+            if state is None:
+                return None
+            reset = since == 0 or since > state.version
+            if reset:
+                indices = range(len(state.ids))
+            else:
+                indices = [i for i, v in enumerate(state.versions) if v > since]
+            return state.version, reset, sorted((state.slot(i) for i in indices), key=lambda s: s["id"])
+
+    # --- writes ---
+
+    def apply(self, lot_id: int, updates: Iterable[Tuple[int, str]], allowed: StatusRule):
+        """
+        Apply (slot_id, status) updates in order. All accepted changes share
+        one new lot version. Returns (changed slot dicts, ignored ids,
+        not found ids, version or None).
+        """
+        ignored, not_found = [], []
+        with self._lock:
+            state = self.lots.get(lot_id)
+            original = {}
+            for slot_id, new_status in updates:
+                i = state.index.get(slot_id) if state else None
+                if i is None:
+                    if slot_id not in not_found:
+                        not_found.append(slot_id)
+                    continue
+                current = STATUSES[state.status[i]]
+                if not allowed(slot_id, current, new_status):
+                    ignored.append(slot_id)
+                    continue
+                original.setdefault(i, state.status[i])
+                state.status[i] = STATUS_CODES[new_status]
+
+            changed = [i for i, code in original.items() if state.status[i] != code]
+            if not changed:
+                return [], ignored, not_found, None
+
+            state.version += 1
+            now = datetime.utcnow()
+            for i in changed:
+                state.versions[i] = state.version
+                state.updated_at[i] = now
+                self._dirty_slots[state.ids[i]] = (STATUSES[state.status[i]], state.version, now)
+            self._dirty_lots[lot_id] = state.version
+            return [state.slot(i) for i in changed], ignored, not_found, state.version
+
+    def add_lot(self, lot):
+        with self._lock:
+            self._add_lot(lot)
+
+    def next_version(self, lot_id: int) -> int:
+        """Bump a lot's version for a change persisted by the caller (e.g. a new slot)."""
+        with self._lock:
+            state = self.lots.get(lot_id)
+            if state is None:
+                return 0
+            state.version += 1
+            self._dirty_lots[lot_id] = state.version
+            return state.version
+
+    def add_slot(self, slot):
+        with self._lock:
+            state = self.lots.get(slot.lot_id)
+            if state is not None:
+                state.add(slot)
+
+    def _add_lot(self, lot):
+        self.lots[lot.id] = LotState({field: getattr(lot, field) for field in LOT_FIELDS}, lot.version or 0)
+
+    # --- write-behind ---
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Persist everything changed since the last flush in one transaction."""
+        async with self._flush_lock:
+            with self._lock:
+                slots, self._dirty_slots = self._dirty_slots, {}
+                lots, self._dirty_lots = self._dirty_lots, {}
+            if not slots and not lots:
+                return
+            try:
+                async with AsyncSessionLocal() as db:
+                    if slots:
+                        await db.execute(update(models.Slot), [
+                            {"id": slot_id, "status": status, "version": version, "updated_at": updated_at}
+                            for slot_id, (status, version, updated_at) in slots.items()
+                        ])
+                    if lots:
+                        await db.execute(update(models.ParkingLot), [
+                            {"id": lot_id, "version": version} for lot_id, version in lots.items()
+                        ])
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Slot store flush failed, will retry: {e}")
+                self.stats["flush_errors"] += 1
+                self._requeue(slots, lots)
+                return
+            except BaseException:
+                # cancelled mid-write: keep the changes for the next flush
+                self._requeue(slots, lots)
+                raise
+            self.stats["flushes"] += 1
+            self.stats["rows_flushed"] += len(slots)
+
+    def _requeue(self, slots, lots):
+        with self._lock:
+            for slot_id, entry in slots.items():
+                newer = self._dirty_slots.get(slot_id)
+                if newer is None or newer[1] < entry[1]:
+                    self._dirty_slots[slot_id] = entry
+            for lot_id, version in lots.items():
+                self._dirty_lots[lot_id] = max(version, self._dirty_lots.get(lot_id, 0))
+
+
+slot_store = SlotStore(settings.SLOT_STORE_ENABLED, settings.SLOT_STORE_FLUSH_INTERVAL)
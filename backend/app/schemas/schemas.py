@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import List, Optional, Any
-from datetime import datetime
+from datetime import datetime, timezone
 
 # --- User & Authentication Schemas ---
 class UserCreate(BaseModel):
@@ -74,6 +74,13 @@ class CameraCreate(CameraBase):
 class BookingCreate(BaseModel):
     slot_id: int = Field(..., description="ID of the slot to book")
     duration_hours: int = Field(..., ge=1, le=24, description="Booking duration in hours (1-24)")
+    start_time: Optional[datetime] = Field(default=None, description="Booking start (UTC), defaults to now")
+    
+    @validator('start_time')
+    def validate_start_time(cls, v):
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
 
 
 class InferenceResult(BaseModel):
@@ -86,6 +93,7 @@ class Slot(SlotBase):
     id: int
     lot_id: int
     status: str = "free"  # Computed/Latest
+    version: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -95,6 +103,7 @@ class Slot(SlotBase):
 
 class ParkingLot(ParkingLotBase):
     id: int
+    version: int = 0
     slots: List[Slot] = []
     created_at: datetime
     updated_at: datetime
@@ -130,6 +139,102 @@ class SlotStatusUpdate(BaseModel):
         return v
 
 
+class SlotStatusBatchItem(SlotStatusUpdate):
+    slot_id: int = Field(..., description="ID of the slot to update")
+
+
+class SlotStatusBatchUpdate(BaseModel):
+    updates: List[SlotStatusBatchItem] = Field(
+        ..., min_length=1, max_length=5000,
+        description="Slot transitions, applied in order (last one wins per slot)"
+    )
+
+
+class SlotStatusBatchResult(BaseModel):
+    updated: List[int] = Field(default_factory=list, description="Slots whose status changed")
+    ignored: List[int] = Field(default_factory=list, description="Updates rejected by the reserved-slot priority rule")
+    not_found: List[int] = Field(default_factory=list, description="Unknown slot IDs for this lot")
+    version: Optional[int] = Field(default=None, description="Lot version after the batch (None if nothing changed)")
+
+
+class LotChanges(BaseModel):
+    lot_id: int
+    version: int = Field(..., description="Current lot version; pass it as `since` on the next call")
+    reset: bool = Field(default=False, description="True when `slots` is a full snapshot instead of a delta")
+    slots: List[Slot] = Field(default_factory=list, description="Slots changed after `since`")
+
+
+# --- Lot Listing Schemas (documentation only, the listing is serialized without validation) ---
+class SlotListing(BaseModel):
+    """A slot in GET /lots/: only the fields requested with `?fields=` are present."""
+    id: Optional[int] = None
+    lot_id: Optional[int] = None
+    name: Optional[str] = None
+    polygon: Optional[List[List[float]]] = None
+    slot_type: Optional[str] = None
+    rate_per_hour: Optional[float] = None
+    is_active: Optional[bool] = None
+    status: Optional[str] = None
+    version: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ParkingLotListing(ParkingLotBase):
+    id: int
+    version: int = 0
+    slots: List[SlotListing] = []
+    created_at: datetime
+    updated_at: datetime
+
+
+# --- Availability Search Schema ---
+class AvailableSlot(BaseModel):
+    slot_id: int
+    slot_name: Optional[str] = None
+    slot_type: str
+    rate_per_hour: float
+    estimated_cost: float = Field(..., description="rate_per_hour x duration")
+    lot_id: int
+    lot_name: Optional[str] = None
+    distance_km: Optional[float] = Field(default=None, description="Distance from `near` (None without it)")
+
+
+# --- Occupancy Analytics Schemas ---
+class PeakHour(BaseModel):
+    hour: int = Field(..., ge=0, le=23, description="Hour of day (UTC)")
+    occupancy: float = Field(..., description="Average share of slots occupied during that hour")
+
+
+class OccupancyMetrics(BaseModel):
+    utilization: float = Field(..., description="Occupied slot-seconds / available slot-seconds")
+    arrivals: int
+    departures: int
+    avg_dwell_minutes: Optional[float] = Field(default=None, description="Average length of the stays that ended")
+
+
+class OccupancySummary(OccupancyMetrics):
+    slots: int
+    occupied_hours: float
+    turnover: float = Field(..., description="Arrivals per slot")
+    peak_hour: Optional[PeakHour] = None
+
+
+class OccupancyPoint(OccupancyMetrics):
+    bucket_start: datetime
+
+
+class OccupancyAnalytics(BaseModel):
+    lot_id: int
+    slot_id: Optional[int] = None
+    granularity: str
+    start: datetime = Field(..., alias="from")
+    end: datetime = Field(..., alias="to")
+    complete_until: Optional[datetime] = Field(default=None, description="Rollups are final up to this time")
+    summary: OccupancySummary
+    series: List[OccupancyPoint] = Field(default_factory=list)
+
+
 # --- Pagination Schema ---
 class PaginationMeta(BaseModel):
     total: int
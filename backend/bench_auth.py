@@ -0,0 +1,96 @@
+"""
+Benchmark: authenticated request throughput.
+
+Drives the app in-process (httpx ASGITransport, no network) against a
+throwaway SQLite database and compares requests per second for:
+
+    health     GET /health, no authentication (the ceiling)
+    uncached   GET /auth/me, token decoded and user loaded on every request
+    cached     GET /auth/me, verified claims and user served from the caches
+    stateless  GET /auth/me with AUTH_STATELESS, user built from the token claims
+
+Usage:
+    python bench_auth.py [--requests 5000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+
+async def run(client, path, headers, total, concurrency):
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def bench(args):
+    import httpx
+    from app.core import security
+    from app.core.config import settings
+    from app.db import models, session
+    from main import app
+
+    models.Base.metadata.create_all(bind=session.engine)
+    db = session.SessionLocal()
+    user = models.User(
+        id=str(uuid.uuid4()), email="bench@example.com", name="Bench",
+        hashed_password=security.get_password_hash("benchmark"), is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    token = security.create_access_token(data={"sub": user.id, **security.user_claims(user)})
+    db.close()
+
+    headers = {"Authorization": f"Bearer {token}"}
+    prefix = settings.API_V1_STR
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        def configure(ttl, stateless):
+            for cache in (security.token_cache, security.user_cache):
+                cache.clear()
+                cache.ttl = ttl
+            settings.AUTH_STATELESS = stateless
+
+        runs = (
+            ("health", f"{prefix}/health", {}, (settings.AUTH_CACHE_TTL, False)),
+            ("uncached", f"{prefix}/auth/me", headers, (0, False)),
+            ("cached", f"{prefix}/auth/me", headers, (settings.AUTH_CACHE_TTL, False)),
+            ("stateless", f"{prefix}/auth/me", headers, (settings.AUTH_CACHE_TTL, True)),
+        )
+        print(f"{'path':<12}{'req/s':>10}")
+        for label, path, request_headers, config in runs:
+            configure(*config)
+            await run(client, path, request_headers, min(args.requests, 200), args.concurrency)  # warm up
+            rate = await run(client, path, request_headers, args.requests, args.concurrency)
+            print(f"{label:<12}{rate:>10.0f}")
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="auth_")
+    # session.py uses ./sql_app.db, so run from the scratch directory
+    os.chdir(workdir)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    main(parser.parse_args())
@@ -0,0 +1,137 @@
+"""
+Benchmark: availability search over 10,000 lots.
+
+Builds a throwaway SQLite database (lots spread over a ~55 km square, slots
+of mixed types and rates, ~40% free) and times random searches
+("ev slots for 2 hours within 5 km of <point>") with:
+
+    scan   SQL over slots JOIN parking_lots, distance filter and ranking in
+           Python - what a table-scan implementation would do
+    index  availability_index.search: free-slot bitsets + lat/lon grid
+
+Usage:
+    python bench_availability.py [--lots 10000] [--slots 50] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ORIGIN = (18.40, 73.70)  # south-west corner of the area
+SPAN_DEG = 0.5
+SLOT_TYPES = ["regular"] * 7 + ["premium"] * 2 + ["ev"]
+
+
+def build_database(path, num_lots, num_slots, rng):
+    from app.db.models import Base
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    now = datetime.utcnow().isoformat(" ")
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO parking_lots (id, name, address, geo_location, version, created_at, updated_at) "
+        "VALUES (?, ?, '', ?, 0, ?, ?)",
+        [
+            (l, f"Lot {l}", f"{ORIGIN[0] + rng.random() * SPAN_DEG:.6f},{ORIGIN[1] + rng.random() * SPAN_DEG:.6f}",
+             now, now)
+            for l in range(1, num_lots + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO slots (lot_id, name, polygon, slot_type, rate_per_hour, is_active, status, version, "
+        "created_at, updated_at) VALUES (?, ?, '[]', ?, ?, 1, ?, 0, ?, ?)",
+        (
+            (l, f"S{s}", rng.choice(SLOT_TYPES), rng.choice((10.0, 15.0, 20.0, 30.0)),
+             "free" if rng.random() < 0.4 else "occupied", now, now)
+            for l in range(1, num_lots + 1) for s in range(num_slots)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def main(args):
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix="availability_")
+    # session.py uses ./sql_app.db, so run from the scratch directory
+    os.chdir(workdir)
+    print(f"Building {args.lots} lots x {args.slots} slots in {workdir}...")
+    build_database(os.path.join(workdir, "sql_app.db"), args.lots, args.slots, rng)
+
+    from app.db import models, session
+    from app.db.availability import availability_index, haversine_km, parse_geo
+    from app.db.booking_index import booking_index
+
+    start = time.perf_counter()
+    availability_index.load()
+    booking_index.load()
+    print(f"Index load: {time.perf_counter() - start:.2f} s")
+
+    points = [(ORIGIN[0] + rng.random() * SPAN_DEG, ORIGIN[1] + rng.random() * SPAN_DEG) for _ in range(args.queries)]
+    window_start = datetime.utcnow()
+    window_end = window_start + timedelta(hours=2)
+
+    def scan(point):
+        db = session.SessionLocal()
+        try:
+            rows = db.query(
+                models.Slot.id, models.Slot.rate_per_hour, models.ParkingLot.id, models.ParkingLot.geo_location
+            ).join(models.ParkingLot, models.ParkingLot.id == models.Slot.lot_id).filter(
+                models.Slot.status == "free", models.Slot.is_active.is_(True), models.Slot.slot_type == "ev"
+            ).all()
+        finally:
+            db.close()
+        ranked = []
+        for slot_id, rate, lot_id, geo in rows:
+            distance = haversine_km(point, parse_geo(geo))
+            if distance <= args.radius and booking_index.is_free(slot_id, window_start, window_end):
+                ranked.append((distance, rate, slot_id))
+        ranked.sort()
+        return ranked[:10]
+
+    def index(point):
+        return availability_index.search(
+            window_start, window_end, booking_index.is_free, near=point,
+            radius_km=args.radius, slot_type="ev", limit=10,
+        )
+
+    print(f"{'path':<8}{'queries':>10}{'p50':>12}{'p99':>12}")
+    for label, search, count in (("scan", scan, min(args.queries, 20)), ("index", index, args.queries)):
+        timings = []
+        for point in points[:count]:
+            t = time.perf_counter()
+            search(point)
+            timings.append(time.perf_counter() - t)
+        p50, p99 = percentiles(timings)
+        print(f"{label:<8}{count:>10}{p50:>10.2f}ms{p99:>10.2f}ms")
+
+    # Same answer from both paths
+    for point in points[:5]:
+        expected = [slot_id for _, _, slot_id in scan(point)]
+        got = [r["slot_id"] for r in index(point)]
+        assert expected == got, (expected, got)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=10000)
+    parser.add_argument("--slots", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius", type=float, default=5.0, help="Search radius in km")
+    main(parser.parse_args())
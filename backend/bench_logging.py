@@ -0,0 +1,122 @@
+"""
+Benchmark: slot-status throughput under each logging mode.
+
+Builds a throwaway SQLite database, then for each LOG_MODE runs the app in a
+fresh subprocess (logging is configured at import) with its lifespan (slot
+store, history writer) and drives it in-process with httpx ASGITransport.
+The ML-service style load is POST /lots/{lot}/slots/{slot}/status with slots
+alternating between free and occupied; CPU time per request is reported
+next to throughput.
+
+    standard  console + rotating file + error file, two lines per request
+    fast      one batched JSON sink, slot-status request logs dropped (counted)
+
+Usage:
+    python bench_logging.py [--requests 5000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+NUM_LOTS = 10
+SLOTS_PER_LOT = 50
+
+
+def build_database(path):
+    from app.db.models import Base
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    now = datetime.utcnow().isoformat(" ")
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO parking_lots (id, name, address, geo_location, version, created_at, updated_at) "
+        "VALUES (?, ?, '', '', 0, ?, ?)",
+        [(l, f"Lot {l}", now, now) for l in range(1, NUM_LOTS + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO slots (lot_id, name, polygon, slot_type, rate_per_hour, is_active, status, version, "
+        "created_at, updated_at) VALUES (?, ?, '[]', 'regular', 10.0, 1, 'free', 0, ?, ?)",
+        [(l, f"S{s}", now, now) for l in range(1, NUM_LOTS + 1) for s in range(SLOTS_PER_LOT)],
+    )
+    conn.commit()
+    conn.close()
+
+
+async def drive(args):
+    import httpx
+    from app.core.config import settings
+    from main import app
+
+    prefix = settings.API_V1_STR
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def run(total):
+                remaining = total
+
+                async def worker():
+                    nonlocal remaining
+                    while remaining > 0:
+                        remaining -= 1
+                        slot_id = remaining % (NUM_LOTS * SLOTS_PER_LOT) + 1
+                        lot_id = (slot_id - 1) // SLOTS_PER_LOT + 1
+                        status = "occupied" if (remaining // (NUM_LOTS * SLOTS_PER_LOT)) % 2 else "free"
+                        response = await client.post(
+                            f"{prefix}/lots/{lot_id}/slots/{slot_id}/status", json={"status": status}
+                        )
+                        assert response.status_code == 200, response.text
+
+                wall, cpu = time.perf_counter(), time.process_time()
+                await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+                return total / (time.perf_counter() - wall), (time.process_time() - cpu) / total
+
+            await run(min(args.requests, 1000))  # warm up
+            rate, cpu = await run(args.requests)
+    print(f"RESULT {rate:.0f} {cpu * 1e6:.0f}", file=sys.stderr)
+
+
+def main(args):
+    if args.child:
+        asyncio.run(drive(args))
+        return
+    workdir = tempfile.mkdtemp(prefix="logging_")
+    # session.py uses ./sql_app.db, so run from the scratch directory
+    os.chdir(workdir)
+    build_database(os.path.join(workdir, "sql_app.db"))
+
+    print(f"{'mode':<10}{'req/s':>10}{'cpu/req':>12}")
+    for mode in ("standard", "fast"):
+        env = dict(
+            os.environ, LOG_MODE=mode, LOG_FILE=os.path.join(workdir, "logs", "app.log"),
+            ROLLUP_ENGINE_ENABLED="False", RATE_LIMIT_ENABLED="False",
+        )
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        result = [line for line in child.stderr.splitlines() if line.startswith("RESULT ")]
+        if not result:
+            sys.exit(f"{mode} run failed:\n{child.stderr[-2000:]}")
+        rate, cpu = result[-1].split()[1:]
+        print(f"{mode:<10}{rate:>10}{cpu:>10}us")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""
+Benchmark: other endpoints' latency during a login storm.
+
+Drives the app in-process (httpx ASGITransport) against a throwaway SQLite
+database. Probes GET /health (a sync endpoint, served from the shared
+threadpool) and GET /lots/ (async) at a steady rate, first on an idle
+server, then while `--logins` concurrent logins hit /auth/login. Logins that
+do not fit in the password hashing pool and its queue get a fast 503.
+
+Usage:
+    python bench_login_storm.py [--logins 200] [--probes 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+async def probe(client, path, count, interval):
+    timings = []
+    for _ in range(count):
+        t = time.perf_counter()
+        response = await client.get(path)
+        assert response.status_code == 200, response.text
+        timings.append(time.perf_counter() - t)
+        await asyncio.sleep(interval)
+    return timings
+
+
+async def bench(args):
+    import httpx
+    from app.core import security
+    from app.core.config import settings
+    from app.db import models, session
+    from main import app
+
+    models.Base.metadata.create_all(bind=session.engine)
+    db = session.SessionLocal()
+    db.add(models.User(
+        id=str(uuid.uuid4()), email="storm@example.com", name="Storm",
+        hashed_password=security.get_password_hash("benchmark"), is_active=True,
+    ))
+    db.commit()
+    db.close()
+
+    prefix = settings.API_V1_STR
+    paths = (f"{prefix}/health", f"{prefix}/lots/")
+    print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, hashing workers {settings.PASSWORD_HASH_WORKERS}, "
+          f"queue {settings.PASSWORD_HASH_QUEUE}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def login():
+            response = await client.post(
+                f"{prefix}/auth/login", data={"username": "storm@example.com", "password": "benchmark"}
+            )
+            return response.status_code
+
+        print(f"{'phase':<8}{'path':<22}{'p50':>10}{'p99':>12}")
+        for phase in ("idle", "storm"):
+            storm = [asyncio.create_task(login()) for _ in range(args.logins if phase == "storm" else 0)]
+            results = await asyncio.gather(*(probe(client, path, args.probes, 0.005) for path in paths))
+            for path, timings in zip(paths, results):
+                p50, p99 = percentiles(timings)
+                print(f"{phase:<8}{path:<22}{p50:>8.2f}ms{p99:>10.2f}ms")
+            if storm:
+                start = time.perf_counter()
+                codes = await asyncio.gather(*storm)
+                print(f"logins: {codes.count(200)} ok, {codes.count(503)} rejected with 503 "
+                      f"(storm drained {time.perf_counter() - start:.1f} s after the probes)")
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="login_storm_")
+    # session.py uses ./sql_app.db, so run from the scratch directory
+    os.chdir(workdir)
+    asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,130 @@
+"""
+Benchmark: lot listing at 1,000 lots x 500 slots.
+
+Builds a throwaway SQLite database and pages through all lots (100 per page)
+with:
+
+    orm         ORM instances, lazy-loaded slots (one query per lot) and full
+                Pydantic validation - the original listing path
+    projection  list_lot_rows: two column-projected queries per page, plain rows
+    fields      projection with ?fields=id,status
+    store       the in-memory slot store (SLOT_STORE_ENABLED)
+
+Usage:
+    python bench_lot_listing.py [--lots 1000] [--slots 500] [--limit 100]
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def build_database(path, num_lots, num_slots):
+    from app.db.models import Base
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    now = datetime.utcnow().isoformat(" ")
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO parking_lots (id, name, address, geo_location, version, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, 0, ?, ?)",
+        [(l, f"Lot {l}", f"{l} Main St", f"{18.5 + l * 1e-3},{73.8}", now, now) for l in range(1, num_lots + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO slots (lot_id, name, polygon, slot_type, rate_per_hour, is_active, status, version, "
+        "created_at, updated_at) VALUES (?, ?, ?, 'regular', 10.0, 1, ?, 0, ?, ?)",
+        (
+            (l, f"S{s}", "[[0, 0], [10, 0], [10, 20], [0, 20]]", "occupied" if s % 3 == 0 else "free", now, now)
+            for l in range(1, num_lots + 1) for s in range(num_slots)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def bench(label, fetch_page, limit):
+    """Page through every lot; returns seconds and response bytes."""
+    start = time.perf_counter()
+    after_id, total_bytes, pages = 0, 0, 0
+    while True:
+        lots, body = fetch_page(after_id)
+        total_bytes += len(body)
+        pages += 1
+        if len(lots) < limit:
+            break
+        after_id = lots[-1]["id"]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12}{elapsed:>10.2f} s{elapsed / pages * 1000:>12.1f} ms/page{total_bytes / 1e6:>10.1f} MB")
+    return elapsed
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="lot_listing_")
+    # session.py uses ./sql_app.db, so run from the scratch directory
+    os.chdir(workdir)
+    print(f"Building {args.lots} lots x {args.slots} slots in {workdir}...")
+    build_database(os.path.join(workdir, "sql_app.db"), args.lots, args.slots)
+
+    from app.api.endpoints.lots import ListingResponse, list_lot_rows, parse_slot_fields
+    from app.db import models, session
+    from app.db.slot_store import SlotStore
+    from app.schemas import schemas
+
+    loop = asyncio.new_event_loop()
+    render = ListingResponse(None).render
+    print(f"{'path':<12}{'total':>12}{'per page':>20}{'payload':>13}")
+
+    def orm_page(after_id):
+        db = session.SessionLocal()
+        try:
+            lots = db.query(models.ParkingLot).offset(after_id).limit(args.limit).all()
+            body = [schemas.ParkingLot.model_validate(lot).model_dump(mode="json") for lot in lots]
+        finally:
+            db.close()
+        # offset-based: report the offset of the next page as the cursor
+        return [{"id": after_id + len(body)}] * len(body), render(body)
+
+    def projection_page(fields):
+        slot_fields = parse_slot_fields(fields)
+
+        async def fetch(after_id):
+            async with session.AsyncSessionLocal() as db:
+                return await list_lot_rows(db, after_id, args.limit, slot_fields)
+
+        def page(after_id):
+            lots = loop.run_until_complete(fetch(after_id))
+            return lots, render(lots)
+        return page
+
+    store = SlotStore()
+    loop.run_until_complete(store.load())
+
+    def store_page(after_id):
+        lots = store.list_lots(after_id, args.limit)
+        return lots, render(lots)
+
+    if not args.skip_orm:
+        bench("orm", orm_page, args.limit)
+    bench("projection", projection_page(None), args.limit)
+    bench("fields", projection_page("id,status"), args.limit)
+    bench("store", store_page, args.limit)
+    loop.run_until_complete(session.async_engine.dispose())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=1000)
+    parser.add_argument("--slots", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--skip-orm", action="store_true", help="Skip the (slow) original ORM path")
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""
+Load test: GET /lots/ latency while slot status updates are being hammered.
+
+Measures /lots/ latency alone (baseline), then again while `--writers`
+concurrent clients keep posting slot status flips, and prints p50/p99 for
+both phases. With the async data-access layer the p99 should stay flat.
+
+Usage (against a running backend):
+    python bench_lots_latency.py [--url http://localhost:8000/api/v1] [--lot 1]
+                                 [--seconds 10] [--writers 16] [--readers 4]
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+
+import httpx
+import numpy as np
+
+REQUEST_TIMEOUT = 10.0
+
+
+async def reader(client, url, latencies, timeouts, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = await client.get(f"{url}/lots/")
+        except httpx.TimeoutException:
+            timeouts[0] += 1
+            continue
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def writer(client, url, lot_id, slot_ids, counter, stop):
+    statuses = itertools.cycle(["occupied", "free"])
+    while not stop.is_set():
+        status = next(statuses)
+        for slot_id in slot_ids:
+            try:
+                await client.post(f"{url}/lots/{lot_id}/slots/{slot_id}/status", json={"status": status})
+            except httpx.TimeoutException:
+                continue
+            counter[0] += 1
+            if stop.is_set():
+                break
+
+
+async def phase(url, lot_id, slot_ids, seconds, readers, writers):
+    latencies, timeouts, writes = [], [0], [0]
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=readers + writers)
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        tasks = [asyncio.create_task(reader(client, url, latencies, timeouts, stop)) for _ in range(readers)]
+        tasks += [
+            asyncio.create_task(writer(client, url, lot_id, slot_ids, writes, stop))
+            for _ in range(writers)
+        ]
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+    return np.array(latencies) * 1000, timeouts[0], writes[0] / seconds
+
+
+async def main(args):
+    async with httpx.AsyncClient() as client:
+        lots = (await client.get(f"{args.url}/lots/")).json()
+    lot = next((l for l in lots if l["id"] == args.lot), None)
+    if not lot or not lot["slots"]:
+        raise SystemExit(f"Lot {args.lot} not found or has no slots")
+    slot_ids = [s["id"] for s in lot["slots"]]
+
+    print(f"{'phase':<12}{'requests':>10}{'timeouts':>10}{'p50 ms':>10}{'p99 ms':>10}{'writes/s':>10}")
+    for name, writers in (("baseline", 0), ("hammered", args.writers)):
+        latencies, timeouts, write_rate = await phase(
+            args.url, args.lot, slot_ids, args.seconds, args.readers, writers
+        )
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (float("nan"),) * 2
+        print(f"{name:<12}{len(latencies):>10}{timeouts:>10}{p50:>10.1f}{p99:>10.1f}{write_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--lot", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Benchmark: WebSocket fan-out latency with slow and dead clients.
+
+Runs the real ConnectionManager in-process against fake sockets: most
+clients accept messages immediately, some take `--slow-ms` per message and
+a few raise on send. Reports how long `broadcast()` takes and how quickly
+the healthy clients receive each slot update.
+
+Usage:
+    python bench_ws_fanout.py [--clients 5000] [--messages 200] [--slow 50] [--slow-ms 500] [--dead 10]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.api.endpoints.websockets import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, delay=0.0, dead=False, latencies=None):
+        self.delay = delay
+        self.dead = dead
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, text):
+        if self.dead:
+            raise ConnectionResetError("client went away")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.latencies is not None:
+            self.latencies.append(time.perf_counter())
+
+
+async def main(args):
+    manager = ConnectionManager()
+    await manager.start()
+    delivered = []
+    healthy = args.clients - args.slow - args.dead
+    for i in range(args.clients):
+        if i < args.dead:
+            socket = FakeSocket(dead=True)
+        elif i < args.dead + args.slow:
+            socket = FakeSocket(delay=args.slow_ms / 1000)
+        else:
+            socket = FakeSocket(latencies=delivered)
+        await manager.connect(socket, "1")
+
+    broadcast_ms, delivery_ms = [], []
+    for n in range(args.messages):
+        delivered.clear()
+        message = {"type": "slot_update", "slot": {"id": n % args.slots, "status": "occupied", "lot_id": 1}}
+        start = time.perf_counter()
+        await manager.broadcast(message, "1")
+        broadcast_ms.append((time.perf_counter() - start) * 1000)
+        # Let the sender tasks run until every healthy client has the message
+        while len(delivered) < healthy:
+            await asyncio.sleep(0)
+        delivery_ms.append((max(delivered) - start) * 1000)
+        await asyncio.sleep(args.interval_ms / 1000)
+
+    print(f"clients: {args.clients} ({args.slow} slow @ {args.slow_ms:.0f} ms, {args.dead} dead)")
+    print(f"broadcast call:   p50 {np.percentile(broadcast_ms, 50):.2f} ms | p99 {np.percentile(broadcast_ms, 99):.2f} ms")
+    print(f"healthy delivery: p50 {np.percentile(delivery_ms, 50):.2f} ms | p99 {np.percentile(delivery_ms, 99):.2f} ms")
+    print(f"manager: {manager.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--dead", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
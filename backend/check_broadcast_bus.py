@@ -0,0 +1,152 @@
+"""
+Check: RedisBus against a local Redis stand-in, including reconnects.
+
+Starts a minimal in-process server that speaks enough of the Redis protocol
+for pub/sub (PSUBSCRIBE, PUBLISH, PING), connects two RedisBus instances to
+it (two "workers") and checks that:
+
+1. a message published by either worker reaches both;
+2. after the server drops every connection and comes back, both workers
+   resubscribe on their own and messages flow again.
+
+Needs redis-py (see requirements.txt), not a Redis server.
+
+Usage:
+    python check_broadcast_bus.py
+"""
+
+import asyncio
+import fnmatch
+import os
+import sys
+
+
+def encode(*items) -> bytes:
+    out = [b"*%d\r\n" % len(items)]
+    for item in items:
+        if isinstance(item, int):
+            out.append(b":%d\r\n" % item)
+        else:
+            item = item if isinstance(item, bytes) else str(item).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(item), item))
+    return b"".join(out)
+
+
+class RedisStandIn:
+    """Pub/sub subset of a Redis server on 127.0.0.1."""
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+        self.patterns = {}  # writer -> set of patterns
+        self.writers = set()
+
+    async def start(self, port: int = 0):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and drop every client, like a Redis restart."""
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        await self.server.wait_closed()
+        self.patterns.clear()
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _serve(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                command = args[0].upper()
+                if command == b"PSUBSCRIBE":
+                    patterns = self.patterns.setdefault(writer, set())
+                    for pattern in args[1:]:
+                        patterns.add(pattern)
+                        writer.write(encode(b"psubscribe", pattern, len(patterns)))
+                elif command == b"PUNSUBSCRIBE":
+                    self.patterns.pop(writer, None)
+                    writer.write(encode(b"punsubscribe", args[1] if len(args) > 1 else b"", 0))
+                elif command == b"PUBLISH":
+                    channel, data = args[1], args[2]
+                    receivers = 0
+                    for peer, patterns in list(self.patterns.items()):
+                        for pattern in patterns:
+                            if fnmatch.fnmatchcase(channel.decode(), pattern.decode()):
+                                peer.write(encode(b"pmessage", pattern, channel, data))
+                                receivers += 1
+                    writer.write(b":%d\r\n" % receivers)
+                elif command == b"PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            self.patterns.pop(writer, None)
+            writer.close()
+
+
+async def expect(received, count, label, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while any(len(r) < count for r in received) and loop.time() < deadline:
+        await asyncio.sleep(0.02)
+    ok = all(len(r) >= count for r in received)
+    print(f"{'ok  ' if ok else 'FAIL'} {label}: {[len(r) for r in received]} messages, expected {count} each")
+    return ok
+
+
+async def check():
+    from app.core.broadcast import MemoryBus, RedisBus
+
+    ok = True
+    await MemoryBus().publish("1", "{}")  # not started: must not raise
+    print("ok   MemoryBus.publish before start()")
+
+    stand_in = RedisStandIn()
+    await stand_in.start()
+    url = f"redis://127.0.0.1:{stand_in.port}/0"
+    received = [[], []]
+    buses = [RedisBus(url), RedisBus(url)]
+    for bus, inbox in zip(buses, received):
+        await bus.start(lambda channel, text, inbox=inbox: inbox.append((channel, text)))
+
+    await buses[0].publish("7", '{"n": 1}')
+    await buses[1].publish("7", '{"n": 2}')
+    ok &= await expect(received, 2, "both workers receive both messages")
+
+    port = stand_in.port
+    await stand_in.stop()
+    await asyncio.sleep(1.0)
+    await stand_in.start(port)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 10.0
+    while len(stand_in.patterns) < 2 and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    await buses[0].publish("7", '{"n": 3}')
+    ok &= await expect(received, 3, "workers resubscribe after the server restarts")
+
+    for bus in buses:
+        await bus.stop()
+    await stand_in.stop()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -9,7 +9,17 @@ from contextlib import asynccontextmanager
 
 from app.api.api import api_router
 from app.core.config import settings
-from app.core.middleware import RequestIDMiddleware, LoggingMiddleware, ErrorHandlingMiddleware
+from app.db import session
+from app.api.endpoints.websockets import manager
+from app.db.slot_store import slot_store
+from app.db.history import history_writer
+from app.db.rollups import rollup_engine
+from app.db.booking_index import booking_index
+from app.db.availability import availability_index
+from app.db.revocation import revocation_list
+from app.core import security
+from app.core.security import password_hasher
+from app.core.middleware import RequestContextMiddleware
 from app.core.exceptions import ParkingSystemException
 from app.core import logging_config  # Initialize logging
 from loguru import logger
@@ -21,8 +31,31 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.PROJECT_NAME} - Environment: {settings.ENVIRONMENT}")
     logger.info(f"API Documentation available at: http://{settings.HOST}:{settings.PORT}/docs")
+    availability_index.load()
+    manager.listeners.append(availability_index.on_message)
+    manager.listeners.append(revocation_list.on_message)
+    manager.listeners.append(security.on_message)
+    security.publish_internal = manager.publish_internal_nowait
+    await manager.start()
+    logger.info(f"WebSocket broadcast bus: {manager.bus.name}")
+    if slot_store.enabled:
+        await slot_store.start()
+    await history_writer.start()
+    booking_index.load()
+    await revocation_list.start()
+    if rollup_engine.enabled:
+        await rollup_engine.start()
     yield
     # Shutdown
+    if slot_store.enabled:
+        await slot_store.stop()
+    await history_writer.stop()
+    if rollup_engine.enabled:
+        await rollup_engine.stop()
+    await revocation_list.stop()
+    await manager.stop()
+    password_hasher.shutdown()
+    await session.async_engine.dispose()
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
 
 
@@ -44,10 +77,8 @@ if settings.RATE_LIMIT_ENABLED:
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
-# Add custom middleware (order matters - first added is outermost)
-app.add_middleware(ErrorHandlingMiddleware)
-app.add_middleware(LoggingMiddleware)
-app.add_middleware(RequestIDMiddleware)
+# Request ID, timing and request logging (pure ASGI)
+app.add_middleware(RequestContextMiddleware, sampler=logging_config.request_log_sampler)
 
 # CORS middleware
 if settings.BACKEND_CORS_ORIGINS:
@@ -0,0 +1,42 @@
+"""
+Rebuild the occupancy rollups from the full slot status history.
+
+Creates the rollup tables if needed, drops the engine checkpoint and runs the
+vectorized backfill. Stop the API (or the process running the rollup engine)
+first; the engine resumes from the new checkpoint on its next start.
+
+Usage:
+    python rebuild_rollups.py
+"""
+
+import asyncio
+import os
+import sys
+
+
+async def main():
+    from sqlalchemy import delete
+
+    from app.db import models
+    from app.db.rollups import RollupEngine
+    from app.db.session import AsyncSessionLocal, async_engine
+    from app.core.config import settings
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(models.OccupancyRollup.__table__.create, checkfirst=True)
+        await conn.run_sync(models.RollupCheckpoint.__table__.create, checkfirst=True)
+    print("✓ occupancy_rollups and rollup_checkpoints tables ready")
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.RollupCheckpoint))
+        await db.commit()
+
+    engine = RollupEngine(minute_retention_days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+    await engine.backfill()
+    print(f"✓ Rollups rebuilt up to {engine.snapshot()['final_until']} ({engine.stats['rows_written']} rows)")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""
+Pluggable car-detection backends.
+
+Every backend returns, per input frame, a float32 array of shape (N, 6) with
+x1, y1, x2, y2, confidence, class_id in the frame's own pixel coordinates.
+
+    ultralytics  The ultralytics Python API (reference implementation)
+    onnx         YOLO exported once to ONNX, run with ONNX Runtime on CPU
+    openvino     YOLO exported once to OpenVINO IR, run with the OpenVINO CPU plugin
+
+The exported backends cache the converted model under EXPORT_CACHE_DIR, keep
+a preallocated input tensor, and do letterboxing, class filtering and NMS in
+NumPy, so torch is only needed the first time a model is exported. Models are
+exported with a dynamic batch axis, so `predict` runs all frames of a tick in
+one model call, like the ultralytics backend.
+"""
+
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+MODEL_WEIGHTS = "yolov8n.pt"
+IMAGE_SIZE = 416
+CONFIDENCE_THRESHOLD = 0.45
+NMS_IOU_THRESHOLD = 0.5
+CAR_CLASSES = (2,)
+EXPORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+LETTERBOX_COLOR = 114
+
+
+class InferenceBackend:
+    """Base class: subclasses implement `predict`."""
+
+    name = "base"
+
+    def __init__(self, weights=MODEL_WEIGHTS, imgsz=IMAGE_SIZE, conf=CONFIDENCE_THRESHOLD,
+                 iou=NMS_IOU_THRESHOLD, classes=CAR_CLASSES):
+        self.weights = weights
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.classes = tuple(classes)
+
+    def predict(self, frames):
+        """Detect cars in a list of BGR frames; returns one (N, 6) array per frame."""
+        raise NotImplementedError
+
+    def __call__(self, frame):
+        return self.predict([frame])[0]
+
+
+class UltralyticsBackend(InferenceBackend):
+    """The original ultralytics path, batched over all frames of a tick."""
+
+    name = "ultralytics"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        from ultralytics import YOLO
+
+        self.model = YOLO(self.weights)
+
+    def predict(self, frames):
+        results = self.model(
+            frames,
+            conf=self.conf,
+            iou=self.iou,
+            classes=list(self.classes),
+            verbose=False,
+            device='cpu',
+            imgsz=self.imgsz
+        )
+        return [r.boxes.data.cpu().numpy().astype(np.float32).reshape(-1, 6) for r in results]
+
+
+class ExportedYoloBackend(InferenceBackend):
+    """Shared NumPy pre/post-processing for exported YOLOv8 models."""
+
+    export_format = None
+
+    def __init__(self, cache_dir=EXPORT_CACHE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        # Preallocated letterbox canvas (HWC, BGR) and network input (NCHW, RGB, 0..1),
+        # grown to the largest batch seen
+        self._canvas = np.full((self.imgsz, self.imgsz, 3), LETTERBOX_COLOR, dtype=np.uint8)
+        self._input = np.empty((1, 3, self.imgsz, self.imgsz), dtype=np.float32)
+
+    def exported_path(self):
+        """Export the model on first use and return the cached artifact path."""
+        stem = os.path.splitext(os.path.basename(self.weights))[0]
+        suffix = ".onnx" if self.export_format == "onnx" else f"_{self.export_format}_model"
+        # "_dyn": dynamic batch axis (artifacts cached by older versions are batch 1)
+        target = os.path.join(self.cache_dir, f"{stem}_{self.imgsz}_dyn{suffix}")
+        if os.path.exists(target):
+            return target
+
+        from ultralytics import YOLO
+
+        print(f"📦 Exporting {self.weights} to {self.export_format} (one-time)...")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        exported = YOLO(self.weights).export(format=self.export_format, imgsz=self.imgsz, dynamic=True)
+        shutil.move(str(exported), target)
+        print(f"✓ Cached exported model at {target}")
+        return target
+
+    def input_batch(self, n):
+        """The first `n` rows of the input tensor, growing it if needed."""
+        if len(self._input) < n:
+            self._input = np.empty((n, 3, self.imgsz, self.imgsz), dtype=np.float32)
+        return self._input[:n]
+
+    def preprocess(self, frame, index=0):
+        """Letterbox `frame` into row `index` of the input tensor; returns (scale, pad_x, pad_y)."""
+        h, w = frame.shape[:2]
+        scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+
+        self._canvas.fill(LETTERBOX_COLOR)
+        self._canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1], written in place
+        np.multiply(self._canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=self._input[index])
+        return scale, pad_x, pad_y
+
+    def postprocess(self, output, scale, pad_x, pad_y, frame_shape):
+        """Decode a raw (1, 4 + classes, anchors) YOLOv8 output into (N, 6) detections."""
+        pred = output[0]
+        class_scores = pred[4:]
+        class_ids = class_scores.argmax(axis=0)
+        confs = class_scores[class_ids, np.arange(class_scores.shape[1])]
+
+        keep = (confs > self.conf) & np.isin(class_ids, self.classes)
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+
+        cx, cy, bw, bh = pred[:4, keep]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        confs, class_ids = confs[keep], class_ids[keep]
+
+        order = nms(boxes, confs, self.iou)
+        boxes, confs, class_ids = boxes[order], confs[order], class_ids[order]
+
+        # Undo letterboxing
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / scale
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / scale
+        h, w = frame_shape[:2]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, w)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+
+        return np.concatenate(
+            [boxes, confs[:, None], class_ids[:, None].astype(np.float32)], axis=1
+        ).astype(np.float32)
+
+    def run(self, tensor):
+        """Run the model on the prepared input tensor; returns the raw output array."""
+        raise NotImplementedError
+
+    def predict(self, frames):
+        if not frames:
+            return []
+        batch = self.input_batch(len(frames))
+        letterbox = [self.preprocess(frame, i) for i, frame in enumerate(frames)]
+        output = self.run(batch)
+        return [
+            self.postprocess(output[i:i + 1], scale, pad_x, pad_y, frame.shape)
+            for i, (frame, (scale, pad_x, pad_y)) in enumerate(zip(frames, letterbox))
+        ]
+
+
+class OnnxBackend(ExportedYoloBackend):
+    """YOLOv8 on ONNX Runtime's CPU execution provider."""
+
+    name = "onnx"
+    export_format = "onnx"
+
+    def __init__(self, threads=None, **kwargs):
+        super().__init__(**kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            self.exported_path(), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        self._output_name = self.session.get_outputs()[0].name
+
+    def run(self, tensor):
+        return self.session.run([self._output_name], {self._input_name: tensor})[0]
+
+
+class OpenVinoBackend(ExportedYoloBackend):
+    """YOLOv8 on the OpenVINO CPU plugin."""
+
+    name = "openvino"
+    export_format = "openvino"
+
+    def __init__(self, threads=None, **kwargs):
+        super().__init__(**kwargs)
+        from openvino.runtime import Core
+
+        core = Core()
+        model_dir = self.exported_path()
+        xml = next(f for f in os.listdir(model_dir) if f.endswith(".xml"))
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = str(threads)
+        self.compiled = core.compile_model(os.path.join(model_dir, xml), "CPU", config)
+        self.request = self.compiled.create_infer_request()
+        self._output = self.compiled.output(0)
+
+    def run(self, tensor):
+        self.request.infer({0: tensor})
+        return self.request.get_tensor(self._output).data
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; returns kept indices, best score first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        ih = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxBackend.name: OnnxBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+def create_backend(name, **kwargs):
+    """Instantiate a backend by name ('ultralytics', 'onnx' or 'openvino')."""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend '{name}' (choose from: {', '.join(BACKENDS)})")
+    if backend_cls is UltralyticsBackend:
+        kwargs.pop("threads", None)
+    return backend_cls(**kwargs)
@@ -0,0 +1,89 @@
+"""
+Benchmark the inference backends on the bundled demo video.
+
+Reports frames/sec and p50/p99 per-frame latency (pre-processing, model and
+post-processing included) for each backend.
+
+Usage:
+    python bench_backends.py [--backends ultralytics,onnx,openvino] [--frames 300]
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backends import create_backend
+
+DEFAULT_VIDEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "videoplayback.mp4")
+WARMUP_FRAMES = 10
+
+
+def load_frames(path, count):
+    """Decode `count` frames up front so video decoding is not measured."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Could not open video: {path}")
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            if not frames:
+                raise SystemExit(f"❌ No frames in video: {path}")
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        frames.append(cv2.resize(frame, (640, 480)))
+    cap.release()
+    return frames
+
+
+def bench(backend, frames):
+    for frame in frames[:WARMUP_FRAMES]:
+        backend(frame)
+
+    latencies = []
+    detections = 0
+    start = time.perf_counter()
+    for frame in frames:
+        t0 = time.perf_counter()
+        detections += len(backend(frame))
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "fps": len(frames) / total,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "cars_per_frame": detections / len(frames),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", default=DEFAULT_VIDEO)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--backends", default="ultralytics,onnx,openvino")
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for exported backends")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    print(f"Video: {args.video} | Frames: {len(frames)}\n")
+    print(f"{'backend':<12} {'fps':>8} {'p50 ms':>9} {'p99 ms':>9} {'cars/frame':>11}")
+
+    for name in args.backends.split(","):
+        name = name.strip()
+        try:
+            backend = create_backend(name, threads=args.threads)
+        except ImportError as e:
+            print(f"{name:<12} skipped ({e})")
+            continue
+        result = bench(backend, frames)
+        print(f"{name:<12} {result['fps']:8.1f} {result['p50_ms']:9.2f} "
+              f"{result['p99_ms']:9.2f} {result['cars_per_frame']:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
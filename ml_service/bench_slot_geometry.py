@@ -0,0 +1,93 @@
+"""
+Microbenchmark: per-pair shapely `get_iou` vs. the batched SlotIndex.
+
+Usage:
+    python bench_slot_geometry.py [--slots 200] [--detections 25] [--frames 200]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from inference_fast import get_iou, IOU_THRESHOLD
+from slot_geometry import SlotIndex
+
+
+def make_slots(num_slots, width=640, height=480):
+    """Build a grid of perspective trapezoids covering the frame."""
+    cols = int(np.ceil(np.sqrt(num_slots * width / height)))
+    rows = int(np.ceil(num_slots / cols))
+    cell_w, cell_h = width // cols, height // rows
+    slots = {}
+    for idx in range(num_slots):
+        r, c = divmod(idx, cols)
+        x1, x2 = c * cell_w + 2, (c + 1) * cell_w - 2
+        y1, y2 = r * cell_h + 2, (r + 1) * cell_h - 2
+        inset = max(1, int(cell_w * 0.15))
+        slots[idx + 1] = {
+            "name": f"S{idx + 1}",
+            "coords": [(x1 + inset, y1), (x2 - inset, y1), (x2, y2), (x1, y2)],
+        }
+    return slots
+
+
+def make_frames(num_frames, num_detections, rng, width=640, height=480):
+    frames = []
+    for _ in range(num_frames):
+        x1 = rng.uniform(0, width - 20, num_detections)
+        y1 = rng.uniform(0, height - 20, num_detections)
+        w = rng.uniform(15, 120, num_detections)
+        h = rng.uniform(15, 90, num_detections)
+        frames.append(np.stack([x1, y1, np.minimum(x1 + w, width), np.minimum(y1 + h, height)], axis=1))
+    return frames
+
+
+def occupancy_shapely(boxes, slots):
+    """The original nested loop from detection_loop."""
+    occupancy = {slot_id: False for slot_id in slots}
+    for x1, y1, x2, y2 in boxes:
+        for slot_id, slot_data in slots.items():
+            if get_iou((x1, y1, x2, y2), slot_data["coords"]) > IOU_THRESHOLD:
+                occupancy[slot_id] = True
+    return np.array([occupancy[slot_id] for slot_id in slots])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=200)
+    parser.add_argument("--detections", type=int, default=25)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    slots = make_slots(args.slots)
+    frames = make_frames(args.frames, args.detections, rng)
+
+    start = time.perf_counter()
+    index = SlotIndex(slots)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    baseline = [occupancy_shapely(boxes, slots) for boxes in frames]
+    shapely_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = [index.occupancy(boxes, IOU_THRESHOLD) for boxes in frames]
+    index_s = time.perf_counter() - start
+
+    mismatches = sum(int((a != b).sum()) for a, b in zip(baseline, batched))
+    total = args.frames * args.slots
+
+    print(f"Slots: {args.slots} | Detections/frame: {args.detections} | Frames: {args.frames}")
+    print(f"SlotIndex build:        {build_ms:8.2f} ms (once per layout)")
+    print(f"shapely get_iou loop:   {shapely_s / args.frames * 1000:8.3f} ms/frame")
+    print(f"SlotIndex.occupancy:    {index_s / args.frames * 1000:8.3f} ms/frame")
+    print(f"Speedup:                {shapely_s / max(index_s, 1e-9):8.1f}x")
+    print(f"Occupancy mismatches:   {mismatches}/{total} slot-frames "
+          f"(pixel rasterization vs exact polygon area)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,32 @@
 import cv2
-import time
-import requests
 import numpy as np
 import threading
-from flask import Flask, Response
-from ultralytics import YOLO
+from flask import Flask, Response, jsonify
 from shapely.geometry import Polygon, box
 import os
 
+from backends import create_backend
+from mjpeg import FrameBroadcaster
+from motion_gate import MotionGate
+from occupancy_filter import OccupancyDebouncer
+from pipeline import Pipeline
+from roi_classifier import OnnxCropClassifier, RoiOccupancyDetector
+from slot_geometry import SlotIndex
+from status_sender import StatusSender
+
 # --- FAST AUTO-DETECT CONFIG ---
 BACKEND_URL = "http://localhost:8000/api/v1"
 LOT_ID = "1"
 CONFIDENCE_THRESHOLD = 0.45
 IOU_THRESHOLD = 0.20
-PROCESS_EVERY_N_FRAMES = 5  # Speed optimization
+HEADLESS = os.getenv("HEADLESS", "False").lower() == "true"  # Skip annotation and /video_feed
+LAZY_RENDER = True  # Only annotate frames while someone watches /video_feed
+DETECTION_MODE = os.getenv("DETECTION_MODE", "detect")  # detect (full-frame YOLO) or roi (slot crop classifier)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "ultralytics")  # ultralytics, onnx, openvino
+MOTION_GATE = os.getenv("MOTION_GATE", "True").lower() == "true"  # Skip inference on static frames
+INFERENCE_DUTY_CYCLE = 1.0  # Share of wall time the model may use; frames in between are skipped
+STATUS_FLUSH_INTERVAL = 0.5  # Seconds between batched status updates
+DEBOUNCE_WINDOW = 6  # Inference frames a slot state must hold before it is reported
 
 # Flask App
 app = Flask(__name__)
@@ -21,8 +34,11 @@ app = Flask(__name__)
 # Global variables
 dummy_frame = np.zeros((480, 640, 3), dtype=np.uint8)
 cv2.putText(dummy_frame, "Auto-Detecting Spaces...", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-outputFrame = dummy_frame
-lock = threading.Lock()
+broadcaster = FrameBroadcaster()
+broadcaster.publish(dummy_frame)
+pipeline = None
+roi_detector = None
+motion_gate = None
 
 # Will be auto-populated
 SLOTS = {}
@@ -117,17 +133,63 @@ def get_iou(box_coords, poly_coords):
     except:
         return 0.0
 
+def draw_frame(frame, detections):
+    """Annotate a frame with detections, slot states and the info overlay"""
+    boxes, confs, states = detections if detections else ([], [], None)
+    
+    # Draw detections
+    for (x1, y1, x2, y2), conf in zip(boxes, confs):
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
+        cv2.putText(frame, f"{conf:.2f}", (int(x1), int(y1) - 5),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
+    
+    # Draw slots
+    occupied = 0
+    for idx, (slot_id, slot_data) in enumerate(SLOTS.items()):
+        coords = slot_data["coords"]
+        pts = np.array(coords, np.int32).reshape((-1, 1, 2))
+        
+        is_occupied = bool(states[idx]) if states is not None else False
+        occupied += is_occupied
+        color = (0, 0, 255) if is_occupied else (0, 255, 0)
+        
+        cv2.polylines(frame, [pts], isClosed=True, color=color, thickness=2)
+        
+        status = "OCC" if is_occupied else "FREE"
+        label = f"{slot_data['name']}: {status}"
+        cv2.putText(frame, label, (coords[0][0], coords[0][1] - 5), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    
+    # Info overlay
+    cv2.rectangle(frame, (0, 0), (640, 70), (0, 0, 0), -1)
+    cv2.putText(frame, "FAST AUTO-DETECT", (10, 20),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    cv2.putText(frame, f"Slots: {len(SLOTS)} | Cars: {len(boxes)}", (10, 45),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    
+    # Count stats
+    free = len(SLOTS) - occupied
+    cv2.putText(frame, f"Free: {free} | Occ: {occupied}", (10, 65),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+    
+    return frame
+
 def detection_loop():
-    global outputFrame, lock, SLOTS
+    global pipeline, roi_detector, motion_gate
     
     print("=" * 70)
     print("⚡ FAST AUTO-DETECT PARKING SYSTEM")
     print("=" * 70)
-    print("Loading YOLOv8-Nano (FAST)...")
     
     try:
-        model = YOLO("yolov8n.pt")
-        print("✓ YOLOv8-Nano loaded")
+        if DETECTION_MODE == "roi":
+            print("Loading slot crop classifier (ROI mode)...")
+            model = OnnxCropClassifier()
+            print("✓ Slot classifier loaded")
+        else:
+            print(f"Loading YOLOv8-Nano (FAST) with the {INFERENCE_BACKEND} backend...")
+            model = create_backend(INFERENCE_BACKEND, conf=CONFIDENCE_THRESHOLD)
+            print("✓ YOLOv8-Nano loaded")
     except Exception as e:
         print(f"Error: {e}")
         return
@@ -153,134 +215,86 @@ def detection_loop():
         print("❌ Could not read first frame")
         return
     
+    # Rasterize slot polygons once for batched overlap scoring
+    slot_index = SlotIndex(SLOTS)
+    roi_detector = RoiOccupancyDetector(SLOTS, model) if DETECTION_MODE == "roi" else None
+    motion_gate = MotionGate(SLOTS) if MOTION_GATE else None
+    
     # Reset video to beginning
     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
     
     print("\n⚡ OPTIMIZATIONS:")
-    print(f"  - YOLOv8-Nano (5x faster)")
-    print(f"  - Process every {PROCESS_EVERY_N_FRAMES}th frame")
+    if roi_detector:
+        print(f"  - Slot crop classification with change gate (no full-frame detection)")
+    else:
+        print(f"  - YOLOv8-Nano (5x faster)")
+    print(f"  - Staged capture/inference/annotation pipeline")
+    print(f"  - Rendering: {'off (headless)' if HEADLESS else 'only while viewers are connected' if LAZY_RENDER else 'always'}")
+    if motion_gate:
+        print(f"  - Motion gate: inference only on slot motion (refresh every {motion_gate.max_staleness:.0f}s)")
+    print(f"  - Inference duty cycle: {INFERENCE_DUTY_CYCLE:.0%} (stale frames dropped)")
     print(f"  - Auto-detected {len(SLOTS)} slots")
-    print(f"  - Expected FPS: 60+")
     print("\n🔄 Starting detection...\n")
     
-    # Track slot states
-    slot_states = {slot_id: "free" for slot_id in SLOTS.keys()}
-    frame_count = 0
-    last_detection_results = []
+    # Status updates go out in batches from a background thread
+    sender = StatusSender(BACKEND_URL, flush_interval=STATUS_FLUSH_INTERVAL)
+    sender.start()
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
-        
-        frame_count += 1
-        frame = cv2.resize(frame, (640, 480))
-        
-        # Only run detection every Nth frame
-        if frame_count % PROCESS_EVERY_N_FRAMES == 0:
-            results = model(
-                frame,
-                conf=CONFIDENCE_THRESHOLD,
-                iou=0.5,
-                classes=[2],  # Cars only
-                verbose=False,
-                device='cpu',
-                imgsz=416  # Smaller = faster
-            )
-            last_detection_results = results
+    # Track stable slot states (debounced over recent inference frames)
+    debouncer = OccupancyDebouncer(len(slot_index), window=DEBOUNCE_WINDOW)
+    
+    def infer(frame):
+        if roi_detector:
+            # Classify changed slot crops directly; there are no boxes to draw
+            boxes, confs = np.zeros((0, 4)), np.zeros(0)
+            raw_occupancy = roi_detector.update(frame)
         else:
-            results = last_detection_results
-        
-        # Process detections
-        current_occupancy = {slot_id: False for slot_id in SLOTS.keys()}
-        detection_count = 0
-        
-        if results:
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0])
-                    
-                    detection_count += 1
-                    
-                    # Draw detection
-                    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (255, 0, 0), 2)
-                    cv2.putText(frame, f"{conf:.2f}", (int(x1), int(y1) - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 0, 0), 1)
-                    
-                    # Check overlap
-                    box_coords = (x1, y1, x2, y2)
-                    for slot_id, slot_data in SLOTS.items():
-                        iou = get_iou(box_coords, slot_data["coords"])
-                        if iou > IOU_THRESHOLD:
-                            current_occupancy[slot_id] = True
-        
-        # Draw slots
-        for slot_id, slot_data in SLOTS.items():
-            coords = slot_data["coords"]
-            pts = np.array(coords, np.int32).reshape((-1, 1, 2))
-            
-            is_occupied = current_occupancy[slot_id]
-            color = (0, 0, 255) if is_occupied else (0, 255, 0)
-            
-            cv2.polylines(frame, [pts], isClosed=True, color=color, thickness=2)
-            
-            status = "OCC" if is_occupied else "FREE"
-            label = f"{slot_data['name']}: {status}"
-            cv2.putText(frame, label, (coords[0][0], coords[0][1] - 5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-        
-        # Update backend
-        for slot_id, is_occupied in current_occupancy.items():
-            new_status = "occupied" if is_occupied else "free"
+            detections = model(frame)  # (N, 6): x1, y1, x2, y2, conf, class
+            boxes, confs = detections[:, :4], detections[:, 4]
             
-            if slot_states[slot_id] != new_status:
-                slot_states[slot_id] = new_status
-                print(f"📍 {SLOTS[slot_id]['name']}: {new_status.upper()}")
-                
-                try:
-                    url = f"{BACKEND_URL}/lots/{LOT_ID}/slots/{slot_id}/status"
-                    requests.post(url, json={"status": new_status}, timeout=1)
-                except:
-                    pass
-        
-        # Info overlay
-        cv2.rectangle(frame, (0, 0), (640, 70), (0, 0, 0), -1)
-        cv2.putText(frame, "FAST AUTO-DETECT", (10, 20),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-        cv2.putText(frame, f"Slots: {len(SLOTS)} | Cars: {detection_count}", (10, 45),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            # Check overlap of all boxes against all slots in one batch
+            raw_occupancy = slot_index.occupancy(boxes, IOU_THRESHOLD)
         
-        # Count stats
-        occupied = sum(1 for v in current_occupancy.values() if v)
-        free = len(SLOTS) - occupied
-        cv2.putText(frame, f"Free: {free} | Occ: {occupied}", (10, 65),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+        # Update backend with stable transitions only
+        for j in debouncer.update(raw_occupancy):
+            slot_id = slot_index.slot_ids[j]
+            new_status = "occupied" if debouncer.state[j] else "free"
+            print(f"📍 {SLOTS[slot_id]['name']}: {new_status.upper()}")
+            sender.submit(LOT_ID, slot_id, new_status)
         
-        with lock:
-            outputFrame = frame.copy()
-        
-        time.sleep(0.01)
+        return boxes, confs, debouncer.state.copy()
+    
+    # Drawing is skipped entirely when headless, and while nobody is watching
+    render_when = (lambda: broadcaster.subscribers > 0) if LAZY_RENDER else None
+    pipeline = Pipeline(
+        cap, infer, draw_frame, broadcaster.publish,
+        duty_cycle=INFERENCE_DUTY_CYCLE, headless=HEADLESS, render_when=render_when,
+        gate=motion_gate.should_infer if motion_gate else None
+    )
+    pipeline.start()
+    pipeline.join()
+
+@app.route("/stats")
+def stats():
+    if pipeline is None:
+        return jsonify({"status": "starting"})
+    stats = pipeline.stats()
+    if roi_detector is not None:
+        stats["roi"] = dict(roi_detector.stats)
+    if motion_gate is not None:
+        stats["motion_gate"] = motion_gate.snapshot()
+    stats["video_feed"] = {
+        "subscribers": broadcaster.subscribers,
+        "encoded_frames": broadcaster.encoded_frames,
+    }
+    return jsonify(stats)
 
 @app.route("/video_feed")
 def video_feed():
-    def generate():
-        global outputFrame, lock
-        while True:
-            with lock:
-                if outputFrame is None:
-                    continue
-                (flag, encodedImage) = cv2.imencode(".jpg", outputFrame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                if not flag:
-                    continue
-            
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
-            time.sleep(0.02)
-    
-    return Response(generate(), mimetype="multipart/x-mixed-replace; boundary=frame")
+    if HEADLESS:
+        return Response("Video feed disabled (HEADLESS mode)", status=503, mimetype="text/plain")
+    # Every viewer shares the same encoded JPEG bytes for each frame
+    return Response(broadcaster.stream(), mimetype="multipart/x-mixed-replace; boundary=frame")
 
 if __name__ == "__main__":
     print("\n" + "=" * 70)
@@ -293,6 +307,7 @@ if __name__ == "__main__":
     print("  📊 Live statistics")
     print("  💯 100% FREE")
     print("\n🌐 Video feed: http://localhost:5000/video_feed")
+    print("📈 Pipeline stats: http://localhost:5000/stats")
     print("=" * 70 + "\n")
     
     t = threading.Thread(target=detection_loop, daemon=True)
@@ -0,0 +1,84 @@
+"""
+Shared MJPEG broadcaster for /video_feed.
+
+The annotation stage publishes raw frames; each new frame is JPEG-encoded at
+most once, by the first viewer that needs it, and every viewer gets the same
+immutable bytes. Viewers sleep on a condition variable until a newer frame
+exists. A slow viewer simply gets the newest frame when it comes back, so
+intermediate frames are skipped instead of buffered.
+"""
+
+import threading
+
+import cv2
+
+JPEG_QUALITY = 70
+KEEPALIVE_TIMEOUT = 5.0  # seconds a viewer waits before re-checking for a frame
+
+
+class FrameBroadcaster:
+    """Latest-frame MJPEG fan-out for any number of HTTP viewers."""
+
+    def __init__(self, quality=JPEG_QUALITY):
+        self.quality = quality
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+        self._seq = 0
+        self._frame = None
+        self._chunk_seq = 0
+        self._chunk = None
+        self._subscribers = 0
+        self.encoded_frames = 0
+
+    @property
+    def subscribers(self):
+        """Number of connected viewers."""
+        return self._subscribers
+
+    def publish(self, frame):
+        """
+        Make `frame` the current frame. The caller must not modify it
+        afterwards; it is encoded lazily and shared between viewers.
+        """
+        with self._cond:
+            self._seq += 1
+            self._frame = frame
+            self._cond.notify_all()
+
+    def _encoded(self):
+        """Return (seq, multipart chunk) for the current frame, encoding it once."""
+        with self._encode_lock:
+            with self._cond:
+                seq, frame = self._seq, self._frame
+                if self._chunk_seq == seq:
+                    return seq, self._chunk
+
+            flag, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not flag:
+                return seq, None
+            chunk = (b'--frame\r\n'
+                     b'Content-Type: image/jpeg\r\n\r\n' + encoded.tobytes() + b'\r\n')
+
+            with self._cond:
+                self._chunk_seq, self._chunk = seq, chunk
+            self.encoded_frames += 1
+            return seq, chunk
+
+    def stream(self):
+        """Generator of multipart MJPEG chunks for one viewer."""
+        with self._cond:
+            self._subscribers += 1
+        try:
+            last_seq = 0
+            while True:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != last_seq and self._frame is not None,
+                                               timeout=KEEPALIVE_TIMEOUT):
+                        continue
+                seq, chunk = self._encoded()
+                last_seq = seq
+                if chunk is not None:
+                    yield chunk
+        finally:
+            with self._cond:
+                self._subscribers -= 1
@@ -0,0 +1,98 @@
+"""
+Motion gate: decides whether a frame is worth running the model on.
+
+Each frame is reduced to a small blurred grayscale image and compared with a
+slowly updated background. The fraction of changed pixels is measured inside
+every slot region (slot masks are rasterized once at the reduced size).
+Inference is triggered when any slot region moved more than
+`motion_threshold`, or when the last inference is older than `max_staleness`
+seconds. Skipped frames reuse the previous occupancy result.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+GATE_WIDTH = 160             # frames are compared at 160x120
+PIXEL_THRESHOLD = 18         # gray-level difference that marks a pixel as changed
+MOTION_THRESHOLD = 0.02      # share of a slot's pixels that must change
+BACKGROUND_ALPHA = 0.05      # background adaptation rate (lighting drift)
+MAX_STALENESS = 30.0         # seconds; always re-run inference at least this often
+
+
+class MotionGate:
+    """Per-slot frame-difference gate for one camera."""
+
+    def __init__(self, slots, frame_size=(640, 480), width=GATE_WIDTH,
+                 pixel_threshold=PIXEL_THRESHOLD, motion_threshold=MOTION_THRESHOLD,
+                 background_alpha=BACKGROUND_ALPHA, max_staleness=MAX_STALENESS):
+        frame_w, frame_h = frame_size
+        self.size = (width, int(round(width * frame_h / frame_w)))
+        self.scale = width / frame_w
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.background_alpha = background_alpha
+        self.max_staleness = max_staleness
+
+        # Slot masks at gate resolution, flattened: (S, pixels)
+        w, h = self.size
+        masks = []
+        for slot in slots.values():
+            coords = slot["coords"] if isinstance(slot, dict) else slot
+            mask = np.zeros((h, w), dtype=np.uint8)
+            pts = np.round(np.asarray(coords, dtype=np.float64) * self.scale).astype(np.int32)
+            cv2.fillPoly(mask, [pts], 1)
+            masks.append(mask.ravel())
+        self._masks = np.array(masks, dtype=np.float32).reshape(len(masks), w * h)
+        self._mask_area = np.maximum(self._masks.sum(axis=1), 1.0)
+
+        self._background = None
+        self._last_inference = 0.0
+        self._lock = threading.Lock()
+        self.last_motion = np.zeros(len(masks), dtype=np.float32)
+        self.stats = {"frames": 0, "inferences": 0, "skipped": 0, "stale_refreshes": 0}
+
+    def _reduce(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+    def should_infer(self, frame, now=None):
+        """Return True if the model should run on this frame."""
+        now = time.monotonic() if now is None else now
+        gray = self._reduce(frame)
+
+        if self._background is None:
+            self._background = gray
+            motion = np.ones(len(self._masks), dtype=np.float32)
+        else:
+            changed = (np.abs(gray - self._background) > self.pixel_threshold).astype(np.float32)
+            motion = (self._masks @ changed.ravel()) / self._mask_area
+            cv2.accumulateWeighted(gray, self._background, self.background_alpha)
+
+        moved = bool((motion > self.motion_threshold).any())
+        stale = now - self._last_inference >= self.max_staleness
+
+        with self._lock:
+            self.last_motion = motion
+            self.stats["frames"] += 1
+            if moved or stale:
+                self.stats["inferences"] += 1
+                if stale and not moved:
+                    self.stats["stale_refreshes"] += 1
+            else:
+                self.stats["skipped"] += 1
+
+        if moved or stale:
+            self._last_inference = now
+            return True
+        return False
+
+    def snapshot(self):
+        """Counters plus the share of inferences the gate saved."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["saved_ratio"] = stats["skipped"] / stats["frames"] if stats["frames"] else 0.0
+        return stats
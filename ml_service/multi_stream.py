@@ -0,0 +1,289 @@
+"""
+Multi-camera inference: N video sources spread across a pool of CPU worker
+processes. Each worker owns one detection backend and a subset of the
+streams, and runs a single batched model call per tick over the latest frame
+of each of its streams.
+
+Streams are described in a JSON file (one entry per `Camera` row):
+
+    [
+        {"name": "lot1-north", "lot_id": "1", "source": "rtsp://10.0.0.5/stream1"},
+        {"name": "lot1-south", "lot_id": "1", "source": "rtsp://10.0.0.6/stream1",
+         "slots": {"7": [[20, 160], [120, 160], [140, 420], [10, 420]]}}
+    ]
+
+`slots` maps backend slot IDs to polygons in 640x480 frame coordinates. When
+omitted, the layout is auto-detected from the first frame like the
+single-camera service does.
+
+Usage:
+    python multi_stream.py --config streams.json [--workers 4] [--backend onnx] [--mode roi]
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+FRAME_SIZE = (640, 480)
+REPORT_INTERVAL = 5.0  # seconds between per-stream FPS reports
+RECONNECT_DELAY = 2.0  # seconds before reopening a dropped live source
+STARTUP_TIMEOUT = 30.0  # seconds before streams that never produced a frame are reported
+
+
+class LatestFrameReader(threading.Thread):
+    """Keeps only the newest decoded frame of one source."""
+
+    def __init__(self, source):
+        super().__init__(daemon=True)
+        self.source = source
+        self.is_file = os.path.isfile(source)
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        fps = cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                if self.is_file:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                else:
+                    cap.release()
+                    time.sleep(RECONNECT_DELAY)
+                    cap = cv2.VideoCapture(self.source)
+                continue
+            frame = cv2.resize(frame, FRAME_SIZE)
+            with self._lock:
+                self._frame = frame
+                self._seq += 1
+            # Play files back at native speed so they behave like a camera
+            if frame_interval:
+                delay = frame_interval - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+        cap.release()
+
+    def latest(self):
+        """Return (sequence number, frame) of the newest frame."""
+        with self._lock:
+            return self._seq, self._frame
+
+    def stop(self):
+        self._stopped.set()
+
+
+def load_streams(path):
+    """Load and validate the stream list from a JSON config file."""
+    with open(path) as f:
+        streams = json.load(f)
+    for idx, stream in enumerate(streams):
+        if "source" not in stream or "lot_id" not in stream:
+            raise ValueError(f"Stream #{idx} needs 'source' and 'lot_id'")
+        stream.setdefault("name", f"stream-{idx}")
+        stream["lot_id"] = str(stream["lot_id"])
+    return streams
+
+
+def build_slots(stream, frame):
+    """Return a SLOTS-style dict for one stream."""
+    from inference_fast import create_smart_grid_layout
+
+    if stream.get("slots"):
+        return {
+            int(slot_id): {"name": str(slot_id), "coords": [tuple(p) for p in coords]}
+            for slot_id, coords in stream["slots"].items()
+        }
+    return {
+        idx: {"name": f"A{idx}", "coords": coords}
+        for idx, coords in enumerate(create_smart_grid_layout(frame), start=1)
+    }
+
+
+def stream_worker(worker_id, streams, stats_queue, stop_event, num_threads, backend, mode, motion_gate):
+    """Worker process: one model, one batched inference call per tick."""
+    from backends import create_backend
+    from inference_fast import BACKEND_URL, CONFIDENCE_THRESHOLD, IOU_THRESHOLD
+    from motion_gate import MotionGate
+    from occupancy_filter import OccupancyDebouncer
+    from roi_classifier import OnnxCropClassifier, RoiOccupancyDetector
+    from slot_geometry import SlotIndex
+    from status_sender import StatusSender
+
+    # Split cores between workers instead of letting each one grab them all
+    if backend == "ultralytics":
+        import torch
+        torch.set_num_threads(num_threads)
+    cv2.setNumThreads(1)
+
+    if mode == "roi":
+        model = OnnxCropClassifier(threads=num_threads)
+    else:
+        model = create_backend(backend, conf=CONFIDENCE_THRESHOLD, threads=num_threads)
+    sender = StatusSender(BACKEND_URL)
+    sender.start()
+    readers = [LatestFrameReader(s["source"]) for s in streams]
+    for reader in readers:
+        reader.start()
+
+    # A stream's slot layout is built from its first frame; streams without
+    # one yet are skipped, so a dead camera never holds up the others
+    indexes = [None] * len(streams)
+    debouncers = [None] * len(streams)
+    gates = [None] * len(streams)
+
+    def set_up(i, frame):
+        slots = build_slots(streams[i], frame)
+        indexes[i] = RoiOccupancyDetector(slots, model) if mode == "roi" else SlotIndex(slots)
+        debouncers[i] = OccupancyDebouncer(len(slots))
+        gates[i] = MotionGate(slots) if motion_gate else None
+        print(f"[worker {worker_id}] stream {streams[i]['name']} up, {len(slots)} slots")
+
+    print(f"[worker {worker_id}] {len(streams)} streams, {num_threads} threads")
+    started = time.perf_counter()
+    reported_missing = False
+
+    last_seq = [0] * len(streams)
+    processed = [0] * len(streams)
+    gated = [0] * len(streams)
+    window_start = time.perf_counter()
+
+    while not stop_event.is_set():
+        batch, batch_idx = [], []
+        for i, reader in enumerate(readers):
+            seq, frame = reader.latest()
+            if frame is not None and seq != last_seq[i]:
+                last_seq[i] = seq
+                if indexes[i] is None:
+                    set_up(i, frame)
+                if gates[i] is not None and not gates[i].should_infer(frame):
+                    # Static scene: keep the last occupancy vector
+                    gated[i] += 1
+                    continue
+                batch.append(frame)
+                batch_idx.append(i)
+
+        if not reported_missing and time.perf_counter() - started >= STARTUP_TIMEOUT:
+            reported_missing = True
+            missing = [s["name"] for s, index in zip(streams, indexes) if index is None]
+            if missing:
+                print(f"[worker {worker_id}] no frame after {STARTUP_TIMEOUT:.0f}s from: {', '.join(missing)}")
+
+        if not batch:
+            time.sleep(0.005)
+            continue
+
+        if mode == "roi":
+            occupancies = classify_changed_slots(model, [indexes[i] for i in batch_idx], batch)
+        else:
+            occupancies = [
+                indexes[i].occupancy(dets[:, :4], IOU_THRESHOLD)
+                for i, dets in zip(batch_idx, model.predict(batch))
+            ]
+
+        for i, occupancy in zip(batch_idx, occupancies):
+            processed[i] += 1
+            for j in debouncers[i].update(occupancy):
+                new_status = "occupied" if debouncers[i].state[j] else "free"
+                sender.submit(streams[i]["lot_id"], indexes[i].slot_ids[j], new_status)
+
+        elapsed = time.perf_counter() - window_start
+        if elapsed >= REPORT_INTERVAL:
+            stats_queue.put({
+                "worker": worker_id,
+                "elapsed": elapsed,
+                "frames": {s["name"]: n for s, n in zip(streams, processed)},
+                "gated": {s["name"]: n for s, n in zip(streams, gated)},
+            })
+            processed = [0] * len(streams)
+            gated = [0] * len(streams)
+            window_start = time.perf_counter()
+
+    for reader in readers:
+        reader.stop()
+    sender.stop()
+
+
+def classify_changed_slots(classifier, detectors, frames):
+    """ROI mode: one classifier call over the changed slot crops of all streams."""
+    pending = [detector.pending(frame) for detector, frame in zip(detectors, frames)]
+    crops = [c for _, c in pending if len(c)]
+    if crops:
+        probs = classifier(np.concatenate(crops))
+        offset = 0
+        for detector, (indices, _) in zip(detectors, pending):
+            detector.apply(indices, probs[offset:offset + len(indices)])
+            offset += len(indices)
+    return [detector.state for detector in detectors]
+
+
+def run(streams, workers, backend="ultralytics", mode="detect", motion_gate=True):
+    """Start the worker pool and print per-stream FPS until interrupted."""
+    workers = max(1, min(workers, len(streams)))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # Round-robin so every worker gets a similar share of cameras
+    assignments = [streams[w::workers] for w in range(workers)]
+
+    ctx = mp.get_context("spawn")
+    stats_queue = ctx.Queue()
+    stop_event = ctx.Event()
+    procs = [
+        ctx.Process(
+            target=stream_worker,
+            args=(w, assignments[w], stats_queue, stop_event, num_threads, backend, mode, motion_gate),
+            daemon=True,
+        )
+        for w in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    print(f"🚀 {len(streams)} streams on {workers} workers ({num_threads} threads each)")
+
+    fps = {}
+    gated = {}
+    try:
+        while any(p.is_alive() for p in procs):
+            try:
+                report = stats_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            for name, frames in report["frames"].items():
+                fps[name] = frames / report["elapsed"]
+                gated[name] = report["gated"][name] / report["elapsed"]
+            seen = sum(fps.values()) + sum(gated.values())
+            saved = sum(gated.values()) / seen if seen else 0.0
+            print("📊 " + " | ".join(f"{name}: {value:.1f} fps" for name, value in sorted(fps.items()))
+                  + f" | total: {sum(fps.values()):.1f} fps | motion gate saved {saved:.0%}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for p in procs:
+            p.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-camera parking inference")
+    parser.add_argument("--config", default=os.getenv("STREAMS_CONFIG", "streams.json"))
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "ultralytics"),
+                        choices=["ultralytics", "onnx", "openvino"])
+    parser.add_argument("--mode", default=os.getenv("DETECTION_MODE", "detect"), choices=["detect", "roi"],
+                        help="detect: full-frame YOLO; roi: slot crop classifier")
+    parser.add_argument("--no-motion-gate", action="store_true", help="Run the model on every new frame")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INFERENCE_WORKERS", os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    run(load_streams(args.config), args.workers, args.backend, args.mode, not args.no_motion_gate)
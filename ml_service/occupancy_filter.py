@@ -0,0 +1,75 @@
+"""
+Temporal debouncing for slot occupancy.
+
+A single missed detection must not flip a slot to free and back. Each slot
+keeps the raw per-inference votes of the last `window` inference frames in a
+ring buffer, and its stable state only changes when the vote count crosses
+the hysteresis thresholds:
+
+    free -> occupied  when  occupied votes >= enter_count
+    occupied -> free  when  occupied votes <= exit_count
+
+All slots are updated together with NumPy arrays, so the cost per frame does
+not depend on the number of slots in Python terms.
+"""
+
+import math
+
+import numpy as np
+
+DEBOUNCE_WINDOW = 6         # inference frames kept per slot
+DEBOUNCE_ENTER_RATIO = 0.5  # share of the window that must see a car to mark occupied
+DEBOUNCE_EXIT_RATIO = 0.0   # share of the window that may still see a car when marking free
+
+
+class OccupancyDebouncer:
+    """Sliding-window hysteresis state machine for all slots of one camera."""
+
+    def __init__(self, num_slots, window=DEBOUNCE_WINDOW,
+                 enter_ratio=DEBOUNCE_ENTER_RATIO, exit_ratio=DEBOUNCE_EXIT_RATIO,
+                 initial=None):
+        if window < 1:
+            raise ValueError("window must be at least 1 frame")
+        if not 0.0 <= exit_ratio < enter_ratio <= 1.0:
+            raise ValueError("need 0 <= exit_ratio < enter_ratio <= 1")
+
+        self.window = window
+        self.enter_count = max(1, math.ceil(enter_ratio * window))
+        self.exit_count = min(self.enter_count - 1, math.floor(exit_ratio * window))
+
+        if initial is None:
+            self.state = np.zeros(num_slots, dtype=bool)
+        else:
+            self.state = np.asarray(initial, dtype=bool).copy()
+
+        # Start with a window that agrees with the initial state
+        self._votes = np.repeat(self.state[None, :], window, axis=0)
+        self._counts = self._votes.sum(axis=0, dtype=np.int32)
+        self._pos = 0
+
+    @property
+    def max_latency_frames(self):
+        """
+        Worst-case number of inference frames between a real change and its
+        emission: (free -> occupied, occupied -> free).
+        """
+        return self.enter_count, self.window - self.exit_count
+
+    def update(self, raw):
+        """
+        Feed one inference frame of raw per-slot occupancy.
+
+        Args:
+            raw: Boolean array (S,) from a single frame
+
+        Returns:
+            Indices of slots whose stable state changed on this frame
+        """
+        raw = np.asarray(raw, dtype=bool)
+        self._counts += raw.astype(np.int32) - self._votes[self._pos]
+        self._votes[self._pos] = raw
+        self._pos = (self._pos + 1) % self.window
+
+        changed = np.where(self.state, self._counts <= self.exit_count, self._counts >= self.enter_count)
+        self.state ^= changed
+        return np.nonzero(changed)[0]
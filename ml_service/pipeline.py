@@ -0,0 +1,309 @@
+"""
+Staged video pipeline: capture -> inference -> annotation.
+
+Each stage runs in its own thread and the stages are connected by small
+bounded ring buffers that never block the producer: when a buffer is full
+the oldest frame is dropped. The inference stage always takes the newest
+frame, so when the model falls behind, stale frames are skipped instead of
+queueing up latency.
+
+How often inference runs adapts to the measured model latency: after each
+call the next one is not started before `latency / duty_cycle` has passed
+(duty_cycle=1.0 runs back-to-back, 0.5 leaves half a core free, ...).
+Frames arriving in between are only annotated with the latest result.
+
+An optional `gate(image)` predicate runs before the model (e.g. a motion
+gate); frames it rejects are skipped and the previous result stays current.
+
+Annotation is optional: in headless mode the annotation stage is not started
+at all, and with a `render_when` predicate (e.g. "someone is watching the
+video feed") frames are only drawn while it returns True.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+
+FRAME_SIZE = (640, 480)
+INFERENCE_DUTY_CYCLE = 1.0  # share of wall time the model may use
+EMA_ALPHA = 0.1             # smoothing for latency counters
+
+# One captured frame travelling through the pipeline
+FramePacket = namedtuple("FramePacket", ["seq", "captured_at", "image"])
+
+
+class StageStats:
+    """Thread-safe latency/throughput counters for one stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.count = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.ema_seconds = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if self.count == 1:
+                self.ema_seconds = seconds
+            else:
+                self.ema_seconds += EMA_ALPHA * (seconds - self.ema_seconds)
+
+    def drop(self, n=1):
+        with self._lock:
+            self.dropped += n
+
+    def skip(self, n=1):
+        with self._lock:
+            self.skipped += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "dropped": self.dropped,
+                "skipped": self.skipped,
+                "avg_ms": self.total_seconds / self.count * 1000 if self.count else 0.0,
+                "ema_ms": self.ema_seconds * 1000,
+                "max_ms": self.max_seconds * 1000,
+            }
+
+
+class FrameRing:
+    """Bounded frame buffer. `put` never blocks; when full, the oldest frame is dropped."""
+
+    def __init__(self, capacity, stats=None):
+        self._items = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._stats = stats
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen and self._stats:
+                self._stats.drop()
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None on timeout."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def get_latest(self, timeout=None):
+        """Return the newest item and discard everything older, or None on timeout."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.pop()
+            if self._items and self._stats:
+                self._stats.drop(len(self._items))
+            self._items.clear()
+            return item
+
+
+class CaptureStage(threading.Thread):
+    """Reads and resizes frames, fanning them out to the downstream rings."""
+
+    def __init__(self, cap, outputs, stats, stop_event, loop_file=True):
+        """
+        Args:
+            outputs: List of (ring, predicate) pairs; a frame is only put into
+                     a ring when its predicate is None or returns True
+        """
+        super().__init__(daemon=True, name="capture")
+        self.cap = cap
+        self.outputs = outputs
+        self.stats = stats
+        self.stop_event = stop_event
+        self.loop_file = loop_file
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+    def run(self):
+        seq = 0
+        next_due = time.perf_counter()
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            ret, image = self.cap.read()
+            if not ret:
+                if self.loop_file:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            image = cv2.resize(image, FRAME_SIZE)
+            seq += 1
+            packet = FramePacket(seq, time.perf_counter(), image)
+            self.stats.record(packet.captured_at - start)
+            for ring, wanted in self.outputs:
+                if wanted is None or wanted():
+                    ring.put(packet)
+
+            # Pace file playback to its native frame rate; live sources pace themselves
+            if self.frame_interval:
+                next_due = max(next_due + self.frame_interval, start)
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class InferenceStage(threading.Thread):
+    """Runs `infer(image)` on the newest frame, as often as the duty cycle allows."""
+
+    def __init__(self, ring, infer, stats, stop_event, duty_cycle=INFERENCE_DUTY_CYCLE, gate=None):
+        super().__init__(daemon=True, name="inference")
+        self.ring = ring
+        self.infer = infer
+        self.gate = gate
+        self.stats = stats
+        self.stop_event = stop_event
+        self.duty_cycle = duty_cycle
+        self._lock = threading.Lock()
+        self._latest = None  # (seq, result)
+
+    def run(self):
+        not_before = 0.0
+        while not self.stop_event.is_set():
+            wait = not_before - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            packet = self.ring.get_latest(timeout=0.5)
+            if packet is None:
+                continue
+            if self.gate is not None and not self.gate(packet.image):
+                # Nothing changed - the previous result still holds
+                self.stats.skip()
+                continue
+
+            start = time.perf_counter()
+            result = self.infer(packet.image)
+            elapsed = time.perf_counter() - start
+            self.stats.record(elapsed)
+
+            with self._lock:
+                self._latest = (packet.seq, result)
+
+            # Adaptive skip: give the model at most `duty_cycle` of wall time
+            not_before = start + self.stats.ema_seconds / self.duty_cycle
+
+    def latest(self):
+        """Return (seq, result) of the most recent inference, or (0, None)."""
+        with self._lock:
+            return self._latest or (0, None)
+
+
+class AnnotateStage(threading.Thread):
+    """Draws the latest inference result onto each frame and publishes it."""
+
+    def __init__(self, ring, inference, render, publish, stats, latency_stats, stop_event,
+                 render_when=None):
+        super().__init__(daemon=True, name="annotate")
+        self.ring = ring
+        self.render_when = render_when
+        self.inference = inference
+        self.render = render
+        self.publish = publish
+        self.stats = stats
+        self.latency_stats = latency_stats
+        self.stop_event = stop_event
+
+    def run(self):
+        while not self.stop_event.is_set():
+            packet = self.ring.get(timeout=0.5)
+            if packet is None:
+                continue
+            if self.render_when is not None and not self.render_when():
+                # Queued before the last viewer left - nobody will see it
+                self.stats.skip()
+                continue
+            start = time.perf_counter()
+            _, result = self.inference.latest()
+            # The inference stage may still be reading this image, so draw on a copy
+            self.publish(self.render(packet.image.copy(), result))
+            done = time.perf_counter()
+            self.stats.record(done - start)
+            self.latency_stats.record(done - packet.captured_at)
+
+
+class Pipeline:
+    """Wires the three stages together and exposes their counters."""
+
+    def __init__(self, cap, infer, render, publish,
+                 duty_cycle=INFERENCE_DUTY_CYCLE, infer_buffer=2, render_buffer=4,
+                 headless=False, render_when=None, gate=None):
+        """
+        Args:
+            cap: cv2.VideoCapture (or anything with read/get/set)
+            infer: Callable(image) -> result, run on the inference thread
+            render: Callable(image, result) -> annotated image
+            publish: Callable(annotated image), e.g. FrameBroadcaster.publish
+            duty_cycle: Share of wall time the model may use
+            headless: Never annotate or publish frames
+            render_when: Optional predicate; frames are only annotated while it is True
+            gate: Optional predicate(image); inference only runs on frames it accepts
+        """
+        self.headless = headless
+        self.stop_event = threading.Event()
+        self.stage_stats = {
+            name: StageStats(name)
+            for name in ("capture", "inference", "annotate", "end_to_end")
+        }
+        self.infer_ring = FrameRing(infer_buffer, self.stage_stats["inference"])
+        self.render_ring = FrameRing(render_buffer, self.stage_stats["annotate"])
+
+        outputs = [(self.infer_ring, None)]
+        if not headless:
+            outputs.append((self.render_ring, render_when))
+        self.capture = CaptureStage(
+            cap, outputs, self.stage_stats["capture"], self.stop_event
+        )
+        self.inference = InferenceStage(
+            self.infer_ring, infer, self.stage_stats["inference"],
+            self.stop_event, duty_cycle, gate
+        )
+        self.annotate = AnnotateStage(
+            self.render_ring, self.inference, render, publish,
+            self.stage_stats["annotate"], self.stage_stats["end_to_end"], self.stop_event,
+            render_when
+        )
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        for stage in self._stages():
+            stage.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self):
+        for stage in self._stages():
+            stage.join()
+
+    def _stages(self):
+        if self.headless:
+            return (self.inference, self.capture)
+        return (self.annotate, self.inference, self.capture)
+
+    def stats(self):
+        """Per-stage counters plus derived rates."""
+        snapshot = {name: s.snapshot() for name, s in self.stage_stats.items()}
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        captured = snapshot["capture"]["count"]
+        inferred = snapshot["inference"]["count"]
+        snapshot["rates"] = {
+            "capture_fps": captured / elapsed if elapsed else 0.0,
+            "inference_fps": inferred / elapsed if elapsed else 0.0,
+            "frames_per_inference": captured / inferred if inferred else 0.0,
+        }
+        snapshot["headless"] = self.headless
+        return snapshot
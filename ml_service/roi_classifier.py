@@ -0,0 +1,169 @@
+"""
+Slot-ROI classification: an alternative to full-frame car detection for
+fixed cameras.
+
+Each slot polygon is warped once per frame into a small square crop
+(CROP_SIZE x CROP_SIZE), and all crops that need it are classified as
+occupied / free in a single batched model call. A cheap change gate compares
+a downscaled grayscale thumbnail of every crop with the thumbnail of its last
+classified crop; slots that did not change keep their previous answer and
+skip the model entirely (up to MAX_STALE_FRAMES frames).
+
+The classifier is any ONNX model taking float32 RGB crops (N, 3, S, S) in
+[0, 1] and returning either (N, 2) scores for [free, occupied] or (N, 1)
+occupied scores. Point ROI_CLASSIFIER_MODEL at it. An (N, 1) output is read
+as ROI_CLASSIFIER_OUTPUT says: "probabilities" (already in [0, 1]) or
+"logits" (a sigmoid is applied).
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+CROP_SIZE = 64
+THUMB_STRIDE = 4            # thumbnail = every 4th pixel of the crop
+CHANGE_THRESHOLD = 8.0      # mean abs gray difference (0-255) that counts as a change
+MAX_STALE_FRAMES = 150      # re-classify unchanged slots at least this often
+OCCUPIED_THRESHOLD = 0.5
+ROI_CLASSIFIER_MODEL = os.getenv(
+    "ROI_CLASSIFIER_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "slot_classifier.onnx")
+)
+ROI_CLASSIFIER_OUTPUT = os.getenv("ROI_CLASSIFIER_OUTPUT", "probabilities")  # or "logits"
+OUTPUT_KINDS = ("probabilities", "logits")
+
+
+class SlotCropper:
+    """Warps every slot polygon of a frame into a fixed-size crop."""
+
+    def __init__(self, slots, size=CROP_SIZE):
+        self.slot_ids = list(slots.keys())
+        self.size = size
+        dst = np.float32([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]])
+        self._transforms = []
+        for slot_id in self.slot_ids:
+            slot = slots[slot_id]
+            coords = np.float32(slot["coords"] if isinstance(slot, dict) else slot)
+            if len(coords) != 4:
+                # Not a quadrilateral: use the polygon's minimum-area rectangle
+                coords = cv2.boxPoints(cv2.minAreaRect(coords))
+            self._transforms.append(cv2.getPerspectiveTransform(order_corners(coords), dst))
+        self._crops = np.empty((len(self.slot_ids), size, size, 3), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def crop(self, frame):
+        """Return a (S, size, size, 3) array of crops (the buffer is reused between calls)."""
+        for i in range(len(self.slot_ids)):
+            cv2.warpPerspective(frame, self._transforms[i], (self.size, self.size),
+                                dst=self._crops[i], flags=cv2.INTER_LINEAR)
+        return self._crops
+
+
+def order_corners(points):
+    """Order 4 points as top-left, top-right, bottom-right, bottom-left."""
+    points = np.float32(points)
+    s = points.sum(axis=1)
+    d = np.diff(points, axis=1).ravel()
+    return np.float32([points[s.argmin()], points[d.argmin()], points[s.argmax()], points[d.argmax()]])
+
+
+class OnnxCropClassifier:
+    """Batched occupied/free classifier on ONNX Runtime (CPU)."""
+
+    def __init__(self, model_path=ROI_CLASSIFIER_MODEL, threads=None, output=ROI_CLASSIFIER_OUTPUT):
+        import onnxruntime as ort
+
+        if output not in OUTPUT_KINDS:
+            raise ValueError(f"ROI classifier output must be one of {OUTPUT_KINDS}, got {output!r}")
+        self.output = output
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"ROI classifier model not found at {model_path} "
+                f"(set ROI_CLASSIFIER_MODEL to an occupied/free crop classifier)"
+            )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+        self._input = np.empty((0, 3, CROP_SIZE, CROP_SIZE), dtype=np.float32)
+
+    def __call__(self, crops):
+        """Classify (N, S, S, 3) BGR crops; returns (N,) occupied probabilities."""
+        n = len(crops)
+        if n == 0:
+            return np.zeros(0, dtype=np.float32)
+        if len(self._input) < n:
+            self._input = np.empty((n, 3) + crops.shape[1:3], dtype=np.float32)
+        batch = self._input[:n]
+        np.multiply(crops[..., ::-1].transpose(0, 3, 1, 2), 1.0 / 255.0, out=batch)
+
+        scores = self.session.run(None, {self._input_name: batch})[0].reshape(n, -1)
+        if scores.shape[1] == 2:
+            # [free, occupied] scores -> softmax probability of occupied
+            shifted = scores - scores.max(axis=1, keepdims=True)
+            exp = np.exp(shifted)
+            return exp[:, 1] / exp.sum(axis=1)
+        scores = scores[:, 0]
+        if self.output == "logits":
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        return scores
+
+
+class RoiOccupancyDetector:
+    """Per-camera crop classification with a pixel-difference gate."""
+
+    def __init__(self, slots, classifier, change_threshold=CHANGE_THRESHOLD,
+                 max_stale_frames=MAX_STALE_FRAMES, occupied_threshold=OCCUPIED_THRESHOLD):
+        self.cropper = SlotCropper(slots)
+        self.slot_ids = self.cropper.slot_ids
+        self.classifier = classifier
+        self.change_threshold = change_threshold
+        self.max_stale_frames = max_stale_frames
+        self.occupied_threshold = occupied_threshold
+
+        n = len(self.slot_ids)
+        thumb = len(range(0, CROP_SIZE, THUMB_STRIDE))
+        self._thumbs = np.zeros((n, thumb, thumb), dtype=np.float32)
+        self._age = np.full(n, max_stale_frames, dtype=np.int64)  # forces a first pass
+        self.probs = np.zeros(n, dtype=np.float32)
+        self.state = np.zeros(n, dtype=bool)
+        self.stats = {"frames": 0, "classified": 0, "skipped": 0}
+
+    def pending(self, frame):
+        """
+        Crop all slots of `frame` and return (indices, crops) of the slots
+        that changed or went stale and therefore need the classifier.
+        """
+        crops = self.cropper.crop(frame)
+        thumbs = crops[:, ::THUMB_STRIDE, ::THUMB_STRIDE].mean(axis=3, dtype=np.float32)
+        diff = np.abs(thumbs - self._thumbs).mean(axis=(1, 2))
+
+        self._age += 1
+        needed = np.nonzero((diff > self.change_threshold) | (self._age >= self.max_stale_frames))[0]
+        self._thumbs[needed] = thumbs[needed]
+        self._age[needed] = 0
+
+        self.stats["frames"] += 1
+        self.stats["classified"] += len(needed)
+        self.stats["skipped"] += len(self.slot_ids) - len(needed)
+        return needed, crops[needed]
+
+    def apply(self, indices, probs):
+        """Store classifier output for `indices`; returns the full occupancy vector."""
+        self.probs[indices] = probs
+        self.state = self.probs > self.occupied_threshold
+        return self.state
+
+    def update(self, frame):
+        """Gate, classify and return the raw occupancy vector (S,) for one frame."""
+        indices, crops = self.pending(frame)
+        if len(indices):
+            self.apply(indices, self.classifier(crops))
+        return self.state
@@ -0,0 +1,155 @@
+"""
+Background sender for slot status transitions.
+
+The detection loop calls `submit()` and never touches the network. A worker
+thread flushes pending transitions every `flush_interval` seconds as one bulk
+request per lot (POST /lots/{lot_id}/slots/status) over a pooled keep-alive
+session.
+
+Between flushes, pending transitions are coalesced per (lot_id, slot_id):
+only the latest status is kept, and a slot that flips back to the status the
+backend will have is dropped entirely. "Will have" is the status of a request
+still in flight if there is one, else the last confirmed status. Lots with
+more than MAX_BATCH updates are sent in several requests.
+"""
+
+import threading
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FLUSH_INTERVAL = 0.5  # seconds
+MAX_PENDING = 10000   # distinct slots waiting for a flush
+REQUEST_TIMEOUT = 2.0
+MAX_BATCH = 5000      # updates per request (the backend's limit)
+
+
+class StatusSender(threading.Thread):
+    """Coalescing, batching slot-status publisher."""
+
+    def __init__(self, backend_url, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT):
+        super().__init__(daemon=True, name="status-sender")
+        self.backend_url = backend_url.rstrip("/")
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._pending = {}    # (lot_id, slot_id) -> status
+        self._confirmed = {}  # (lot_id, slot_id) -> last status the backend accepted
+        self._inflight = {}   # (lot_id, slot_id) -> status in a request not answered yet
+        self._latest = {}     # (lot_id, slot_id) -> last status submitted
+        self._stopped = threading.Event()
+
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "sent": 0,
+            "requests": 0,
+            "errors": 0,
+        }
+
+    def submit(self, lot_id, slot_id, status):
+        """Queue a transition. Never blocks on I/O."""
+        key = (str(lot_id), int(slot_id))
+        with self._lock:
+            self.stats["submitted"] += 1
+            self._latest[key] = status
+            expected = self._inflight.get(key, self._confirmed.get(key))
+            if key in self._pending:
+                self.stats["coalesced"] += 1
+                if expected == status:
+                    # Flipped back before we sent anything - nothing to report
+                    del self._pending[key]
+                else:
+                    self._pending[key] = status
+            elif expected == status:
+                self.stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+            else:
+                self._pending[key] = status
+
+    def run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Send everything pending, one request per lot."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._inflight.update(pending)
+        if not pending:
+            return
+
+        by_lot = defaultdict(list)
+        for (lot_id, slot_id), status in pending.items():
+            by_lot[lot_id].append({"slot_id": slot_id, "status": status})
+
+        for lot_id, lot_updates in by_lot.items():
+            for start in range(0, len(lot_updates), MAX_BATCH):
+                self._send(lot_id, lot_updates[start:start + MAX_BATCH])
+
+    def _send(self, lot_id, updates):
+        """POST one batch (at most MAX_BATCH updates) for a lot."""
+        url = f"{self.backend_url}/lots/{lot_id}/slots/status"
+        try:
+            response = self.session.post(url, json={"updates": updates}, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Status flush for lot {lot_id} failed: {e}")
+            self._requeue(lot_id, updates)
+            return
+
+        self.stats["requests"] += 1
+        if response.status_code >= 500:
+            self.stats["errors"] += 1
+            print(f"⚠️  Status flush for lot {lot_id} failed: HTTP {response.status_code}")
+            self._requeue(lot_id, updates)
+            return
+        if response.status_code >= 400:
+            # Bad lot or payload - retrying will not help
+            self.stats["errors"] += 1
+            print(f"⚠️  Status flush for lot {lot_id} rejected: HTTP {response.status_code}")
+            self._settle(lot_id, updates, confirmed=False)
+            return
+
+        self.stats["sent"] += len(updates)
+        self._settle(lot_id, updates, confirmed=True)
+
+    def _settle(self, lot_id, updates, confirmed):
+        """The request for `updates` is answered: clear them from the in-flight map."""
+        with self._lock:
+            for update in updates:
+                key = (lot_id, update["slot_id"])
+                if confirmed:
+                    self._confirmed[key] = update["status"]
+                if self._inflight.get(key) == update["status"]:
+                    del self._inflight[key]
+
+    def _requeue(self, lot_id, updates):
+        """Put failed updates back unless a newer transition superseded them."""
+        with self._lock:
+            for update in updates:
+                key = (lot_id, update["slot_id"])
+                if self._inflight.get(key) == update["status"]:
+                    del self._inflight[key]
+                if key in self._pending or self._latest.get(key) != update["status"]:
+                    continue
+                if len(self._pending) < self.max_pending:
+                    self._pending[key] = update["status"]
+
+    def stop(self, timeout=5.0):
+        """Flush what is left and stop the worker thread."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)